@@ -55,5 +55,6 @@ setup(
 
     extras_require={
         'test': ['pytest'],
+        'numpy': ['numpy'],
     },
 )
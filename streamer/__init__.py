@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
-from .stream import Stream, DictStream
+from .stream import Stream, DictStream, ColumnarStream
+from .numeric import IntStream, FloatStream
+from .pipeline import Pipeline
 ItemStream = Stream
 MapStream = DictStream
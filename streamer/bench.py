@@ -0,0 +1,596 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.bench
+---
+
+Throughput / peak memory benchmarks of every stream operation against hand-written builtin or itertools baselines.
+Run locally with `python -m streamer.bench --help`. Results can be saved as JSON and compared between versions.
+"""
+
+from collections import namedtuple, Counter, deque
+from functools import reduce
+from itertools import chain, islice, dropwhile, takewhile, starmap, product, repeat, groupby, tee, count
+import argparse
+import atexit
+import csv
+import gzip
+import io
+import json
+import os
+import pickle
+import platform
+import random
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Any, Iterable, Iterator, List, Dict, Tuple
+from .stream import Stream, DictStream, ColumnarStream
+from .collector import Collector, CountCollector
+from .operator import Deduplicator, Inserter, PairUp, Zipper, Collapser, Grouper, RepeatApply, ConstantOf, \
+    Cartesian, Splitter, ExternalSorter, Reverser
+from . import streams
+from .expr import col
+from .columnar import batches_of
+from .pipeline import Pipeline
+from .checkpoint import Checkpoint, write_checkpoint
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+BenchCase = namedtuple("BenchCase", "name covers setup stream baseline")
+BenchResult = namedtuple("BenchResult", "case size impl seconds elements_per_sec peak_bytes")
+
+CASES = []  # type: List[BenchCase]
+
+# Public names that are deliberately left out of the benchmark suite, with the reason.
+NOT_BENCHMARKED = {
+    "Stream.of_list": "plain constructor, covered by every other case",
+}
+
+
+def _range_list(size: int) -> List[int]:
+    return list(range(size))
+
+
+def _square_root_list(size: int) -> List[int]:
+    # Products are generated on two copies, so the output size is close to `size`
+    return list(range(int(size ** 0.5)))
+
+
+def _records(size: int) -> List[dict]:
+    return [{"x": i % 10, "y": "ab"[i % 2], "z": float(i)} for i in range(size)]
+
+
+def _records_and_batches(size: int) -> Tuple[List[dict], list]:
+    records = _records(size)
+    return records, list(batches_of(records))
+
+
+def _jsonl_text(size: int) -> str:
+    return "".join(json.dumps(record) + "\n" for record in _records(size))
+
+
+def _csv_text(size: int) -> str:
+    return "x,y,z\n" + "".join("%d,%s,%r\n" % (r["x"], r["y"], r["z"]) for r in _records(size))
+
+
+def _temp_path(suffix: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="streamer-bench-")
+    os.close(fd)
+    atexit.register(os.remove, path)
+    return path
+
+
+def _gzip_members_file(size: int) -> str:
+    # 8 members, like concatenated rotated logs or a parallel gzip tool's output
+    path = _temp_path(".gz")
+    lines = _text_lines(size).splitlines(keepends=True)
+    with open(path, "wb") as f:
+        for i in range(8):
+            f.write(gzip.compress("".join(lines[i::8]).encode(), compresslevel=6))
+    return path
+
+
+def _gzip_write(lines: List[str], path: str) -> int:
+    with gzip.open(path, "wt", compresslevel=6) as f:
+        for line in lines:
+            f.write(line)
+    return len(lines)
+
+
+def _write_each(path: str, lines: Iterable[str]) -> int:
+    count = 0
+    with open(path, "w") as f:
+        for line in lines:
+            f.write(line + "\n")
+            count += 1
+    return count
+
+
+def _csv_write(records: List[dict], path: str) -> int:
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, list(records[0]), lineterminator="\n")
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+    return len(records)
+
+
+def _pickle_write(records: List[dict], path: str) -> int:
+    with open(path, "wb") as f:
+        pickle.dump(records, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return len(records)
+
+
+def _pickle_read(path: str) -> List[dict]:
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _record_files(size: int) -> Tuple[str, str]:
+    records_path, pickle_path = _temp_path(".rec"), _temp_path(".pickle")
+    Stream(_records(size)).to_records(records_path)
+    _pickle_write(_records(size), pickle_path)
+    return records_path, pickle_path
+
+
+def _text_file(size: int) -> str:
+    path = _temp_path(".log")
+    with open(path, "w") as f:
+        f.write(_text_lines(size))
+    return path
+
+
+def _read_lines(path: str) -> List[str]:
+    with open(path) as f:
+        return list(f)
+
+
+def _unpack_each(data: bytes, fmt: str) -> Iterator[tuple]:
+    size = struct.calcsize(fmt)
+    for offset in range(0, len(data), size):
+        yield struct.unpack_from(fmt, data, offset)
+
+
+def _group_entries(records: List[dict], key: Callable[[dict], Any]) -> Dict[Any, list]:
+    groups = {}
+    for entry in enumerate(records):
+        groups.setdefault(key(entry[1]), []).append(entry)
+    return groups
+
+
+def _text_lines(size: int) -> str:
+    return "".join("%d\n" % i for i in range(size))
+
+
+def _dict_of(size: int) -> Dict[int, int]:
+    return {i: i for i in range(size)}
+
+
+def _reservoir_r(elements: Iterable, k: int) -> list:
+    # the textbook one-pass reservoir (Algorithm R), one random number per element
+    sample = []
+    for i, x in enumerate(elements):
+        if i < k:
+            sample.append(x)
+        else:
+            j = random.randrange(i + 1)
+            if j < k:
+                sample[j] = x
+    return sample
+
+
+def _checkpoint_at_half(size: int) -> Tuple[List[int], str, str]:
+    # a count interrupted halfway, and a scratch checkpoint file every run resumes from a copy of it
+    data, template, path = _range_list(size), _temp_path(".ckpt"), _temp_path(".ckpt")
+    write_checkpoint(template, Checkpoint(("list", size), size // 2, CountCollector._IntPointer(size // 2), size, None))
+    return data, template, path
+
+
+def _resumed_count(data: List[int], template: str, path: str) -> int:
+    shutil.copyfile(template, path)
+    return Stream(data).map(abs).resume(path).count()
+
+
+def _consume(iterator: Iterable) -> None:
+    deque(iterator, maxlen=0)
+
+
+def _count_up():
+    x = 0
+    while True:
+        yield x
+        x += 1
+
+
+def register(name: str, stream: Callable[[Any], Any], baseline: Callable[[Any], Any], *,
+             covers: Iterable[str] = (), setup: Callable[[int], Any] = _range_list):
+    """
+    Register a benchmark case
+    :param name: unique case name
+    :param stream: (input -> result) function running the streamer implementation to completion
+    :param baseline: (input -> result) hand-written equivalent; results of both should compare equal
+    :param covers: qualified public names (e.g. `Stream.map`) exercised by this case; defaults to `name`
+    :param setup: (size -> input) function building the input outside of the measurement
+    """
+    CASES.append(BenchCase(name, tuple(covers) or (name,), setup, stream, baseline))
+
+
+def covered_names():
+    return set(chain.from_iterable(c.covers for c in CASES)) | set(NOT_BENCHMARKED)
+
+
+###
+# Stream
+###
+
+register("Stream.__init__", lambda d: list(Stream(d, d)), lambda d: list(chain(d, d)))
+register("Stream.add", lambda d: list(Stream(d).add(d).chain(d).concat(d)), lambda d: list(chain(d, d, d, d)),
+         covers=("Stream.add", "Stream.chain", "Stream.concat"))
+register("Stream.enumerate", lambda d: list(Stream(d).enumerate()), lambda d: list(enumerate(d)))
+register("Stream.map", lambda d: list(Stream(d).map(abs)), lambda d: list(map(abs, d)))
+register("Stream.cached_map", lambda d: list(Stream(d).cached_map(lambda x: x % 100, key=lambda x: x % 100)),
+         lambda d: list(map(lambda x: x % 100, d)))
+register("Stream.map_to_int", lambda d: Stream(d).map_to_int().sum(), lambda d: sum(d),
+         covers=("Stream.map_to_int", "Stream.to_numeric"))
+register("Stream.map_to_float", lambda d: Stream(d).map_to_float(float).max(), lambda d: float(max(d)))
+register("Stream.map_with_index", lambda d: list(Stream(d).map_with_index(max)),
+         lambda d: list(starmap(max, enumerate(d))))
+register("Stream.flat_map", lambda d: list(Stream(d).flat_map(lambda x: (x, x))),
+         lambda d: list(chain.from_iterable((x, x) for x in d)))
+register("Stream.flat_map[iterable]", lambda d: list(Stream(d).flat_map(lambda x: (x, x), kind="iterable")),
+         lambda d: [y for x in d for y in (x, x)], covers=("Stream.flat_map",))
+register("Stream.flat_map[scalar_or_iterable]",
+         lambda d: list(Stream(d).flat_map(lambda x: (x, x) if x & 1 else str(x), kind="scalar_or_iterable")),
+         lambda d: [y for x in d for y in ((x, x) if x & 1 else (str(x),))], covers=("Stream.flat_map",))
+register("Stream.filter", lambda d: list(Stream(d).filter(lambda x: x & 1)), lambda d: [x for x in d if x & 1])
+register("Stream.filter[expr]", lambda d: list(Stream(d).filter((col("x") > 3) & (col("y") == "a"))),
+         lambda d: list(filter(lambda r: r["x"] > 3 and r["y"] == "a", d)), setup=_records)
+register("Stream.map[expr]", lambda d: list(Stream(d).map(col("x") * 2 + 1)), lambda d: [r["x"] * 2 + 1 for r in d],
+         setup=_records)
+register("DictStream.filter_values[expr]", lambda d: list(DictStream(d).filter_values(col("x") > 3)),
+         lambda d: [(k, v) for k, v in d.items() if v["x"] > 3], setup=lambda size: dict(enumerate(_records(size))))
+register("Stream.exclude", lambda d: list(Stream(d).exclude(lambda x: x & 1).minus(lambda x: x & 2)),
+         lambda d: [x for x in d if not x & 3], covers=("Stream.exclude", "Stream.minus"))
+register("Stream.not_none", lambda d: list(Stream(d).not_none()), lambda d: [x for x in d if x is not None])
+register("Stream.without", lambda d: list(Stream(d).without(1, 2, 3)), lambda d: [x for x in d if x not in {1, 2, 3}])
+register("Stream.peek", lambda d: list(Stream(d).peek(id)), lambda d: list(d))
+register("Stream.instrument", lambda d: list(Stream(d).instrument("bench", sample_every=64)), lambda d: list(d))
+register("Stream.with_memory_budget", lambda d: Stream(d).with_memory_budget(1 << 40).sorted().collect_as_list(),
+         lambda d: sorted(d))
+register("Stream.tee", lambda d: [list(s) for s in Stream(d).tee(2, max_lag=len(d) // 4)],
+         lambda d: [list(s) for s in tee(d, 2)])
+register("Stream.cache", lambda d: [list(c) for c in repeat(Stream(d).cache(), 2)], lambda d: [list(d)] * 2)
+register("Stream.collect", lambda d: Stream(d).collect(sum), lambda d: sum(d))
+register("Stream.checkpoint", lambda d: Stream(d[0]).map(abs).checkpoint(d[1], every=10000).count(),
+         lambda d: sum(1 for _ in map(abs, d[0])), setup=lambda size: (_range_list(size), _temp_path(".ckpt")))
+register("Stream.resume", lambda d: _resumed_count(*d),
+         lambda d: len(d[0]) // 2 + sum(1 for _ in map(abs, islice(d[0], len(d[0]) // 2, None))),
+         setup=_checkpoint_at_half)
+register("Stream.to_file", lambda d: Stream(d[0]).to_file(d[1]).records, lambda d: _gzip_write(*d),
+         setup=lambda size: (_text_lines(size).splitlines(keepends=True), _temp_path(".gz")))
+register("Stream.write_lines", lambda d: Stream(d).write_lines(io.StringIO()).records,
+         lambda d: len(list(map(io.StringIO().write, ("%s\n" % x for x in d)))))
+register("Stream.to_jsonl", lambda d: Stream(d[0]).to_jsonl(d[1]).records,
+         lambda d: _write_each(d[1], map(json.dumps, d[0])),
+         setup=lambda size: (_records(size), _temp_path(".jsonl")))
+register("Stream.to_csv", lambda d: Stream(d[0]).to_csv(d[1]).records, lambda d: _csv_write(*d),
+         setup=lambda size: (_records(size), _temp_path(".csv")))
+register("Stream.to_records", lambda d: Stream(d[0]).to_records(d[1]).records, lambda d: _pickle_write(*d),
+         setup=lambda size: (_records(size), _temp_path(".rec")))
+register("Stream.collect_as_list", lambda d: Stream(d).collect_as_list(), lambda d: list(d))
+register("Stream.collect_as_set", lambda d: Stream(d).collect_as_set(), lambda d: set(d))
+register("Stream.collect_dict", lambda d: Stream(d).enumerate().collect_dict(), lambda d: dict(enumerate(d)),
+         covers=("Stream.collect_dict", "Stream.build_dict", "Stream.collect_as_map", "Stream.wrap_as_dict_stream"))
+register("Stream.reduce", lambda d: Stream(d).reduce(lambda x, y: x ^ y), lambda d: reduce(lambda x, y: x ^ y, d))
+register("Stream.reduce_right", lambda d: Stream(d).reduce_right(lambda x, y: x ^ y),
+         lambda d: reduce(lambda x, y: x ^ y, reversed(d)))
+register("Stream.foreach", lambda d: Stream(d).foreach(id), lambda d: _consume(map(id, d)))
+register("Stream.foreach_index", lambda d: Stream(d).foreach_index(max),
+         lambda d: _consume(starmap(max, enumerate(d))))
+register("Stream.any_match", lambda d: Stream(d).any_match(lambda x: x < 0), lambda d: any(x < 0 for x in d))
+register("Stream.all_match", lambda d: Stream(d).all_match(lambda x: x >= 0), lambda d: all(x >= 0 for x in d))
+register("Stream.none_match", lambda d: Stream(d).none_match(lambda x: x < 0), lambda d: not any(x < 0 for x in d))
+register("Stream.has_all", lambda d: Stream(d).has_all(-1, len(d) - 1), lambda d: {-1, len(d) - 1} <= set(d))
+register("Stream.has_any", lambda d: Stream(d).has_any(-1, -2), lambda d: any(x in {-1, -2} for x in d))
+register("Stream.count", lambda d: Stream(d).count(), lambda d: sum(1 for _ in d))
+register("Stream.count[walked]", lambda d: Stream(x for x in d).count(), lambda d: sum(1 for _ in d),
+         covers=("Stream.count",))
+register("Stream.sorted", lambda d: list(Stream(d).sorted(reverse=True)), lambda d: sorted(d, reverse=True))
+register("Stream.for_pairs", lambda d: Stream(d).for_pairs(id), lambda d: _consume(map(id, zip(d, d[1:]))))
+register("Stream.process_map", lambda d: list(Stream(d).process_map(abs, 2)), lambda d: list(map(abs, d)))
+register("Stream.parallel_any_match", lambda d: Stream(d).parallel_any_match(lambda x: x < 0),
+         lambda d: any(x < 0 for x in d))
+register("Stream.parallel_all_match", lambda d: Stream(d).parallel_all_match(lambda x: x >= 0),
+         lambda d: all(x >= 0 for x in d))
+register("Stream.parallel_none_match", lambda d: Stream(d).parallel_none_match(lambda x: x < 0),
+         lambda d: not any(x < 0 for x in d))
+register("Stream.parallel_has_any", lambda d: Stream(d).parallel_has_any(-1, -2),
+         lambda d: any(x in {-1, -2} for x in d))
+register("Stream.parallel_has_all", lambda d: Stream(d).parallel_has_all(0, -1),
+         lambda d: not {0, -1}.difference(d))
+register("Stream.parallel_find_first", lambda d: Stream(d).parallel_find_first(lambda x: x == len(d) // 2),
+         lambda d: next((x for x in d if x == len(d) // 2), None))
+register("Stream.find_first", lambda d: Stream(d).find_first(), lambda d: next(iter(d), None),
+         covers=("Stream.find_first", "Stream.find_any"))
+register("Stream.distinct", lambda d: list(Stream(d).map(lambda x: x % 97).distinct()),
+         lambda d: list(dict.fromkeys(x % 97 for x in d)))
+register("Stream.limit", lambda d: list(Stream(d).limit(len(d) // 2)), lambda d: list(islice(d, len(d) // 2)))
+register("Stream.skip", lambda d: list(Stream(d).skip(len(d) // 2)), lambda d: list(islice(d, len(d) // 2, None)))
+register("Stream.takewhile", lambda d: list(Stream(d).takewhile(lambda x: x >= 0).cutoff_if(lambda x: x < 0)),
+         lambda d: list(takewhile(lambda x: x >= 0, d)), covers=("Stream.takewhile", "Stream.cutoff_if"))
+register("Stream.dropwhile", lambda d: list(Stream(d).dropwhile(lambda x: x < 0).skip_util(lambda x: x >= 0)),
+         lambda d: list(dropwhile(lambda x: x < 0, d)), covers=("Stream.dropwhile", "Stream.skip_util"))
+register("Stream.sample", lambda d: _consume(Stream(d).sample(0.01, seed=1)),
+         lambda d: _consume(x for x in d if random.random() < 0.01))
+register("Stream.reservoir", lambda d: _consume(Stream(d).reservoir(100, seed=1)),
+         lambda d: _consume(_reservoir_r(iter(d), 100)))
+register("Stream.sample_by", lambda d: _consume(Stream(d).sample_by(lambda x: x & 7, 10, seed=1)),
+         lambda d: _consume(random.sample(group, min(10, len(group)))
+                            for group in _group_entries(d, lambda x: x & 7).values()))
+register("Stream.max", lambda d: Stream(d).max(key=lambda x: -x), lambda d: max(d, key=lambda x: -x))
+register("Stream.min", lambda d: Stream(d).min(), lambda d: min(d))
+register("Stream.intersperse", lambda d: list(Stream(d).intersperse(-1)),
+         lambda d: list(chain.from_iterable((-1, x) for x in d))[1:])
+register("Stream.cross", lambda d: list(Stream(d).cross((0, 1))), lambda d: list(product(d, (0, 1))))
+register("Stream.cross_result_of", lambda d: list(Stream(d).cross_result_of(lambda x: (x, x))),
+         lambda d: [(x, y) for x in d for y in (x, x)])
+register("Stream.map_pairs", lambda d: list(Stream(d).map_pairs(min)), lambda d: list(map(min, zip(d, d[1:]))))
+register("Stream.map_to_entry", lambda d: Stream(d).map_to_entry(lambda x: (x, x)).collect_dict(),
+         lambda d: {x: x for x in d})
+register("Stream.map_to_key_value", lambda d: Stream(d).map_to_key_value(abs, abs).collect_dict(),
+         lambda d: {abs(x): abs(x) for x in d})
+register("Stream.zip_with", lambda d: list(Stream(d).zip_with(d, fill_none=True)), lambda d: list(zip(d, d)))
+register("Stream.collapse_to_first", lambda d: list(Stream(d).collapse_to_first(lambda x, y: y & 1)),
+         lambda d: [x for x in d if not x & 1])
+register("Stream.collapse_and_combine",
+         lambda d: list(Stream(d).collapse_and_combine(lambda x, y: y & 1, lambda x, y: x + y)),
+         lambda d: [sum(g) for _, g in groupby(d, key=lambda x: x >> 1)])
+register("Stream.collapse_and_collect",
+         lambda d: list(Stream(d).collapse_and_collect(lambda x, y: y & 1, Collector.of(list))),
+         lambda d: [list(g) for _, g in groupby(d, key=lambda x: x >> 1)])
+register("Stream.adjacent_groups", lambda d: list(Stream(d).adjacent_groups(lambda x, y: y & 1)),
+         lambda d: [list(g) for _, g in groupby(d, key=lambda x: x >> 1)])
+register("Stream.adjacent_key_groups", lambda d: list(Stream(d).adjacent_key_groups(lambda x: x >> 1)),
+         lambda d: [(k, list(g)) for k, g in groupby(d, key=lambda x: x >> 1)])
+register("Stream.group_by", lambda d: Stream(d).group_by(lambda x: x % 10).collect_dict(),
+         lambda d: {k: [x for x in d if x % 10 == k] for k in range(min(10, len(d)))},
+         covers=("Stream.group_by", "Stream.group_to_map"))
+register("Stream.stream_transform", lambda d: list(Stream(d).stream_transform(enumerate)), lambda d: list(enumerate(d)))
+
+###
+# DictStream
+###
+
+register("DictStream.__init__", lambda d: list(DictStream(d)), lambda d: list(d.items()), setup=_dict_of)
+register("DictStream.map_items", lambda d: list(DictStream(d).map_items(max)), lambda d: list(starmap(max, d.items())),
+         setup=_dict_of)
+register("DictStream.map_key_values", lambda d: DictStream(d).map_key_values(abs, abs).build_dict(),
+         lambda d: {abs(k): abs(v) for k, v in d.items()}, setup=_dict_of)
+register("DictStream.map_keys", lambda d: DictStream(d).map_keys(abs).build_dict(),
+         lambda d: {abs(k): v for k, v in d.items()}, setup=_dict_of)
+register("DictStream.filter_keys", lambda d: DictStream(d).filter_keys(lambda k: k & 1).build_dict(),
+         lambda d: {k: v for k, v in d.items() if k & 1}, setup=_dict_of)
+register("DictStream.map_values", lambda d: DictStream(d).map_values(abs).build_dict(),
+         lambda d: {k: abs(v) for k, v in d.items()}, setup=_dict_of)
+register("DictStream.filter_values", lambda d: DictStream(d).filter_values(lambda v: v & 1).build_dict(),
+         lambda d: {k: v for k, v in d.items() if v & 1}, setup=_dict_of)
+register("DictStream.add_dicts", lambda d: DictStream(d).add_dicts(d).with_overrides(d).build_dict(),
+         lambda d: dict(d), setup=_dict_of, covers=("DictStream.add_dicts", "DictStream.with_overrides"))
+register("DictStream.merge_dicts", lambda d: DictStream.merge_dicts(d, d), lambda d: {**d, **d}, setup=_dict_of,
+         covers=("DictStream.merge_dicts", "DictStream.collect_dict"))
+register("DictStream.merge_dicts[generic]", lambda d: DictStream.merge_dicts(d, d, dict_collector=lambda e: dict(e)),
+         lambda d: {**d, **d}, setup=_dict_of, covers=("DictStream.merge_dicts",))
+register("DictStream.merged_view", lambda d: DictStream.merged_view(d, {0: -1})[0], lambda d: {**d, 0: -1}[0],
+         setup=_dict_of)
+
+###
+# ColumnarStream
+###
+
+register("Stream.to_columnar", lambda d: list(Stream(d).to_columnar().records()), lambda d: [dict(r) for r in d],
+         setup=_records, covers=("Stream.to_columnar", "ColumnarStream.__init__", "ColumnarStream.records"))
+register("ColumnarStream.filter_values",
+         lambda d: sum(map(len, ColumnarStream(d[1]).filter_values((col("x") > 3) & (col("y") == "a")).batches())),
+         lambda d: len([r for r in d[0] if r["x"] > 3 and r["y"] == "a"]), setup=_records_and_batches,
+         covers=("ColumnarStream.filter_values", "ColumnarStream.batches"))
+register("ColumnarStream.map_values", lambda d: list(ColumnarStream(d[1]).map_values(col("x") * 2 + 1)),
+         lambda d: [(i, r["x"] * 2 + 1) for i, r in enumerate(d[0])], setup=_records_and_batches)
+register("ColumnarStream.with_column",
+         lambda d: list(ColumnarStream(d[1]).with_column("w", col("z") / 2).select("x", "w").records()),
+         lambda d: [{"x": r["x"], "w": r["z"] / 2} for r in d[0]], setup=_records_and_batches,
+         covers=("ColumnarStream.with_column", "ColumnarStream.select"))
+register("ColumnarStream.group_by", lambda d: dict(ColumnarStream(d[1]).group_by(col("x"))),
+         lambda d: _group_entries(d[0], lambda r: r["x"]), setup=_records_and_batches)
+
+###
+# Operators
+###
+
+register("operator.Deduplicator", lambda d: list(Deduplicator(iter(d), more_than=2)),
+         lambda d: [x for x, c in Counter(d).items() if c >= 2], setup=lambda size: list(range(size // 2)) * 2)
+register("operator.Inserter", lambda d: list(Inserter(iter(d), -1)),
+         lambda d: list(chain.from_iterable((-1, x) for x in d))[1:])
+register("operator.PairUp", lambda d: list(PairUp(iter(d))), lambda d: list(zip(d, d[1:])))
+register("operator.Zipper", lambda d: list(Zipper(d, d)), lambda d: list(zip(d, d)))
+register("operator.Collapser", lambda d: list(Collapser(iter(d), lambda x, y: y & 1, combiner=max)),
+         lambda d: [max(g) for _, g in groupby(d, key=lambda x: x >> 1)])
+register("operator.Grouper", lambda d: dict(Grouper((x % 10, x) for x in d)),
+         lambda d: {k: [x for x in d if x % 10 == k] for k in range(min(10, len(d)))})
+register("operator.ExternalSorter", lambda d: list(ExternalSorter(iter(d), reverse=True)),
+         lambda d: sorted(d, reverse=True))
+register("operator.Reverser", lambda d: list(Reverser(iter(d))), lambda d: d[::-1])
+register("operator.RepeatApply", lambda d: list(islice(RepeatApply(0, lambda x: x + 1), len(d))),
+         lambda d: list(islice(_count_up(), len(d))))
+register("operator.ConstantOf", lambda d: list(ConstantOf(0, len(d))), lambda d: list(repeat(0, len(d))))
+register("operator.Cartesian", lambda d: set(Cartesian(d, d)), lambda d: set(product(d, d)), setup=_square_root_list)
+register("operator.Splitter", lambda d: list(Splitter(io.StringIO(d), "\n")), lambda d: re.split("\n", d),
+         setup=_text_lines)
+
+###
+# Stream sources
+###
+
+register("streams.constant_of", lambda d: list(streams.constant_of(0, len(d))), lambda d: [0] * len(d))
+register("streams.iterate", lambda d: list(streams.iterate(0, lambda x: x + 1).limit(len(d))),
+         lambda d: list(range(len(d))))
+register("streams.generate", lambda d: list(streams.generate(lambda: 0).limit(len(d))), lambda d: [0] * len(d))
+register("streams.arange", lambda d: list(streams.arange(len(d))), lambda d: list(range(len(d))))
+register("streams.arange[float]", lambda d: list(streams.arange(0, len(d) / 2, 0.5)),
+         lambda d: [i * 0.5 for i in range(len(d))], covers=("streams.arange",))
+register("streams.arange[sum]", lambda d: streams.arange(len(d)).map_to_int().sum(), lambda d: sum(range(len(d))),
+         covers=("streams.arange",))
+register("streams.counter", lambda d: list(streams.counter().skip(len(d)).limit(len(d))),
+         lambda d: list(islice(count(), len(d), 2 * len(d))))
+register("streams.cartesian_product_stream", lambda d: set(streams.cartesian_product_stream(d, d)),
+         lambda d: set(product(d, d)), setup=_square_root_list)
+register("streams.cartesian_product_stream[lazy]",
+         lambda d: set(streams.cartesian_product_stream(iter(d), iter(d))), lambda d: set(product(d, d)),
+         setup=_square_root_list, covers=("streams.cartesian_product_stream",))
+register("streams.cartesian_power", lambda d: set(streams.cartesian_power(2, d)), lambda d: set(product(d, repeat=2)),
+         setup=_square_root_list)
+register("streams.product_space", lambda d: list(streams.product_space(d, d).shard(1, 2)),
+         lambda d: list(product(d, d))[len(d) ** 2 // 2:], setup=_square_root_list)
+register("streams.cartesian_power[shard]", lambda d: list(streams.cartesian_power(2, d, shard=(1, 2))),
+         lambda d: list(islice(product(d, repeat=2), len(d) ** 2 // 2, None)), setup=_square_root_list,
+         covers=("streams.cartesian_power",))
+register("streams.lines_of", lambda d: list(streams.lines_of(d)), lambda d: d.splitlines(keepends=True),
+         setup=_text_lines)
+register("streams.jsonl", lambda d: list(streams.jsonl(io.StringIO(d), ["x"], where=col("y") == "a")),
+         lambda d: [{"x": r["x"]} for r in map(json.loads, io.StringIO(d)) if r["y"] == "a"], setup=_jsonl_text)
+register("streams.csv_records",
+         lambda d: list(streams.csv_records(io.StringIO(d), ["x", "z"], types={"x": int, "z": float})),
+         lambda d: [{"x": int(r["x"]), "z": float(r["z"])} for r in csv.DictReader(io.StringIO(d))], setup=_csv_text)
+register("streams.lines_of_files", lambda d: list(streams.lines_of_files(d)), lambda d: list(gzip.open(d, "rt")),
+         setup=_gzip_members_file)
+register("streams.from_records", lambda d: list(streams.from_records(d[0])), lambda d: _pickle_read(d[1]),
+         setup=_record_files)
+register("streams.structs", lambda d: list(streams.structs(d, "<Id")), lambda d: list(_unpack_each(d, "<Id")),
+         setup=lambda size: b"".join(struct.pack("<Id", i, i / 2) for i in range(size)))
+register("streams.follow", lambda d: list(streams.follow(d, from_end=False, idle_timeout=0)),
+         lambda d: _read_lines(d), setup=_text_file)
+register("streams.split", lambda d: list(streams.split(d, "\n")), lambda d: d.split("\n"), setup=_text_lines)
+
+###
+# Collectors
+###
+
+register("Collector.collect", lambda d: CountCollector().collect(d), lambda d: sum(1 for _ in d),
+         covers=("Collector.collect", "CountCollector.collect"))
+register("Collector.of", lambda d: Collector.of(sum).collect(d), lambda d: sum(d))
+
+###
+# Pipelines
+###
+
+_SMALL_PIPELINE = Pipeline().map(abs).filter(bool).collect_as_list()
+register("Pipeline.__call__", lambda d: [_SMALL_PIPELINE(chunk) for chunk in d],
+         lambda d: [[x for x in map(abs, chunk) if x] for chunk in d],
+         setup=lambda size: [list(range(i, i + 10)) for i in range(0, size, 10)])
+
+
+###
+# Runner
+###
+
+def _measure(func: Callable[[Any], Any], arg: Any, repeat_times: int):
+    best = float("inf")
+    for _ in range(repeat_times):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run(sizes: Iterable[int] = DEFAULT_SIZES, *, repeat_times: int = 3, pattern: str = "",
+        check: bool = True) -> List[BenchResult]:
+    """
+    Run all registered benchmark cases
+    :param sizes: input sizes to benchmark on
+    :param repeat_times: best of x timing runs
+    :param pattern: only run cases whose name matches this regex
+    :param check: verify the stream implementation agrees with the baseline before timing
+    :return: list of results
+    """
+    matcher = re.compile(pattern)
+    results = []
+    for case in CASES:
+        if not matcher.search(case.name):
+            continue
+        for size in sizes:
+            data = case.setup(size)
+            if check and case.stream(data) != case.baseline(data):
+                raise AssertionError("Benchmark case %s disagrees with its baseline at size %d" % (case.name, size))
+            for impl, func in (("stream", case.stream), ("baseline", case.baseline)):
+                seconds, peak = _measure(func, data, repeat_times)
+                results.append(BenchResult(
+                    case.name, size, impl, seconds, size / seconds if seconds > 0 else float("inf"), peak))
+    return results
+
+
+def dump(results: List[BenchResult], fp) -> None:
+    json.dump({
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "results": [r._asdict() for r in results],
+    }, fp, indent=1)
+
+
+def load(fp) -> List[BenchResult]:
+    return [BenchResult(**r) for r in json.load(fp)["results"]]
+
+
+def report(results: List[BenchResult], previous: List[BenchResult] = (), out=sys.stdout) -> None:
+    """
+    Print a table of stream vs baseline throughput; with ratio to a previous run if provided
+    """
+    by_key = {(r.case, r.size, r.impl): r for r in results}
+    before = {(r.case, r.size, r.impl): r for r in previous}
+    out.write("%-40s %8s %14s %14s %8s %12s %9s\n" % (
+        "case", "size", "stream el/s", "baseline el/s", "ratio", "peak bytes", "vs prev"))
+    for (name, size, impl), result in by_key.items():
+        if impl != "stream":
+            continue
+        base = by_key[(name, size, "baseline")]
+        prev = before.get((name, size, impl))
+        out.write("%-40s %8d %14.0f %14.0f %8.2f %12d %9s\n" % (
+            name, size, result.elements_per_sec, base.elements_per_sec,
+            result.elements_per_sec / base.elements_per_sec, result.peak_bytes,
+            "%.2fx" % (result.elements_per_sec / prev.elements_per_sec) if prev else "-"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m streamer.bench",
+                                     description="Benchmark stream operations against builtin baselines.")
+    parser.add_argument("-s", "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="input sizes")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="best of x timing runs")
+    parser.add_argument("-k", "--pattern", default="", help="only run cases matching this regex")
+    parser.add_argument("-o", "--output", help="save results to this JSON file")
+    parser.add_argument("-c", "--compare", help="compare against results saved in this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, repeat_times=args.repeat, pattern=args.pattern)
+    previous = []
+    if args.compare:
+        with open(args.compare) as f:
+            previous = load(f)
+    report(results, previous)
+    if args.output:
+        with open(args.output, "w") as f:
+            dump(results, f)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.checkpoint
+---
+
+Checkpoints of long-running collections, behind `Stream.checkpoint` and `Stream.resume`.
+
+A checkpoint is the position of the stream source - the index of the next element of a list, tuple or range, the byte
+offset of a chunk of lines (and the number of its lines consumed) for a `streams.lines_of` file, the character offset
+of the next piece for a `streams.split` text - with a snapshot of the collector accumulator, pickled and appended to a
+checkpoint file. Elements are collected a block at a time between checkpoints, so the only cost per element is the
+collector itself. Appending is much cheaper than replacing a file atomically (which may wait for the disk); a crash
+while appending leaves an incomplete last record, which is ignored, and the file is compacted once it grows large.
+"""
+
+from typing import Any, Iterator, Tuple, Union
+from collections import namedtuple
+from itertools import chain, islice
+from os import PathLike
+import io
+import os
+import pickle
+import re
+import struct
+import time
+
+CHUNK_SIZE = 1 << 20
+
+# with `every_seconds`, the clock is read once per this many elements
+CLOCK_EVERY = 1024
+
+# a checkpoint file is rewritten with its last checkpoint once larger than this and than 4 checkpoints
+COMPACT_BYTES = 1 << 26
+
+_LENGTH = struct.Struct("<Q")
+
+Checkpoint = namedtuple("Checkpoint", "source position accumulator every every_seconds")
+
+_END = object()
+
+
+class PositionedSource:
+    """
+    A source able to report the position of its next element, and to start from such a position
+    """
+    def describe(self) -> Tuple:
+        """
+        Identity of the source, checked before resuming from a checkpoint
+        """
+        raise NotImplementedError("Cannot execute `describe` in abstract class `PositionedSource`.")
+
+    def tell(self) -> Any:
+        """
+        Picklable position of the next element
+        """
+        raise NotImplementedError("Cannot execute `tell` in abstract class `PositionedSource`.")
+
+    def seek(self, position: Any) -> None:
+        """
+        Start from a position reported by `tell`; before iterating only
+        """
+        raise NotImplementedError("Cannot execute `seek` in abstract class `PositionedSource`.")
+
+
+class SequenceCursor(PositionedSource):
+    """
+    Position of an iterator over a list, tuple or range, read from its pickling state
+    """
+    def __init__(self, sequence, iterator: Iterator):
+        self.__kind = type(sequence).__name__
+        self.__length = len(sequence)
+        self.__iterator = iterator
+
+    def describe(self) -> Tuple:
+        return self.__kind, self.__length
+
+    def tell(self) -> int:
+        state = self.__iterator.__reduce__()
+        # an exhausted iterator forgets its sequence
+        return state[2] if len(state) > 2 else self.__length
+
+    def seek(self, position: int) -> None:
+        self.__iterator.__setstate__(position)
+
+
+class LineFile(PositionedSource):
+    """
+    Lines of a text file, read and decoded a chunk at a time. Lines are split like in text mode (universal new lines,
+    translated to "\\n"); the encoding should be ASCII compatible, e.g. UTF-8 or Latin-1.
+    Its position is (byte offset of the current chunk, lines of it consumed).
+    """
+    def __init__(self, path: Union[str, PathLike], encoding: str = "utf-8", chunk_size: int = CHUNK_SIZE):
+        self.__path = path
+        self.__encoding = encoding
+        self.__chunk_size = chunk_size
+        self.__start = (0, 0)
+        self.__offset = 0
+        self.__lines = []
+        self.__current = iter(self.__lines)
+        self.__started = False
+
+    def describe(self) -> Tuple:
+        return "lines", os.path.abspath(os.fspath(self.__path))
+
+    def tell(self) -> Tuple[int, int]:
+        if not self.__started:
+            return self.__start
+        state = self.__current.__reduce__()
+        return self.__offset, state[2] if len(state) > 2 else len(self.__lines)
+
+    def seek(self, position: Tuple[int, int]) -> None:
+        if self.__started:
+            raise ValueError("Cannot seek a file whose lines are being read")
+        self.__start = tuple(position)
+
+    def __iter__(self) -> Iterator[str]:
+        return chain.from_iterable(self._chunks())
+
+    def _chunks(self) -> Iterator[Iterator[str]]:
+        self.__started = True
+        offset, skip = self.__start
+        with open(self.__path, "rb") as f:
+            f.seek(offset)
+            partial = b""
+            while True:
+                data = f.read(self.__chunk_size)
+                if data:
+                    data = partial + data
+                    end = data.rfind(b"\n") + 1
+                    if end == 0:
+                        partial = data
+                        continue
+                    chunk, partial = data[:end], data[end:]
+                elif partial:
+                    chunk, partial = partial, b""
+                else:
+                    return
+                # chunks end after a "\n", so lines (and "\r\n") never straddle two of them
+                lines = io.StringIO(chunk.decode(self.__encoding), newline=None).readlines()
+                if skip >= len(lines):
+                    # resuming: lines are the same whatever the chunking, only the offsets of chunks may differ
+                    skip -= len(lines)
+                    offset += len(chunk)
+                    continue
+                self.__offset = offset
+                self.__lines = lines
+                self.__current = iter(lines)
+                if skip:
+                    self.__current.__setstate__(skip)
+                    skip = 0
+                yield self.__current
+                offset += len(chunk)
+
+
+class TextSplitter(PositionedSource):
+    """
+    Pieces of a text between the matches of a regex; its position is the character offset of the next piece
+    """
+    def __init__(self, text: str, regex: str):
+        self.__text = text
+        self.__pattern = re.compile(regex)
+        self.__next = 0
+        self.__started = False
+
+    def describe(self) -> Tuple:
+        return "split", len(self.__text), self.__pattern.pattern
+
+    def tell(self) -> int:
+        return self.__next
+
+    def seek(self, position: int) -> None:
+        if self.__started:
+            raise ValueError("Cannot seek a text being split")
+        self.__next = position
+
+    def __iter__(self) -> Iterator[str]:
+        return self._pieces()
+
+    def _pieces(self) -> Iterator[str]:
+        self.__started = True
+        text = self.__text
+        start = self.__next
+        if start > len(text):
+            return
+        for match in self.__pattern.finditer(text, start):
+            piece = text[start:match.start()]
+            start = self.__next = match.end()
+            yield piece
+        # past the end once the last piece is taken
+        self.__next = len(text) + 1
+        yield text[start:]
+
+
+def cursor_of(origin: tuple, iterator: Iterator) -> Union[PositionedSource, None]:
+    """
+    The positioned source of a stream, if any
+    :param origin: the sources the stream was created with
+    :param iterator: the iterator the stream created from them
+    """
+    if len(origin) != 1:
+        return None
+    source = origin[0]
+    if isinstance(source, PositionedSource):
+        return source
+    if type(source) in (list, tuple, range):
+        return SequenceCursor(source, iterator)
+    return None
+
+
+def read_checkpoint(path: Union[str, PathLike]) -> Checkpoint:
+    """
+    The last complete checkpoint of a checkpoint file
+    """
+    last = None
+    with open(path, "rb") as f:
+        while True:
+            head = f.read(_LENGTH.size)
+            if len(head) < _LENGTH.size:
+                break
+            size, = _LENGTH.unpack(head)
+            data = f.read(size)
+            if len(data) < size:
+                break   # cut short by a crash
+            last = data
+    if last is None:
+        raise ValueError("No complete checkpoint in %s" % path)
+    return pickle.loads(last)
+
+
+def write_checkpoint(path: Union[str, PathLike], checkpoint: Checkpoint) -> None:
+    """
+    Replace a checkpoint file atomically with a single checkpoint
+    """
+    _replace(path, _record(checkpoint))
+
+
+def _record(checkpoint: Checkpoint) -> bytes:
+    data = pickle.dumps(checkpoint, pickle.HIGHEST_PROTOCOL)
+    return _LENGTH.pack(len(data)) + data
+
+
+def _replace(path: Union[str, PathLike], data: bytes) -> None:
+    temp = "%s.tmp" % os.fspath(path)
+    with open(temp, "wb") as f:
+        f.write(data)
+    os.replace(temp, path)
+
+
+class CheckpointLog:
+    """
+    A checkpoint file being written: checkpoints are appended, and flushed to the OS so that they survive a crash
+    of the process
+    """
+    def __init__(self, path: Union[str, PathLike], append: bool = False):
+        """
+        :param path: checkpoint file
+        :param append: keep the checkpoints already in the file; it is emptied otherwise
+        """
+        self.__path = path
+        self.__file = open(path, "ab" if append else "wb")
+
+    def write(self, checkpoint: Checkpoint) -> None:
+        record = _record(checkpoint)
+        if self.__file.tell() + len(record) > max(COMPACT_BYTES, 4 * len(record)):
+            self.__file.close()
+            _replace(self.__path, record)
+            self.__file = open(self.__path, "ab")
+            return
+        self.__file.write(record)
+        self.__file.flush()
+
+    def close(self) -> None:
+        self.__file.close()
+
+
+class Checkpointer:
+    """
+    Collects a stream with a collector, writing checkpoints of the source position and of the accumulator
+    """
+    def __init__(self, path: Union[str, PathLike], cursor: PositionedSource, every: Union[int, None] = None,
+                 every_seconds: Union[float, None] = None):
+        """
+        :param path: checkpoint file
+        :param cursor: the positioned source of the stream
+        :param every: elements collected between checkpoints
+        :param every_seconds: seconds between checkpoints
+        """
+        if every is None and every_seconds is None:
+            raise ValueError("Checkpoints should be taken `every` some elements and / or `every_seconds`")
+        if (every is not None and every <= 0) or (every_seconds is not None and every_seconds <= 0):
+            raise ValueError("Checkpoint intervals should be positive")
+        self.__path = path
+        self.__cursor = cursor
+        self.__every = every
+        self.__every_seconds = every_seconds
+        self.__resumed = None
+
+    @property
+    def path(self) -> Union[str, PathLike]:
+        return self.__path
+
+    @staticmethod
+    def resume(path: Union[str, PathLike], cursor: PositionedSource) -> 'Checkpointer':
+        """
+        A checkpointer continuing from the checkpoint in a file, with its intervals; the source is moved to the
+        recorded position once collected
+        """
+        checkpoint = read_checkpoint(path)
+        if checkpoint.source != cursor.describe():
+            raise ValueError("Checkpoint %s was taken on another source: %r" % (path, checkpoint.source))
+        checkpointer = Checkpointer(path, cursor, checkpoint.every, checkpoint.every_seconds)
+        checkpointer.__resumed = checkpoint
+        return checkpointer
+
+    def _save(self, log: CheckpointLog, accumulator: Any) -> None:
+        log.write(Checkpoint(self.__cursor.describe(), self.__cursor.tell(), accumulator, self.__every,
+                             self.__every_seconds))
+
+    def collect(self, stream: Iterator, collector) -> Any:
+        """
+        Collect the stream with the supplier, accumulator and finisher of a collector; a last checkpoint is written
+        once the stream is exhausted, so a rerun resumes straight to the result
+        """
+        resumed = self.__resumed
+        if resumed is not None:
+            # moved only now, so that a stream iterated otherwise still starts from the beginning
+            self.__cursor.seek(resumed.position)
+        accumulator = collector.supplier() if resumed is None else resumed.accumulator
+        accumulate = collector.accumulator
+        every, every_seconds = self.__every, self.__every_seconds
+        since, last = 0, time.monotonic()
+        log = CheckpointLog(self.__path, append=resumed is not None)
+        try:
+            while True:
+                if every_seconds is None:
+                    block = every - since
+                else:
+                    block = CLOCK_EVERY if every is None else min(CLOCK_EVERY, every - since)
+                for item in islice(stream, block - 1):
+                    accumulate(accumulator, item)
+                # the last element of a block tells whether the stream ended, without counting every element
+                item = next(stream, _END)
+                if item is _END:
+                    break
+                accumulate(accumulator, item)
+                since += block
+                if since == every or (every_seconds is not None and time.monotonic() - last >= every_seconds):
+                    self._save(log, accumulator)
+                    since, last = 0, time.monotonic()
+            self._save(log, accumulator)
+        finally:
+            log.close()
+        return collector.finisher(accumulator)
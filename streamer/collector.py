@@ -8,8 +8,10 @@ This module contains the definition and some implementations of `Collector`.
 Similar to `java.util.stream.Collector`s in Java, it packages a set of map-reduce operations.
 """
 from abc import ABCMeta, abstractmethod
-from typing import Iterable, TypeVar, Generic, Callable, Any
+from typing import Iterable, TypeVar, Generic, Callable, Any, Union
 from collections import Counter
+import random
+from .sampling import Reservoir, Strata, BernoulliSampler, Seed, check_probability, geometric_gap, log_miss
 
 T = TypeVar("T")
 A = TypeVar("A")  # Accumulator intermediate
@@ -106,6 +108,8 @@ class OneTimeCollector(Collector[T, A, R], metaclass=ABCMeta):
 
 class CountCollector(Collector[T, Any, int]):
     class _IntPointer:
+        __slots__ = ("__v",)
+
         def __init__(self, init: int = 0):
             self.__v = init
 
@@ -130,3 +134,96 @@ class CountCollector(Collector[T, Any, int]):
 
     def finisher(self, final: _IntPointer) -> int:
         return final.get()
+
+
+class BernoulliCollector(Collector[T, list, list]):
+    """
+    Collects a sample of the elements, each kept with probability p; partial samples merge by concatenation.
+    Give sharded runs no seed, otherwise every shard draws the same gaps.
+    """
+    class _Sample:
+        def __init__(self, p: float, seed: Seed):
+            self.items = []
+            self.rng = random.Random(seed)
+            self.log_q = log_miss(p)
+            self.gap = self._draw()
+
+        def _draw(self) -> Union[int, float]:
+            return geometric_gap(self.rng, self.log_q)
+
+        def add(self, elem) -> None:
+            if self.gap:
+                self.gap -= 1
+            else:
+                self.items.append(elem)
+                self.gap = self._draw()
+
+    def __init__(self, p: float, seed: Seed = None):
+        check_probability(p)
+        self.__p = p
+        self.__seed = seed
+
+    def supplier(self) -> _Sample:
+        return BernoulliCollector._Sample(self.__p, self.__seed)
+
+    def accumulator(self, acc: _Sample, elem: T) -> None:
+        acc.add(elem)
+
+    def combiner(self, acc1: _Sample, acc2: _Sample) -> _Sample:
+        acc1.items.extend(acc2.items)
+        return acc1
+
+    def finisher(self, acc: _Sample) -> list:
+        return acc.items
+
+    def collect(self, collection: Iterable[T]) -> list:
+        return list(BernoulliSampler(collection, self.__p, self.__seed))
+
+
+class ReservoirCollector(Collector[T, Reservoir, list]):
+    """
+    Collects a uniform random sample of k elements (Algorithm L); partial reservoirs merge into a uniform sample of
+    all elements. Give sharded runs no seed, otherwise every shard draws the same gaps.
+    """
+    def __init__(self, k: int, seed: Seed = None):
+        if k < 0:
+            raise ValueError("Reservoir size should not be negative")
+        self.__k = k
+        self.__seed = seed
+
+    def supplier(self) -> Reservoir:
+        return Reservoir(self.__k, self.__seed)
+
+    def accumulator(self, acc: Reservoir, elem: T) -> None:
+        acc.add(elem)
+
+    def combiner(self, acc1: Reservoir, acc2: Reservoir) -> Reservoir:
+        return acc1.merge(acc2)
+
+    def finisher(self, acc: Reservoir) -> list:
+        return acc.items
+
+    def collect(self, collection: Iterable[T]) -> list:
+        return Reservoir(self.__k, self.__seed).add_all(collection).items
+
+
+class StratifiedCollector(Collector[T, Strata, dict]):
+    """
+    Collects a uniform random sample of k elements per key group, as a dict of key -> sample
+    """
+    def __init__(self, key: Callable[[T], Any], k: int, seed: Seed = None):
+        self.__key = key
+        self.__k = k
+        self.__seed = seed
+
+    def supplier(self) -> Strata:
+        return Strata(self.__k, self.__seed)
+
+    def accumulator(self, acc: Strata, elem: T) -> None:
+        acc.add(self.__key(elem), elem)
+
+    def combiner(self, acc1: Strata, acc2: Strata) -> Strata:
+        return acc1.merge(acc2)
+
+    def finisher(self, acc: Strata) -> dict:
+        return acc.samples()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.columnar
+---
+
+Columnar record batches: N records held as one list (or array) per column under a shared schema, instead of one dict
+per record. Field names are stored once per batch and column values can be processed column-wise.
+`Row` is a lazy read-only view of a single record for functions that need rows. Used by `ColumnarStream`.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+from collections.abc import Mapping
+from itertools import compress, islice
+
+DEFAULT_BATCH_SIZE = 1024
+
+
+class Schema:
+    """
+    Ordered column names of record batches
+    """
+    __slots__ = ("names", "index")
+
+    def __init__(self, names: Iterable[Any]):
+        self.names = tuple(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        if len(self.index) != len(self.names):
+            raise ValueError("Duplicated column names in schema: %r" % (self.names,))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self.index
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Schema) and self.names == other.names
+
+    def __hash__(self):
+        return hash(self.names)
+
+    def __repr__(self):
+        return "Schema(%r)" % (self.names,)
+
+
+class Row(Mapping):
+    """
+    A lazy read-only view of a single record of a batch. `dict(row)` materializes it.
+    """
+    __slots__ = ("_batch", "_i")
+
+    def __init__(self, batch: 'RecordBatch', i: int):
+        self._batch = batch
+        self._i = i
+
+    def __getitem__(self, name):
+        batch = self._batch
+        return batch.columns[batch.schema.index[name]][self._i]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._batch.schema.names)
+
+    def __len__(self) -> int:
+        return len(self._batch.schema)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Mapping):
+            return dict(self) == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "Row(%r)" % (dict(self),)
+
+
+class RecordBatch:
+    """
+    N records held column-wise under a schema, with a key per record
+    """
+    def __init__(self, schema: Union[Schema, Iterable[Any]], columns: Sequence[Sequence[Any]],
+                 keys: Union[Sequence[Any], None] = None):
+        """
+        :param schema: the schema, or column names
+        :param columns: one list / array of values per column, in the schema order
+        :param keys: record keys; 0, 1, 2... by default
+        """
+        self.schema = schema if isinstance(schema, Schema) else Schema(schema)
+        if len(columns) != len(self.schema):
+            raise ValueError("Expected %d columns, got %d" % (len(self.schema), len(columns)))
+        self.columns = list(columns)
+        self.size = len(self.columns[0]) if self.columns else (0 if keys is None else len(keys))
+        if any(len(c) != self.size for c in self.columns):
+            raise ValueError("Columns of a record batch should have the same length")
+        self.keys = range(self.size) if keys is None else keys
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping], schema: Union[Schema, Iterable[Any], None] = None,
+                     keys: Union[Sequence[Any], None] = None) -> 'RecordBatch':
+        """
+        Pivot dict-like records into columns
+        :param records: dict-like records
+        :param schema: columns to keep; keys of the first record by default. Missing fields are None.
+        :param keys: record keys; 0, 1, 2... by default
+        """
+        records = records if isinstance(records, list) else list(records)
+        if schema is None:
+            schema = Schema(records[0] if records else ())
+        elif not isinstance(schema, Schema):
+            schema = Schema(schema)
+        columns = [[record.get(name) for record in records] for name in schema.names]
+        return cls(schema, columns, range(len(records)) if keys is None else keys)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def column(self, name) -> Sequence[Any]:
+        return self.columns[self.schema.index[name]]
+
+    def column_dict(self) -> Dict[Any, Sequence[Any]]:
+        return dict(zip(self.schema.names, self.columns))
+
+    def rows(self) -> Iterator[Row]:
+        """
+        Lazy row views of all records
+        """
+        return map(Row, [self] * self.size, range(self.size))
+
+    def items(self) -> Iterator[Tuple[Any, Row]]:
+        """
+        (key, lazy row view) of all records
+        """
+        return zip(self.keys, self.rows())
+
+    def to_records(self) -> List[dict]:
+        """
+        Materialize all records as dicts
+        """
+        names = self.schema.names
+        return [dict(zip(names, values)) for values in zip(*self.columns)] if names else [{} for _ in range(self.size)]
+
+    def select(self, *names) -> 'RecordBatch':
+        """
+        Keep only the given columns (no copy of column data)
+        """
+        return RecordBatch(Schema(names), [self.column(name) for name in names], self.keys)
+
+    def with_column(self, name, values: Sequence[Any]) -> 'RecordBatch':
+        """
+        Add or replace a column
+        """
+        if name in self.schema:
+            columns = list(self.columns)
+            columns[self.schema.index[name]] = values
+            return RecordBatch(self.schema, columns, self.keys)
+        return RecordBatch(Schema(self.schema.names + (name,)), self.columns + [values], self.keys)
+
+    def compress(self, mask: Iterable[Any]) -> 'RecordBatch':
+        """
+        Keep the records of truthy mask values
+        """
+        mask = mask.tolist() if hasattr(mask, "tolist") else list(mask)
+        if all(mask):
+            return self
+        return RecordBatch(self.schema, [_compress_column(c, mask) for c in self.columns],
+                           list(compress(self.keys, mask)))
+
+    def __repr__(self):
+        return "RecordBatch(%r, size=%d)" % (self.schema, self.size)
+
+
+def _compress_column(column: Sequence[Any], mask: List[Any]) -> Sequence[Any]:
+    if hasattr(column, "dtype"):    # NumPy array
+        return column[[bool(m) for m in mask]]
+    return list(compress(column, mask))
+
+
+def batches_of(records: Iterable[Mapping], batch_size: int = DEFAULT_BATCH_SIZE,
+               schema: Union[Schema, Iterable[Any], None] = None) -> Iterator[RecordBatch]:
+    """
+    Pivot dict-like records into record batches keyed by record index
+    :param records: dict-like records
+    :param batch_size: records per batch
+    :param schema: columns to keep; keys of the first record by default
+    """
+    records = iter(records)
+    if schema is not None and not isinstance(schema, Schema):
+        schema = Schema(schema)
+    start = 0
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            return
+        if schema is None:
+            schema = Schema(chunk[0])
+        yield RecordBatch.from_records(chunk, schema, range(start, start + len(chunk)))
+        start += len(chunk)
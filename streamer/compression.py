@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.compression
+---
+
+Compression-aware text files built on the standard library (gzip, bz2, lzma), used by `streams.lines_of`,
+`streams.lines_of_files` and `Stream.to_file`.
+Decompression happens on worker threads (zlib, bz2 and lzma release the GIL): the members of a multi-member gzip file,
+and several input files, are decompressed in parallel while their order is preserved.
+"""
+
+from typing import BinaryIO, Iterable, Iterator, List, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from os import PathLike
+import bz2
+import gzip
+import io
+import lzma
+import mmap
+import os
+import queue
+import threading
+import zlib
+
+GZIP = "gzip"
+BZ2 = "bz2"
+XZ = "xz"
+AUTO = "auto"
+
+BLOCK_SIZE = 1 << 20
+
+_MAGIC = ((b"\x1f\x8b", GZIP), (b"BZh", BZ2), (b"\xfd7zXZ\x00", XZ))
+_EXTENSIONS = {".gz": GZIP, ".gzip": GZIP, ".bz2": BZ2, ".xz": XZ, ".lzma": XZ}
+_OPENERS = {GZIP: gzip.open, BZ2: bz2.open, XZ: lzma.open}
+_FILE_CLASSES = {GZIP: lambda fileobj: gzip.GzipFile(fileobj=fileobj), BZ2: bz2.BZ2File, XZ: lzma.LZMAFile}
+
+Path = Union[str, PathLike]
+
+
+def default_workers() -> int:
+    return min(4, os.cpu_count() or 1)
+
+
+def detect(head: bytes) -> Union[str, None]:
+    """
+    Detect the compression format from the leading bytes of a file
+    :param head: leading bytes
+    :return: "gzip", "bz2", "xz", or None if not compressed
+    """
+    for magic, compression in _MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def compression_of_path(path: Path) -> Union[str, None]:
+    """
+    Guess the compression format from a file extension
+    """
+    return _EXTENSIONS.get(os.path.splitext(os.fspath(path))[1].lower())
+
+
+def _resolve(compression: Union[str, None], path: Path, mode: str) -> Union[str, None]:
+    if compression != AUTO:
+        if compression is not None and compression not in _OPENERS:
+            raise ValueError("Unknown compression: %s" % compression)
+        return compression
+    if "r" in mode:
+        with open(path, "rb") as f:
+            return detect(f.read(6))
+    return compression_of_path(path)
+
+
+def open_text(path: Path, mode: str = "rt", *, compression: Union[str, None] = AUTO, encoding: str = "utf-8",
+              compresslevel: Union[int, None] = None):
+    """
+    Open a possibly compressed text file
+    :param path: file path
+    :param mode: "rt", "wt" or "at"
+    :param compression: "gzip", "bz2", "xz", None; or "auto" - by magic bytes for reading, by extension for writing
+    :param encoding: text encoding
+    :param compresslevel: compression level for writing; 6 for gzip / xz, 9 for bz2 by default
+    :return: text file object
+    """
+    compression = _resolve(compression, path, mode)
+    if compression is None:
+        return open(path, mode, encoding=encoding)
+    options = {}
+    if "r" not in mode:
+        if compression == XZ:
+            options["preset"] = 6 if compresslevel is None else compresslevel
+        else:
+            options["compresslevel"] = (6 if compression == GZIP else 9) if compresslevel is None else compresslevel
+    return _OPENERS[compression](path, mode, encoding=encoding, **options)
+
+
+def text_reader(fileobj: BinaryIO, encoding: str = "utf-8") -> io.TextIOBase:
+    """
+    Wrap an open binary file as text, decompressing it if its leading bytes show a compression format
+    """
+    buffered = fileobj if hasattr(fileobj, "peek") else io.BufferedReader(fileobj)
+    compression = detect(buffered.peek(6)[:6])
+    if compression is not None:
+        buffered = _FILE_CLASSES[compression](buffered)
+    return io.TextIOWrapper(buffered, encoding=encoding)
+
+
+class _BlocksIO(io.RawIOBase):
+    """
+    A read-only raw stream over an iterator of bytes blocks
+    """
+    def __init__(self, blocks: Iterator[bytes]):
+        self.__blocks = blocks
+        self.__current = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not len(self.__current):
+            block = next(self.__blocks, None)
+            if block is None:
+                return 0
+            self.__current = memoryview(block)
+        n = min(len(buffer), len(self.__current))
+        buffer[:n] = self.__current[:n]
+        self.__current = self.__current[n:]
+        return n
+
+    def close(self):
+        close = getattr(self.__blocks, "close", None)
+        if close is not None:
+            close()
+        super(_BlocksIO, self).close()
+
+
+def _plausible_gzip_header(data, offset: int) -> bool:
+    # magic, deflate method, no reserved flags, known extra flags
+    return data[offset + 3] & 0xe0 == 0 and data[offset + 8] in (0, 2, 4)
+
+
+def gzip_members(data) -> List[int]:
+    """
+    Candidate start offsets of gzip members in a compressed buffer
+    """
+    offsets = []
+    position = data.find(b"\x1f\x8b\x08")
+    while position >= 0:
+        if position + 10 <= len(data) and _plausible_gzip_header(data, position):
+            offsets.append(position)
+        position = data.find(b"\x1f\x8b\x08", position + 1)
+    return offsets
+
+
+def _inflate_member(data, start: int, end: int) -> Tuple[bytes, bool]:
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    content = decompressor.decompress(data[start:end])
+    return content, decompressor.eof and not decompressor.unused_data
+
+
+def _inflate_rest(data, start: int) -> Iterator[bytes]:
+    decompressor, in_member = zlib.decompressobj(16 + zlib.MAX_WBITS), False
+    for offset in range(start, len(data), BLOCK_SIZE):
+        chunk = data[offset:offset + BLOCK_SIZE]
+        while chunk:
+            in_member = True
+            yield decompressor.decompress(chunk)
+            chunk = b""
+            if decompressor.eof:
+                chunk = decompressor.unused_data
+                decompressor, in_member = zlib.decompressobj(16 + zlib.MAX_WBITS), False
+    if in_member:
+        raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+
+
+def _parallel_gzip_blocks(data, offsets: List[int], workers: int) -> Iterator[bytes]:
+    bounds = iter(zip(offsets, offsets[1:] + [len(data)]))
+    with ThreadPoolExecutor(workers) as executor:
+        pending = deque()
+
+        def submit_next() -> None:
+            member = next(bounds, None)
+            if member is not None:
+                pending.append((member, executor.submit(_inflate_member, data, *member)))
+
+        for _ in range(workers * 2):
+            submit_next()
+        position = 0
+        while pending:
+            (start, end), future = pending.popleft()
+            submit_next()
+            content, complete = future.result()
+            if start != position or not complete:
+                # a false member boundary inside compressed data, inflate the rest sequentially
+                for _, f in pending:
+                    f.cancel()
+                for block in _inflate_rest(data, position):
+                    yield block
+                return
+            position = end
+            yield content
+
+
+def _file_blocks(path: Path, workers: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        compression = detect(f.read(6))
+        if compression == GZIP and workers > 1:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                offsets = gzip_members(data)
+                if len(offsets) > 1 and offsets[0] == 0:
+                    for block in _parallel_gzip_blocks(data, offsets, workers):
+                        yield block
+                    return
+            finally:
+                data.close()
+    opener = open if compression is None else _OPENERS[compression]
+    with opener(path, "rb") as f:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                return
+            yield block
+
+
+_END = object()
+
+
+def _produce(blocks: Iterator[bytes], channel: queue.Queue, cancelled: threading.Event) -> None:
+    try:
+        for block in blocks:
+            while True:
+                if cancelled.is_set():
+                    return
+                try:
+                    channel.put(block, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+        channel.put(_END)
+    except BaseException as e:
+        channel.put(e)
+
+
+def prefetched(sources: Iterable[Iterator[bytes]], workers: int, depth: int = 4) -> Iterator[Iterator[bytes]]:
+    """
+    Run up to `workers` block iterators ahead on background threads, yielding their outputs in order
+    :param sources: block iterators, e.g. of decompressed files
+    :param workers: number of sources read ahead concurrently
+    :param depth: blocks buffered per source
+    :return: iterator of block iterators, in the order of sources
+    """
+    sources = iter(sources)
+    cancelled = threading.Event()
+    running = deque()
+
+    def start_next() -> None:
+        source = next(sources, None)
+        if source is not None:
+            channel = queue.Queue(depth)
+            thread = threading.Thread(target=_produce, args=(source, channel, cancelled), daemon=True)
+            thread.start()
+            running.append(channel)
+
+    def drain(channel: queue.Queue) -> Iterator[bytes]:
+        while True:
+            block = channel.get()
+            if block is _END:
+                return
+            if isinstance(block, BaseException):
+                raise block
+            yield block
+
+    try:
+        for _ in range(max(workers, 1)):
+            start_next()
+        while running:
+            channel = running.popleft()
+            yield drain(channel)
+            start_next()
+    finally:
+        cancelled.set()
+
+
+def lines_of_files(paths: Iterable[Path], *, workers: Union[int, None] = None, encoding: str = "utf-8") \
+        -> Iterator[str]:
+    """
+    A generator of lines of (possibly compressed) files, decompressed on worker threads in order
+    :param paths: file paths
+    :param workers: number of decompression threads; `min(4, cpu count)` by default
+    :param encoding: text encoding
+    """
+    workers = default_workers() if workers is None else workers
+    paths = list(paths)
+    # Each file is split across the threads when it is the only one; files are prefetched in parallel otherwise
+    file_workers = workers if len(paths) == 1 else 1
+    for blocks in prefetched((_file_blocks(path, file_workers) for path in paths), workers):
+        reader = io.TextIOWrapper(io.BufferedReader(_BlocksIO(blocks), BLOCK_SIZE), encoding=encoding)
+        try:
+            for line in reader:
+                yield line
+        finally:
+            reader.close()
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.distributed
+---
+
+A small multi-node shard executor over TCP.
+
+Workers are processes serving `python -m streamer.distributed --host HOST --port PORT`. A coordinator -
+`DistributedCollector` - splits a stream into shards and sends them to the workers along with a pipeline function and
+a `Collector`. Each worker runs the pipeline on a shard and accumulates the result into a partial accumulator, which
+goes back to the coordinator and is merged with the collector's `combiner`, in shard order.
+
+Backpressure: only a bounded number of shards are pulled from the source and in flight at any time.
+Failures: a shard whose worker fails, or whose pipeline raises, is retried on the next free worker; a worker whose
+connection keeps failing is dropped.
+
+Messages are length-prefixed pickles: run workers on trusted networks only. Workers bind to localhost by default.
+"""
+
+from typing import Any, Callable, Iterable, Iterator, List, Tuple, Union
+from itertools import islice
+import argparse
+import importlib
+import os
+import pickle
+import queue
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+import traceback
+from .collector import Collector
+
+Address = Tuple[str, int]
+PipelineFunction = Union[Callable[[Any], Iterable], str, None]
+
+DEFAULT_SHARD_SIZE = 10000
+DEFAULT_HOST = "127.0.0.1"
+
+_LENGTH = struct.Struct("<Q")
+_STOP = object()
+
+
+class ShardError(RuntimeError):
+    """
+    A shard failed on every attempt
+    """
+    def __init__(self, shard_index: int, reason: str):
+        super(ShardError, self).__init__("Shard %d failed: %s" % (shard_index, reason))
+        self.shard_index = shard_index
+        self.reason = reason
+
+
+def send_message(sock: socket.socket, message: Any) -> None:
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def _receive_exactly(sock: socket.socket, size: int) -> bytearray:
+    data = bytearray(size)
+    view = memoryview(data)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise EOFError("Connection closed")
+        received += n
+    return data
+
+
+def receive_message(sock: socket.socket) -> Any:
+    length, = _LENGTH.unpack(_receive_exactly(sock, _LENGTH.size))
+    return pickle.loads(_receive_exactly(sock, length))
+
+
+def resolve_pipeline(pipeline: PipelineFunction) -> Callable[[Any], Iterable]:
+    """
+    :param pipeline: a callable (e.g. a module level function or a `Pipeline`), a "module:function" import path, or
+        None for shards that are the elements themselves
+    """
+    if pipeline is None:
+        return lambda shard: shard
+    if isinstance(pipeline, str):
+        module, _, name = pipeline.partition(":")
+        target = importlib.import_module(module)
+        for attr in name.split("."):
+            target = getattr(target, attr)
+        return target
+    return pipeline
+
+
+###
+# Worker
+###
+
+class _WorkerHandler(socketserver.StreamRequestHandler):
+    """
+    One coordinator connection: a ("setup", pipeline, collector) message, then ("shard", shard) messages each answered
+    by ("ok", partial accumulator) or ("error", traceback)
+    """
+    def handle(self):
+        sock = self.request
+        pipeline, collector = None, None
+        while True:
+            try:
+                message = receive_message(sock)
+            except (EOFError, ConnectionError):
+                return
+            try:
+                if message[0] == "setup":
+                    pipeline, collector = resolve_pipeline(message[1]), message[2]
+                    continue
+                acc = collector.supplier()
+                for elem in pipeline(message[1]):
+                    collector.accumulator(acc, elem)
+                reply = ("ok", acc)
+            except Exception:
+                reply = ("error", traceback.format_exc())
+            try:
+                send_message(sock, reply)
+            except pickle.PicklingError:
+                send_message(sock, ("error", traceback.format_exc()))
+
+
+class WorkerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Address = (DEFAULT_HOST, 0)):
+        super(WorkerServer, self).__init__(address, _WorkerHandler)
+
+    @property
+    def address(self) -> Address:
+        return self.server_address[:2]
+
+
+def serve(host: str = DEFAULT_HOST, port: int = 0) -> None:
+    """
+    Serve shards forever; prints "listening HOST PORT" once ready
+    """
+    with WorkerServer((host, port)) as server:
+        print("listening %s %d" % server.address, flush=True)
+        server.serve_forever()
+
+
+class LocalWorkers:
+    """
+    Worker processes on localhost, as a context manager: `with LocalWorkers(4) as workers: ...workers.addresses`
+    """
+    def __init__(self, count: int, *, python: str = sys.executable):
+        self.__count = count
+        self.__python = python
+        self.__processes = []
+        self.addresses = []     # type: List[Address]
+
+    def start(self) -> 'LocalWorkers':
+        package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            [package_root, os.getcwd()] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+        try:
+            for _ in range(self.__count):
+                process = subprocess.Popen([self.__python, "-m", "streamer.distributed", "--port", "0"],
+                                           stdout=subprocess.PIPE, env=env, universal_newlines=True)
+                self.__processes.append(process)
+                _, host, port = process.stdout.readline().split()
+                self.addresses.append((host, int(port)))
+        except BaseException:
+            self.stop()
+            raise
+        return self
+
+    def kill(self, index: int) -> None:
+        """
+        Kill a worker, e.g. to exercise retries
+        """
+        self.__processes[index].kill()
+        self.__processes[index].wait()
+
+    def stop(self) -> None:
+        for process in self.__processes:
+            process.kill()
+            process.wait()
+            process.stdout.close()
+        self.__processes = []
+
+    def __enter__(self) -> 'LocalWorkers':
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+
+
+###
+# Coordinator
+###
+
+def shards_of(elements: Iterable[Any], shard_size: int) -> Iterator[List[Any]]:
+    elements = iter(elements)
+    while True:
+        shard = list(islice(elements, shard_size))
+        if not shard:
+            return
+        yield shard
+
+
+class DistributedCollector(Collector):
+    """
+    Collects a stream on remote workers: `stream.collect(DistributedCollector(CountCollector(), addresses, pipeline))`
+    """
+    def __init__(self, collector: Collector, workers: Iterable[Address], pipeline: PipelineFunction = None, *,
+                 shard_size: int = DEFAULT_SHARD_SIZE, max_in_flight: Union[int, None] = None, retries: int = 2,
+                 timeout: Union[float, None] = None):
+        """
+        :param collector: the collector run on every shard; it and its accumulators should pickle
+        :param workers: (host, port) addresses of worker servers
+        :param pipeline: the function turning a shard into the elements to collect: a picklable callable (e.g. a
+            module level function or a `Pipeline`), a "module:function" import path resolved on the workers, or None
+        :param shard_size: elements per shard, when splitting a stream
+        :param max_in_flight: shards pulled from the source and not merged yet; 2 per worker by default
+        :param retries: extra attempts of a shard failing on a worker, and reconnections to a failing worker (which do
+            not use up the attempts of its shard)
+        :param timeout: socket timeout in seconds for connecting and for a shard's result
+        """
+        if collector.SIMPLE_FLAG:
+            raise ValueError("Distributed collection needs a collector with supplier / accumulator / combiner")
+        self.__collector = collector
+        self.__workers = list(workers)
+        if not self.__workers:
+            raise ValueError("At least one worker address is needed")
+        self.__pipeline = pipeline
+        self.__shard_size = shard_size
+        self.__max_in_flight = max_in_flight or 2 * len(self.__workers)
+        self.__retries = retries
+        self.__timeout = timeout
+
+    def supplier(self):
+        return self.__collector.supplier()
+
+    def accumulator(self, acc, elem) -> None:
+        self.__collector.accumulator(acc, elem)
+
+    def combiner(self, acc1, acc2):
+        return self.__collector.combiner(acc1, acc2)
+
+    def finisher(self, acc):
+        return self.__collector.finisher(acc)
+
+    def collect(self, collection: Iterable[Any]) -> Any:
+        """
+        Split the elements into shards of `shard_size` and collect them on the workers
+        """
+        return self.collect_shards(shards_of(collection, self.__shard_size))
+
+    def collect_shards(self, shards: Iterable[Any]) -> Any:
+        """
+        Collect pre-split shards, each passed to the pipeline function as is (e.g. file paths, or ranges)
+        """
+        return self.finisher(_ShardRun(self.__collector, self.__workers, self.__pipeline, self.__max_in_flight,
+                                       self.__retries, self.__timeout).run(shards))
+
+
+class _ShardRun:
+    """
+    State of one distributed collection: a thread per worker takes shards from a shared queue
+    """
+    def __init__(self, collector: Collector, workers: List[Address], pipeline: PipelineFunction, max_in_flight: int,
+                 retries: int, timeout: Union[float, None]):
+        self.__collector = collector
+        self.__workers = workers
+        self.__pipeline = pipeline
+        self.__max_in_flight = max_in_flight
+        self.__retries = retries
+        self.__timeout = timeout
+
+        self.__tasks = queue.Queue()
+        self.__state = threading.Condition()
+        self.__pending = 0      # shards pulled and not merged yet
+        self.__alive = len(workers)
+        self.__error = None
+        self.__lost = None      # failure of the last worker given up
+        self.__ready = {}       # shard index -> accumulator, waiting for earlier shards
+        self.__next = 0
+        self.__acc = collector.supplier()
+
+    def run(self, shards: Iterable[Any]) -> Any:
+        threads = [threading.Thread(target=self._serve, args=(address,), daemon=True) for address in self.__workers]
+        for thread in threads:
+            thread.start()
+        try:
+            for index, shard in enumerate(shards):
+                with self.__state:
+                    self._wait_until(lambda: self.__pending < self.__max_in_flight)
+                    self.__pending += 1
+                self.__tasks.put((index, shard, 0))
+            with self.__state:
+                self._wait_until(lambda: self.__pending == 0)
+        finally:
+            with self.__state:
+                if self.__error is None and self.__pending:
+                    self.__error = RuntimeError("Distributed collection interrupted")
+            for _ in threads:
+                self.__tasks.put(_STOP)
+        for thread in threads:
+            thread.join()
+        return self.__acc
+
+    def _wait_until(self, condition: Callable[[], bool]) -> None:
+        while not condition():
+            if self.__error is not None:
+                raise self.__error
+            if self.__alive == 0:
+                raise RuntimeError("No worker left, the last one failed with: %s" % self.__lost)
+            self.__state.wait()
+        if self.__error is not None:
+            raise self.__error
+
+    def _connect(self, address: Address) -> socket.socket:
+        sock = socket.create_connection(address, timeout=self.__timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        send_message(sock, ("setup", self.__pipeline, self.__collector))
+        return sock
+
+    def _serve(self, address: Address) -> None:
+        sock = None
+        failures = 0
+        try:
+            while True:
+                task = self.__tasks.get()
+                if task is _STOP:
+                    return
+                if self.__error is not None:
+                    continue
+                index, shard, attempts = task
+                try:
+                    if sock is None:
+                        sock = self._connect(address)
+                    send_message(sock, ("shard", shard))
+                    status, payload = receive_message(sock)
+                except (OSError, EOFError) as e:
+                    if sock is not None:
+                        sock.close()
+                        sock = None
+                    failures += 1
+                    # the worker failed, not the shard: another worker takes it without using up its attempts
+                    self.__tasks.put(task)
+                    if failures > self.__retries:
+                        self.__lost = "worker %s:%d - %r" % (address[0], address[1], e)
+                        return  # the worker is gone
+                    continue
+                failures = 0
+                if status == "ok":
+                    self._merge(index, payload)
+                else:
+                    self._retry(task, payload)
+        finally:
+            if sock is not None:
+                sock.close()
+            with self.__state:
+                self.__alive -= 1
+                self.__state.notify_all()
+
+    def _retry(self, task: Tuple[int, Any, int], reason: str) -> None:
+        index, shard, attempts = task
+        if attempts < self.__retries:
+            self.__tasks.put((index, shard, attempts + 1))
+            return
+        with self.__state:
+            if self.__error is None:
+                self.__error = ShardError(index, reason)
+            self.__state.notify_all()
+
+    def _merge(self, index: int, acc: Any) -> None:
+        with self.__state:
+            self.__ready[index] = acc
+            while self.__next in self.__ready:
+                self.__acc = self.__collector.combiner(self.__acc, self.__ready.pop(self.__next))
+                self.__next += 1
+                self.__pending -= 1
+            self.__state.notify_all()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m streamer.distributed", description="Serve stream shards over TCP.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="interface to bind, localhost by default")
+    parser.add_argument("--port", type=int, default=0, help="port to bind, any free port by default")
+    args = parser.parse_args(argv)
+    try:
+        serve(args.host, args.port)
+    except KeyboardInterrupt:   # pragma: no cover
+        pass
+
+
+if __name__ == "__main__":
+    main()
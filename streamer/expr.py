@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.expr
+---
+
+Column expressions over record streams, e.g. `(col("x") > 3) & (col("y") == "a")`.
+Expressions are accepted by `Stream.filter`, `Stream.map` and `DictStream.filter_values`. On row records they are
+compiled into a single generated row function (no nested lambda calls) run record by record: gathering rows into
+column batches first costs more than it saves. On data already held in columns (`ColumnarStream`) they are evaluated
+column-wise, with NumPy when available.
+Expression trees stay introspectable (`op`, `args`, `columns()`, `to_tuple()`) so that sources can push them down.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, Tuple, TypeVar, Union
+import operator
+
+try:
+    import numpy
+except ImportError:     # pragma: no cover - NumPy is optional
+    numpy = None
+
+T = TypeVar('T')
+
+
+class Expr:
+    """
+    A node of a column expression tree
+    """
+    op = None   # type: str
+    args = ()   # type: Tuple
+
+    # `==` builds an expression, identity hashing keeps expressions usable in sets / dicts
+    __hash__ = object.__hash__
+
+    def __bool__(self):
+        raise TypeError("Column expressions have no truth value; combine them with `&`, `|` and `~`.")
+
+    def columns(self) -> Set[Any]:
+        """
+        All column names referenced by this expression
+        """
+        result = set()
+        for arg in self.args:
+            if isinstance(arg, Expr):
+                result |= arg.columns()
+        return result
+
+    def to_tuple(self) -> Tuple:
+        """
+        A plain nested tuple form, e.g. `(">", ("col", "x"), ("lit", 3))`, for sources to translate and push down
+        """
+        return (self.op,) + tuple(arg.to_tuple() if isinstance(arg, Expr) else arg for arg in self.args)
+
+    # Row-wise evaluation
+    def _source(self, literals: List[Any], variables: Union[Dict[Any, str], None] = None) -> str:
+        raise NotImplementedError("Abstract expression cannot be compiled")
+
+    def compile(self) -> Callable[[Any], Any]:
+        """
+        Compile into a plain (row -> value) function
+        """
+        source, namespace = self._codegen()
+        return eval("lambda r: " + source, namespace)
+
+    def _codegen(self, variables: Union[Dict[Any, str], None] = None) -> Tuple[str, dict]:
+        literals = []
+        source = self._source(literals, variables)
+        if self.op in ("and", "or"):
+            source = "(True if %s else False)" % source
+        return source, {"_l%d" % i: value for i, value in enumerate(literals)}
+
+    # Column-wise evaluation
+    def _batch(self, columns: dict):
+        raise NotImplementedError("Abstract expression cannot be evaluated")
+
+    def evaluate_batch(self, rows: list) -> list:
+        """
+        Evaluate on a list of row records, with the compiled row function
+        :param rows: list of records supporting `row[column]`
+        :return: list of values, one per row
+        """
+        return list(map(self._compiled(), rows))
+
+    def evaluate_columns(self, columns: dict, size: int):
+        """
+        Evaluate column-wise on data held in columns
+        :param columns: dict of column name -> list / array of `size` values
+        :param size: number of rows
+        :return: list of values, one per row; a NumPy array if all referenced columns are NumPy arrays
+        """
+        names = sorted(self.columns(), key=repr)
+        if numpy is not None and names and all(isinstance(columns[name], numpy.ndarray) for name in names):
+            try:
+                result = self._batch(columns)
+                if getattr(result, "shape", ()) == (size,):
+                    return result
+            except (TypeError, ValueError):
+                pass
+        if not names:
+            return [self._compiled()(None)] * size
+        return self._compiled_columns(names)(*(columns[name] for name in names))
+
+    def compile_columns(self, names: List[Any]) -> Callable[..., list]:
+        """
+        Compile into a (column, column, ... -> list of values) function, looping over all columns in a single
+        generated list comprehension
+        :param names: referenced column names, in the order of the function arguments
+        """
+        variables = {name: "_c%d" % i for i, name in enumerate(names)}
+        source, namespace = self._codegen(variables)
+        arguments = ", ".join("_v%d" % i for i in range(len(names)))
+        if len(names) == 1:
+            loop = "_c0 in _v0"
+        else:
+            loop = "%s in zip(%s)" % (", ".join(variables[name] for name in names), arguments)
+        return eval("lambda %s: [%s for %s]" % (arguments, source, loop), namespace)
+
+    def _compiled_columns(self, names: List[Any]) -> Callable[..., list]:
+        cache = self.__dict__.setdefault("_compiled_columns_funcs", {})
+        key = tuple(names)
+        if key not in cache:
+            cache[key] = self.compile_columns(names)
+        return cache[key]
+
+    def _compiled(self) -> Callable[[Any], Any]:
+        compiled = self.__dict__.get("_compiled_func")
+        if compiled is None:
+            compiled = self.__dict__["_compiled_func"] = self.compile()
+        return compiled
+
+    def __call__(self, row) -> Any:
+        return self._compiled()(row)
+
+    # Builders
+    def __eq__(self, other):
+        return BinaryOp("==", self, other)
+
+    def __ne__(self, other):
+        return BinaryOp("!=", self, other)
+
+    def __lt__(self, other):
+        return BinaryOp("<", self, other)
+
+    def __le__(self, other):
+        return BinaryOp("<=", self, other)
+
+    def __gt__(self, other):
+        return BinaryOp(">", self, other)
+
+    def __ge__(self, other):
+        return BinaryOp(">=", self, other)
+
+    def __add__(self, other):
+        return BinaryOp("+", self, other)
+
+    def __radd__(self, other):
+        return BinaryOp("+", other, self)
+
+    def __sub__(self, other):
+        return BinaryOp("-", self, other)
+
+    def __rsub__(self, other):
+        return BinaryOp("-", other, self)
+
+    def __mul__(self, other):
+        return BinaryOp("*", self, other)
+
+    def __rmul__(self, other):
+        return BinaryOp("*", other, self)
+
+    def __truediv__(self, other):
+        return BinaryOp("/", self, other)
+
+    def __rtruediv__(self, other):
+        return BinaryOp("/", other, self)
+
+    def __floordiv__(self, other):
+        return BinaryOp("//", self, other)
+
+    def __mod__(self, other):
+        return BinaryOp("%", self, other)
+
+    def __pow__(self, other):
+        return BinaryOp("**", self, other)
+
+    def __neg__(self):
+        return UnaryOp("neg", self)
+
+    def __and__(self, other):
+        return BinaryOp("and", self, other)
+
+    def __rand__(self, other):
+        return BinaryOp("and", other, self)
+
+    def __or__(self, other):
+        return BinaryOp("or", self, other)
+
+    def __ror__(self, other):
+        return BinaryOp("or", other, self)
+
+    def __invert__(self):
+        return UnaryOp("not", self)
+
+    def isin(self, values: Iterable):
+        return IsIn(self, frozenset(values))
+
+    def is_none(self):
+        return UnaryOp("is_none", self)
+
+    def __repr__(self):
+        return self._source([])
+
+
+class Col(Expr):
+    op = "col"
+
+    def __init__(self, name):
+        self.args = (name,)
+
+    @property
+    def name(self):
+        return self.args[0]
+
+    def columns(self) -> Set[Any]:
+        return {self.name}
+
+    def _source(self, literals: List[Any], variables: Union[Dict[Any, str], None] = None) -> str:
+        if variables is not None:
+            return variables[self.name]
+        # bound like a literal: names without a literal repr (enums, custom keys) compile too
+        literals.append(self.name)
+        return "r[_l%d]" % (len(literals) - 1)
+
+    def _batch(self, columns: dict):
+        return columns[self.name]
+
+    def __repr__(self):
+        return "col(%r)" % (self.name,)
+
+
+class Lit(Expr):
+    op = "lit"
+
+    def __init__(self, value):
+        self.args = (value,)
+
+    def _source(self, literals: List[Any], variables: Union[Dict[Any, str], None] = None) -> str:
+        literals.append(self.args[0])
+        return "_l%d" % (len(literals) - 1)
+
+    def _batch(self, columns: dict):
+        return self.args[0]
+
+    def __repr__(self):
+        return repr(self.args[0])
+
+
+def _as_expr(value) -> Expr:
+    return value if isinstance(value, Expr) else Lit(value)
+
+
+_ROW_TEMPLATES = {
+    "==": "(%s == %s)", "!=": "(%s != %s)", "<": "(%s < %s)", "<=": "(%s <= %s)", ">": "(%s > %s)",
+    ">=": "(%s >= %s)", "+": "(%s + %s)", "-": "(%s - %s)", "*": "(%s * %s)", "/": "(%s / %s)",
+    "//": "(%s // %s)", "%": "(%s %% %s)", "**": "(%s ** %s)",
+    "and": "(%s and %s)", "or": "(%s or %s)",
+    "neg": "(-%s)", "not": "(not %s)", "is_none": "(%s is None)",
+}
+
+_BATCH_OPERATORS = {
+    "==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv, "//": operator.floordiv,
+    "%": operator.mod, "**": operator.pow,
+}
+
+
+class BinaryOp(Expr):
+    def __init__(self, op: str, left, right):
+        self.op = op
+        self.args = (_as_expr(left), _as_expr(right))
+
+    def _source(self, literals: List[Any], variables: Union[Dict[Any, str], None] = None) -> str:
+        return _ROW_TEMPLATES[self.op] % (
+            self.args[0]._source(literals, variables), self.args[1]._source(literals, variables))
+
+    def _batch(self, columns: dict):
+        left, right = (arg._batch(columns) for arg in self.args)
+        if self.op == "and":
+            return numpy.logical_and(left, right)
+        if self.op == "or":
+            return numpy.logical_or(left, right)
+        result = _BATCH_OPERATORS[self.op](left, right)
+        if result is NotImplemented or isinstance(result, bool):
+            raise TypeError("Not a vectorized comparison")
+        return result
+
+    def __repr__(self):
+        symbol = {"and": "&", "or": "|"}.get(self.op, self.op)
+        return "(%r %s %r)" % (self.args[0], symbol, self.args[1])
+
+
+class UnaryOp(Expr):
+    def __init__(self, op: str, operand):
+        self.op = op
+        self.args = (_as_expr(operand),)
+
+    def _source(self, literals: List[Any], variables: Union[Dict[Any, str], None] = None) -> str:
+        return _ROW_TEMPLATES[self.op] % self.args[0]._source(literals, variables)
+
+    def _batch(self, columns: dict):
+        value = self.args[0]._batch(columns)
+        if self.op == "neg":
+            return -value
+        if self.op == "not":
+            return numpy.logical_not(value)
+        return numpy.fromiter((v is None for v in value), dtype=bool, count=len(value))
+
+    def __repr__(self):
+        if self.op == "is_none":
+            return "%r.is_none()" % (self.args[0],)
+        return "%s%r" % ({"neg": "-", "not": "~"}[self.op], self.args[0])
+
+
+class IsIn(Expr):
+    op = "isin"
+
+    def __init__(self, operand, values: frozenset):
+        self.args = (_as_expr(operand), values)
+
+    def _source(self, literals: List[Any], variables: Union[Dict[Any, str], None] = None) -> str:
+        operand = self.args[0]._source(literals, variables)
+        literals.append(self.args[1])
+        return "(%s in _l%d)" % (operand, len(literals) - 1)
+
+    def _batch(self, columns: dict):
+        return numpy.isin(self.args[0]._batch(columns), list(self.args[1]))
+
+    def __repr__(self):
+        return "%r.isin(%r)" % (self.args[0], set(self.args[1]))
+
+
+def col(name) -> Col:
+    """
+    Reference a column (`row[name]`) of each record
+    :param name: column name, or index for tuple records
+    :return: column expression
+    """
+    return Col(name)
+
+
+def lit(value) -> Lit:
+    return Lit(value)
+
+
+def ExprFilter(stream: Iterator[T], expr: Expr):
+    """
+    An iterator of records on which the expression holds, tested one at a time by the compiled row function
+    """
+    return filter(expr.compile(), stream)
+
+
+def ExprMapper(stream: Iterator[T], expr: Expr):
+    """
+    An iterator of expression values of each record
+    """
+    return map(expr.compile(), stream)
+
+
+def ExprValueFilter(stream: Iterator[Tuple[Any, T]], expr: Expr):
+    """
+    An iterator of dict entries on the values of which the expression holds
+    """
+    test = expr.compile()
+    return (item for item in stream if test(item[1]))
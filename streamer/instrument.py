@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.instrument
+---
+
+Opt-in per-stage instrumentation of stream pipelines.
+Mark the stage boundaries with `Stream.instrument(name)`; each marked stage records the number of elements that go
+through it, the wall / cpu time spent in the stage itself (nested instrumented stages excluded) and its selectivity.
+Metrics are handed to hooks when a stage is exhausted, and collected by an active `profile()` context.
+"""
+
+from typing import TypeVar, Iterator, Callable, List, Union
+import threading
+import time
+from .operator import _AbstractOperator
+
+T = TypeVar('T')
+
+_thread_time = getattr(time, "thread_time", time.process_time)
+_local = threading.local()
+_hooks = []     # type: List[Callable[[StageMetrics], None]]
+
+
+def _timing_stack() -> list:
+    if not hasattr(_local, "timing"):
+        _local.timing = []
+    return _local.timing
+
+
+def _profiler_stack() -> list:
+    if not hasattr(_local, "profilers"):
+        _local.profilers = []
+    return _local.profilers
+
+
+class StageMetrics:
+    """
+    Metrics of one instrumented stage. Times are estimated from the sampled calls when sampling is enabled.
+    """
+    def __init__(self, name: str, sample_every: int = 1):
+        self.name = name
+        self.sample_every = sample_every
+        self.upstream = None    # type: Union[StageMetrics, None]
+        self.count_out = 0
+        self.calls = 0
+        self.sampled_calls = 0
+        self.finished = False
+        self._emitted = False
+        self._wall = 0.
+        self._cpu = 0.
+        self._inclusive_wall = 0.
+        self._inclusive_cpu = 0.
+
+    def _estimate(self, sampled_total: float) -> float:
+        if self.sampled_calls == 0:
+            return 0.
+        return sampled_total * self.calls / self.sampled_calls
+
+    @property
+    def count_in(self) -> Union[int, None]:
+        """
+        Number of elements pulled from the nearest instrumented upstream stage; None if there is none.
+        """
+        return None if self.upstream is None else self.upstream.count_out
+
+    @property
+    def selectivity(self) -> Union[float, None]:
+        count_in = self.count_in
+        if not count_in:
+            return None
+        return self.count_out / count_in
+
+    @property
+    def wall_time(self) -> float:
+        """
+        Wall time spent in this stage alone, excluding nested instrumented stages
+        """
+        return self._estimate(self._wall)
+
+    @property
+    def cpu_time(self) -> float:
+        """
+        CPU time spent in this stage alone, excluding nested instrumented stages
+        """
+        return self._estimate(self._cpu)
+
+    @property
+    def inclusive_wall_time(self) -> float:
+        return self._estimate(self._inclusive_wall)
+
+    @property
+    def inclusive_cpu_time(self) -> float:
+        return self._estimate(self._inclusive_cpu)
+
+    @property
+    def throughput(self) -> Union[float, None]:
+        """
+        Elements out per second of wall time, upstream time included
+        """
+        wall = self.inclusive_wall_time
+        return self.count_out / wall if wall > 0 else None
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "upstream": None if self.upstream is None else self.upstream.name,
+            "count_in": self.count_in,
+            "count_out": self.count_out,
+            "selectivity": self.selectivity,
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "inclusive_wall_time": self.inclusive_wall_time,
+            "inclusive_cpu_time": self.inclusive_cpu_time,
+            "throughput": self.throughput,
+            "calls": self.calls,
+            "sampled_calls": self.sampled_calls,
+            "finished": self.finished,
+        }
+
+    def __repr__(self):
+        return "StageMetrics(%s)" % ", ".join("%s=%r" % item for item in self.as_dict().items())
+
+
+def _emit(metrics: StageMetrics) -> None:
+    if metrics._emitted:
+        return
+    metrics._emitted = True
+    for hook in _hooks:
+        hook(metrics)
+
+
+class _TimingFrame:
+    __slots__ = ("metrics", "nested_wall", "nested_cpu")
+
+    def __init__(self, metrics: StageMetrics):
+        self.metrics = metrics
+        self.nested_wall = 0.
+        self.nested_cpu = 0.
+
+
+class Probe(_AbstractOperator[T]):
+    """
+    An iterator as stream operator that measures the stage it wraps.
+    It yields elements lazily, without altering them.
+    """
+    def __init__(self, stream: Iterator[T], name: str, *, sample_every: int = 1,
+                 hook: Union[Callable[[StageMetrics], None], None] = None):
+        assert sample_every >= 1, "Sample at least one element in every 1."
+        self.__stream = stream
+        self.__hook = hook
+        self.metrics = StageMetrics(name, sample_every)
+        for profiler in _profiler_stack():
+            profiler.stages.append(self.metrics)
+
+    def _finish(self):
+        metrics = self.metrics
+        if metrics.finished:
+            return
+        metrics.finished = True
+        if self.__hook is not None:
+            self.__hook(metrics)
+        _emit(metrics)
+
+    def __next__(self) -> T:
+        metrics = self.metrics
+        metrics.calls += 1
+        stack = _timing_stack()
+
+        # Once an enclosing stage is timing, every nested stage must time as well so it can be excluded.
+        if not stack and (metrics.calls - 1) % metrics.sample_every:
+            try:
+                item = next(self.__stream)
+            except StopIteration:
+                self._finish()
+                raise
+            metrics.count_out += 1
+            return item
+
+        if stack and stack[-1].metrics.upstream is None:
+            stack[-1].metrics.upstream = metrics
+        frame = _TimingFrame(metrics)
+        stack.append(frame)
+        start_wall, start_cpu = time.perf_counter(), _thread_time()
+        try:
+            item = next(self.__stream)
+            metrics.count_out += 1
+            return item
+        except StopIteration:
+            self._finish()
+            raise
+        finally:
+            wall, cpu = time.perf_counter() - start_wall, _thread_time() - start_cpu
+            stack.pop()
+            metrics.sampled_calls += 1
+            metrics._inclusive_wall += wall
+            metrics._inclusive_cpu += cpu
+            metrics._wall += wall - frame.nested_wall
+            metrics._cpu += cpu - frame.nested_cpu
+            if stack:
+                stack[-1].nested_wall += wall
+                stack[-1].nested_cpu += cpu
+
+
+class Profiler:
+    """
+    Collects metrics of every stage instrumented within its context, and emits the unfinished ones on exit.
+    """
+    def __init__(self):
+        self.stages = []    # type: List[StageMetrics]
+
+    def __enter__(self):
+        _profiler_stack().append(self)
+        return self
+
+    def __exit__(self, *_):
+        _profiler_stack().remove(self)
+        for metrics in self.stages:
+            _emit(metrics)
+
+    def __getitem__(self, name: str) -> StageMetrics:
+        for metrics in self.stages:
+            if metrics.name == name:
+                return metrics
+        raise KeyError(name)
+
+    def report(self) -> str:
+        """
+        A printable table of all collected stages
+        """
+        lines = ["%-24s %10s %10s %8s %10s %10s %12s" % (
+            "stage", "in", "out", "select", "wall (s)", "cpu (s)", "out/s")]
+        for m in self.stages:
+            lines.append("%-24s %10s %10d %8s %10.4f %10.4f %12s" % (
+                m.name, "-" if m.count_in is None else m.count_in, m.count_out,
+                "-" if m.selectivity is None else "%.3f" % m.selectivity, m.wall_time, m.cpu_time,
+                "-" if m.throughput is None else "%.0f" % m.throughput))
+        return "\n".join(lines)
+
+
+def profile() -> Profiler:
+    """
+    A profiling context collecting all stages instrumented inside it
+    :return: Profiler
+    """
+    return Profiler()
+
+
+def add_hook(hook: Callable[[StageMetrics], None]) -> None:
+    """
+    Register a global hook, called with the metrics of every instrumented stage once it is exhausted
+    :param hook: (StageMetrics -> void) function exporting metrics
+    """
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[StageMetrics], None]) -> None:
+    _hooks.remove(hook)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.memo
+---
+
+Memoization for expensive pure map functions: an in-process LRU tier with optional TTL, and an optional persistent
+sqlite tier shared across runs. Used by `Stream.cached_map`.
+"""
+
+from typing import Generic, TypeVar, Iterator, Iterable, Callable, Union, Any, Dict, List, Tuple
+from collections import OrderedDict, namedtuple
+from itertools import islice
+import pickle
+import sqlite3
+import time
+
+K = TypeVar('K')
+V = TypeVar('V')
+T = TypeVar('T')
+
+CacheStats = namedtuple("CacheStats", "hits persistent_hits misses evictions size")
+
+_MISSING = namedtuple("_Missing", "")()
+
+
+class MemoCache(Generic[K, V]):
+    """
+    A two-tier memo cache. Share one instance between streams to share results and read its `stats()`.
+    """
+    def __init__(self, maxsize: Union[int, None] = 65536, ttl: Union[float, None] = None,
+                 persist_path: Union[str, None] = None):
+        """
+        :param maxsize: max entries in the in-process LRU tier; unbounded if None
+        :param ttl: seconds an entry stays valid, in both tiers; forever if None
+        :param persist_path: sqlite file of the persistent tier; no persistent tier if None
+        """
+        if maxsize is not None and maxsize <= 0:
+            raise ValueError("Cache size should be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.__entries = OrderedDict()     # key -> (value, expires at)
+        self.__hits = 0
+        self.__persistent_hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__db = None
+        if persist_path is not None:
+            self.__db = sqlite3.connect(persist_path)
+            self.__db.execute("CREATE TABLE IF NOT EXISTS memo (key BLOB PRIMARY KEY, value BLOB, created REAL)")
+            self.__db.commit()
+
+    def stats(self) -> CacheStats:
+        return CacheStats(self.__hits, self.__persistent_hits, self.__misses, self.__evictions, len(self.__entries))
+
+    def _expires_at(self) -> Union[float, None]:
+        return None if self.ttl is None else time.monotonic() + self.ttl
+
+    def _store(self, key: K, value: V, expires_at: Union[float, None]) -> None:
+        entries = self.__entries
+        entries[key] = (value, expires_at)
+        entries.move_to_end(key)
+        if self.maxsize is not None and len(entries) > self.maxsize:
+            entries.popitem(last=False)
+            self.__evictions += 1
+
+    def _lookup_memory(self, key: K):
+        entry = self.__entries.get(key, _MISSING)
+        if entry is _MISSING:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self.__entries[key]
+            return _MISSING
+        self.__entries.move_to_end(key)
+        return value
+
+    def _lookup_persistent(self, keys: List[K]) -> Dict[K, V]:
+        if self.__db is None or not keys:
+            return {}
+        by_blob = {pickle.dumps(key, protocol=pickle.HIGHEST_PROTOCOL): key for key in keys}
+        query = "SELECT key, value FROM memo WHERE key IN (%s)" % ",".join("?" * len(by_blob))
+        params = list(by_blob)
+        if self.ttl is not None:
+            query += " AND created >= ?"
+            params.append(time.time() - self.ttl)
+        found = {}
+        for blob, value in self.__db.execute(query, params):
+            found[by_blob[bytes(blob)]] = pickle.loads(value)
+        return found
+
+    def _persist(self, items: List[Tuple[K, V]]) -> None:
+        if self.__db is None or not items:
+            return
+        now = time.time()
+        self.__db.executemany("INSERT OR REPLACE INTO memo VALUES (?, ?, ?)", [
+            (pickle.dumps(key, protocol=pickle.HIGHEST_PROTOCOL), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+             now)
+            for key, value in items])
+        self.__db.commit()
+
+    def get_many(self, keys: Iterable[K], compute: Callable[[List[K]], List[V]]) -> Dict[K, V]:
+        """
+        Look up a batch of keys through both tiers; keys are deduplicated and the missing ones computed together.
+        :param keys: keys to look up
+        :param compute: (list of missing keys -> list of values) function computing the misses
+        :return: dict of all keys to values
+        """
+        results = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            value = self._lookup_memory(key)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                results[key] = value
+                self.__hits += 1
+
+        expires_at = self._expires_at()
+        for key, value in self._lookup_persistent(missing).items():
+            results[key] = value
+            self._store(key, value, expires_at)
+            self.__persistent_hits += 1
+
+        missing = [key for key in missing if key not in results]
+        if missing:
+            self.__misses += len(missing)
+            computed = list(zip(missing, compute(missing)))
+            for key, value in computed:
+                results[key] = value
+                self._store(key, value, expires_at)
+            self._persist(computed)
+        return results
+
+    def get(self, key: K, compute: Callable[[K], V]) -> V:
+        """
+        Look up a single key through both tiers
+        :param key: key to look up
+        :param compute: (key -> value) function computing a miss
+        :return: value
+        """
+        value = self._lookup_memory(key)
+        if value is not _MISSING:
+            self.__hits += 1
+            return value
+        return self.get_many((key,), lambda keys: [compute(keys[0])])[key]
+
+    def clear(self) -> None:
+        """
+        Clear the in-process tier only
+        """
+        self.__entries.clear()
+
+    def close(self) -> None:
+        if self.__db is not None:
+            self.__db.close()
+            self.__db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def CachedMapper(stream: Iterator[T], func: Callable[[Any], V], cache: MemoCache, *,
+                 key: Union[Callable[[T], Any], None] = None, batch_size: int = 64,
+                 batch_func: Union[Callable[[List[Any]], List[V]], None] = None, close_cache: bool = False):
+    """
+    A generator mapping elements through a memo cache, a batch of elements at a time
+    :param stream: elements to map
+    :param func: (key -> value) the pure function to memoize
+    :param cache: the memo cache
+    :param key: optional function deriving the cache key (and function argument) from an element
+    :param batch_size: elements looked up together
+    :param batch_func: optional (list of keys -> list of values) function computing all misses of a batch at once
+    :param close_cache: close the cache (and its sqlite tier) once the stream is exhausted or dropped
+    """
+    compute = batch_func if batch_func is not None else (lambda keys: [func(k) for k in keys])
+    try:
+        if batch_size <= 1:
+            compute_one = func if batch_func is None else (lambda k: batch_func([k])[0])
+            for item in stream:
+                yield cache.get(item if key is None else key(item), compute_one)
+            return
+
+        while True:
+            batch = list(islice(stream, batch_size))
+            if not batch:
+                return
+            if key is not None:
+                batch = [key(item) for item in batch]
+            results = cache.get_many(batch, compute)
+            for k in batch:
+                yield results[k]
+    finally:
+        if close_cache:
+            cache.close()
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.memory
+---
+
+Memory governance for buffering stream operations (sorted, reduce_right, distinct, group_by, cartesian products and
+`collect_as_*`). A `MemoryBudget` estimates the bytes each buffering stage holds, keeps its peak usage, and either
+raises `MemoryBudgetExceeded` naming the stage or lets the stage spill to disk where a spilling strategy exists.
+"""
+
+from typing import Dict, Iterator, Iterable, TypeVar, Union
+import pickle
+import sys
+import tempfile
+
+T = TypeVar('T')
+
+ON_EXCEED_RAISE = "raise"
+ON_EXCEED_SPILL = "spill"
+
+_POINTER_SIZE = 8
+
+
+def estimate_size(obj) -> int:
+    """
+    A cheap estimation of memory held by an element in a container: its own size plus one level of nested items.
+    :param obj: element
+    :return: estimated bytes
+    """
+    size = sys.getsizeof(obj) + _POINTER_SIZE
+    if isinstance(obj, (tuple, list)):
+        for item in obj:
+            size += sys.getsizeof(item)
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            size += sys.getsizeof(key) + sys.getsizeof(value)
+    return size
+
+
+class MemoryBudgetExceeded(MemoryError):
+    def __init__(self, stage: str, budget: int, requested: int):
+        super(MemoryBudgetExceeded, self).__init__(
+            "Stage `%s` exceeded the memory budget of %d bytes (%d bytes held by buffering stages)" % (
+                stage, budget, requested))
+        self.stage = stage
+        self.budget = budget
+        self.requested = requested
+
+
+class StageTracker:
+    """
+    Tracks the estimated bytes held by a single buffering stage against the shared budget.
+    Element sizes are measured for the first elements and then sampled, the running average is charged in between.
+    """
+    EXACT_ITEMS = 64
+    SAMPLE_EVERY = 64
+
+    def __init__(self, budget: 'MemoryBudget', name: str):
+        self.budget = budget
+        self.name = name
+        self.current = 0
+        self.peak = 0
+        self.spills = 0
+        self.items = 0
+        self.__sampled = 0
+        self.__sampled_bytes = 0
+        self.__average = 0
+
+    def add(self, item, spillable: bool = False) -> bool:
+        """
+        Account for one more element held by this stage
+        :param item: the element
+        :param spillable: whether the stage is able to spill its buffer when the budget is exceeded
+        :return: False if the stage should spill now; True if it is within budget
+        """
+        self.items += 1
+        if self.items <= self.EXACT_ITEMS or not self.items % self.SAMPLE_EVERY:
+            self.__sampled += 1
+            self.__sampled_bytes += estimate_size(item)
+            self.__average = self.__sampled_bytes // self.__sampled
+        return self.charge(self.__average, spillable)
+
+    def charge(self, nbytes: int, spillable: bool = False) -> bool:
+        """
+        Account for more bytes held by this stage
+        :param nbytes: bytes to charge
+        :param spillable: whether the stage is able to spill its buffer when the budget is exceeded
+        :return: False if the stage should spill now; True if it is within budget
+        """
+        self.current += nbytes
+        if self.current > self.peak:
+            self.peak = self.current
+        budget = self.budget
+        budget.current += nbytes
+        if budget.current > budget.peak:
+            budget.peak = budget.current
+        if budget.current <= budget.limit:
+            return True
+        if spillable and budget.on_exceed == ON_EXCEED_SPILL:
+            return False
+        raise MemoryBudgetExceeded(self.name, budget.limit, budget.current)
+
+    def release(self, nbytes: Union[int, None] = None) -> None:
+        """
+        Release bytes no longer held by this stage
+        :param nbytes: bytes to release; all of them by default
+        """
+        nbytes = self.current if nbytes is None else min(nbytes, self.current)
+        self.current -= nbytes
+        self.budget.current -= nbytes
+
+    def spilled(self) -> None:
+        self.spills += 1
+        self.release()
+
+    def __repr__(self):
+        return "StageTracker(name=%r, current=%d, peak=%d, spills=%d)" % (
+            self.name, self.current, self.peak, self.spills)
+
+
+class MemoryBudget:
+    """
+    A memory budget shared by all buffering stages of a stream pipeline
+    """
+    def __init__(self, limit: int, *, on_exceed: str = ON_EXCEED_RAISE, spill_dir: Union[str, None] = None):
+        """
+        :param limit: max bytes all buffering stages may hold together
+        :param on_exceed: "raise" - raise `MemoryBudgetExceeded`; "spill" - spill to disk where the stage supports it
+        :param spill_dir: directory for spill files; system temporary directory by default
+        """
+        if on_exceed not in (ON_EXCEED_RAISE, ON_EXCEED_SPILL):
+            raise ValueError("Unknown `on_exceed` strategy: %s" % on_exceed)
+        self.limit = limit
+        self.on_exceed = on_exceed
+        self.spill_dir = spill_dir
+        self.current = 0
+        self.peak = 0
+        self.stages = {}    # type: Dict[str, StageTracker]
+
+    def tracker(self, name: str) -> StageTracker:
+        """
+        Create a tracker for a new stage; repeated stage names are numbered, e.g. `sorted#2`
+        :param name: stage name
+        :return: StageTracker
+        """
+        unique, i = name, 1
+        while unique in self.stages:
+            i += 1
+            unique = "%s#%d" % (name, i)
+        tracker = self.stages[unique] = StageTracker(self, unique)
+        return tracker
+
+    def peak_by_stage(self) -> Dict[str, int]:
+        return {name: tracker.peak for name, tracker in self.stages.items()}
+
+
+def track(iterable: Iterable[T], tracker: Union[StageTracker, None]) -> Iterator[T]:
+    """
+    Charge every element passing through to a stage that buffers all of them
+    """
+    if tracker is None:
+        return iter(iterable)
+    return _tracked(iterable, tracker)
+
+
+def _tracked(iterable: Iterable[T], tracker: StageTracker) -> Iterator[T]:
+    add = tracker.add
+    for item in iterable:
+        add(item)
+        yield item
+
+
+def release_after(iterable: Iterable[T], tracker: Union[StageTracker, None]) -> Iterator[T]:
+    """
+    Yield through a buffered result, releasing the stage's memory once it is depleted
+    """
+    try:
+        for item in iterable:
+            yield item
+    finally:
+        if tracker is not None:
+            tracker.release()
+
+
+class SpillRun:
+    """
+    A temporary file of pickled elements, written sequentially and read back once.
+    """
+    def __init__(self, spill_dir: Union[str, None] = None):
+        self.__file = tempfile.TemporaryFile(dir=spill_dir)
+        self.__pickler = pickle.Pickler(self.__file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.size = 0
+
+    def write(self, item) -> None:
+        self.__pickler.dump(item)
+        self.__pickler.clear_memo()
+        self.size += 1
+
+    def extend(self, items: Iterable) -> 'SpillRun':
+        for item in items:
+            self.write(item)
+        return self
+
+    def __iter__(self):
+        self.__file.flush()
+        self.__file.seek(0)
+        unpickler = pickle.Unpickler(self.__file)
+        try:
+            for _ in range(self.size):
+                yield unpickler.load()
+        finally:
+            self.__file.close()
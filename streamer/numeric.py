@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.numeric
+---
+
+Primitive numeric streams (similar to `java.util.stream.IntStream` / `DoubleStream`).
+Values are buffered in chunks of `array.array`, or NumPy arrays when NumPy is available, and reductions run on whole
+chunks instead of per element Python calls. Wrap as `Stream(numeric_stream)` to get boxed values back.
+"""
+
+from typing import Iterable, Iterator, Callable, Union, List, Tuple
+from array import array
+from itertools import chain, islice, accumulate, repeat
+from collections import Counter
+from math import floor
+from functools import partial
+import operator
+from .seekable import arithmetic_of
+
+try:
+    import numpy
+except ImportError:     # pragma: no cover - NumPy is optional
+    numpy = None
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+BACKEND_AUTO = "auto"
+BACKEND_ARRAY = "array"
+BACKEND_NUMPY = "numpy"
+
+Number = Union[int, float]
+
+
+def _resolve_backend(backend: str) -> str:
+    if backend == BACKEND_AUTO:
+        return BACKEND_ARRAY if numpy is None else BACKEND_NUMPY
+    if backend == BACKEND_NUMPY and numpy is None:
+        raise ValueError("NumPy backend requested but NumPy is not installed")
+    if backend not in (BACKEND_ARRAY, BACKEND_NUMPY):
+        raise ValueError("Unknown numeric backend: %s" % backend)
+    return backend
+
+
+class NumericStream:
+    """
+    A stream of numbers of a single primitive type, processed a chunk at a time.
+    """
+    TYPECODE = "d"
+    DTYPE = "float64"
+
+    def __init__(self, *iterables: Iterable[Number], chunk_size: int = DEFAULT_CHUNK_SIZE, backend: str = BACKEND_AUTO):
+        """
+        :param iterables: any numbers of iterables of numbers
+        :param chunk_size: number of values buffered in a chunk
+        :param backend: "array", "numpy" or "auto" - NumPy when available
+        """
+        self.chunk_size = chunk_size
+        self.backend = _resolve_backend(backend)
+        source = iterables[0] if len(iterables) == 1 else chain.from_iterable(iterables)
+        self.__chunks = self._chunk(iter(source))
+
+    @classmethod
+    def of_chunks(cls, chunks: Iterable, *, chunk_size: int = DEFAULT_CHUNK_SIZE, backend: str = BACKEND_AUTO):
+        """
+        Create from an iterable of ready-made chunks (array.array / NumPy arrays of the same type)
+        """
+        stream = cls((), chunk_size=chunk_size, backend=backend)
+        stream.__chunks = (stream._as_chunk(c) for c in chunks)
+        return stream
+
+    def _derive(self, chunks: Iterable, cls=None) -> 'NumericStream':
+        return (cls or type(self)).of_chunks(chunks, chunk_size=self.chunk_size, backend=self.backend)
+
+    def _as_chunk(self, chunk):
+        if self.backend == BACKEND_NUMPY:
+            if hasattr(chunk, "__len__"):
+                return numpy.asarray(chunk, dtype=self.DTYPE)
+            return numpy.fromiter(chunk, dtype=self.DTYPE)
+        if isinstance(chunk, array) and chunk.typecode == self.TYPECODE:
+            return chunk
+        return array(self.TYPECODE, chunk)
+
+    def _chunk(self, source: Iterator[Number]):
+        arithmetic = arithmetic_of(source) if self.backend == BACKEND_NUMPY else None
+        # integers go to either type, other progressions are floats
+        if arithmetic is not None and (self.DTYPE == "float64" or arithmetic[1:] == (0, 1)):
+            yield from self._arange_chunks(*arithmetic)
+            return
+        while True:
+            if self.backend == BACKEND_NUMPY:
+                chunk = numpy.fromiter(islice(source, self.chunk_size), dtype=self.DTYPE)
+            else:
+                chunk = array(self.TYPECODE, islice(source, self.chunk_size))
+            if len(chunk) == 0:
+                return
+            yield chunk
+
+    def _arange_chunks(self, indices: range, start: Number, step: Number):
+        """
+        Chunks of `start + i * step` for the i in indices, made by `numpy.arange` instead of one value at a time
+        """
+        for first in range(0, len(indices), self.chunk_size):
+            part = indices[first:first + self.chunk_size]
+            if (start, step) == (0, 1):
+                yield numpy.arange(part.start, part.stop, part.step, dtype=self.DTYPE)
+            else:
+                yield numpy.arange(part.start, part.stop, part.step, dtype="float64") * step + start
+
+    def chunks(self) -> Iterator:
+        """
+        The underlying chunks, each an array.array or a NumPy array
+        """
+        return self.__chunks
+
+    def __iter__(self) -> Iterator[Number]:
+        return chain.from_iterable(c.tolist() for c in self.__chunks)
+
+    ###
+    # Chunk-wise transformations
+    ###
+
+    def map(self, func: Callable, *, vectorized: bool = False) -> 'NumericStream':
+        """
+        Transform values into a stream of the same type
+        :param func: (number -> number) function; or (chunk -> chunk) function if `vectorized`
+        :param vectorized: apply `func` to whole chunks, e.g. NumPy ufuncs
+        :return: numeric stream
+        """
+        if vectorized:
+            return self._derive(func(c) for c in self.__chunks)
+        return self._derive(self._as_chunk(map(func, c)) for c in self.__chunks)
+
+    def _arithmetic(self, op: Callable, other: Number, cls=None, reflected: bool = False) -> 'NumericStream':
+        if cls is None:
+            cls = FloatStream if isinstance(other, float) else type(self)
+        if self.backend == BACKEND_NUMPY:
+            return self._derive((op(other, c) if reflected else op(c, other) for c in self.__chunks), cls)
+        if reflected:
+            return self._derive((map(op, repeat(other), c) for c in self.__chunks), cls)
+        return self._derive((map(op, c, repeat(other)) for c in self.__chunks), cls)
+
+    def __add__(self, other: Number):
+        return self._arithmetic(operator.add, other)
+
+    def __radd__(self, other: Number):
+        return self._arithmetic(operator.add, other, reflected=True)
+
+    def __sub__(self, other: Number):
+        return self._arithmetic(operator.sub, other)
+
+    def __rsub__(self, other: Number):
+        return self._arithmetic(operator.sub, other, reflected=True)
+
+    def __mul__(self, other: Number):
+        return self._arithmetic(operator.mul, other)
+
+    def __rmul__(self, other: Number):
+        return self._arithmetic(operator.mul, other, reflected=True)
+
+    def __truediv__(self, other: Number):
+        return self._arithmetic(operator.truediv, other, FloatStream)
+
+    def __floordiv__(self, other: Number):
+        return self._arithmetic(operator.floordiv, other)
+
+    def __mod__(self, other: Number):
+        return self._arithmetic(operator.mod, other)
+
+    def __pow__(self, other: Number):
+        return self._arithmetic(operator.pow, other)
+
+    def __neg__(self):
+        return self._derive(self._as_chunk(map(operator.neg, c)) if self.backend == BACKEND_ARRAY else -c
+                            for c in self.__chunks)
+
+    def as_float(self) -> 'FloatStream':
+        return self._derive(self.__chunks, FloatStream)
+
+    def as_int(self) -> 'IntStream':
+        """
+        Convert to an IntStream, truncating values towards zero
+        """
+        if self.backend == BACKEND_NUMPY:
+            return self._derive(self.__chunks, IntStream)
+        return self._derive((map(int, c) for c in self.__chunks), IntStream)
+
+    def cumsum(self) -> 'NumericStream':
+        """
+        Running totals
+        :return: numeric stream of the same type
+        """
+        def running():
+            carry = 0
+            for c in self.__chunks:
+                if self.backend == BACKEND_NUMPY and self._may_overflow(c, carry):
+                    # exact totals, failing like the array backend if they do not fit
+                    total = numpy.array(list(islice(accumulate(chain((int(carry),), c.tolist())), 1, None)),
+                                        dtype=self.DTYPE)
+                elif self.backend == BACKEND_NUMPY:
+                    total = numpy.cumsum(c) + carry
+                else:
+                    total = array(self.TYPECODE, islice(accumulate(chain((carry,), c)), 1, None))
+                if len(total):
+                    carry = total[-1]
+                yield total
+        return self._derive(running())
+
+    def limit(self, num: int) -> 'NumericStream':
+        def limited():
+            remaining = num
+            for c in self.__chunks:
+                if remaining <= 0:
+                    return
+                yield c[:remaining]
+                remaining -= len(c)
+        return self._derive(limited())
+
+    ###
+    # Reductions
+    ###
+
+    def count(self) -> int:
+        return sum(len(c) for c in self.__chunks)
+
+    def _may_overflow(self, c, carry: Number = 0) -> bool:
+        """
+        Whether NumPy sums of an integer chunk may wrap around
+        """
+        if self.DTYPE != "int64" or not len(c):
+            return False
+        return len(c) * max(-int(c.min()), int(c.max())) + abs(int(carry)) >= 1 << 63
+
+    def _chunk_sum(self, c) -> Number:
+        if self.DTYPE == "int64":
+            # exact: high and low 32 bits summed apart cannot wrap around in int64 for chunks under 2 ** 31
+            return ((c >> 32).sum().item() << 32) + (c & 0xFFFFFFFF).sum().item()
+        return c.sum().item()
+
+    def sum(self) -> Number:
+        if self.backend == BACKEND_NUMPY:
+            return sum(map(self._chunk_sum, self.__chunks))
+        return sum(sum(c) for c in self.__chunks)
+
+    def _min_max(self, reducer: Callable) -> Union[Number, None]:
+        partials = [reducer(c) for c in self.__chunks if len(c)]
+        if not partials:
+            return None
+        result = reducer(partials)
+        return result.item() if hasattr(result, "item") else result
+
+    def min(self) -> Union[Number, None]:
+        return self._min_max(min if self.backend == BACKEND_ARRAY else numpy.min)
+
+    def max(self) -> Union[Number, None]:
+        return self._min_max(max if self.backend == BACKEND_ARRAY else numpy.max)
+
+    def _chunk_moments(self, c) -> Tuple[int, float, float]:
+        size = len(c)
+        if self.backend == BACKEND_NUMPY:
+            c_mean = c.mean().item()
+            return size, c_mean, float(((c - c_mean) ** 2).sum())
+        c_mean = sum(c) / size
+        deviations = array("d", map(operator.sub, c, repeat(c_mean)))
+        return size, c_mean, sum(map(operator.mul, deviations, deviations))
+
+    def _chunk_summaries(self):
+        for c in self.__chunks:
+            if not len(c):
+                continue
+            if self.backend == BACKEND_NUMPY:
+                yield self._chunk_moments(c), self._chunk_sum(c), c.min().item(), c.max().item()
+            else:
+                yield self._chunk_moments(c), sum(c), min(c), max(c)
+
+    def summary(self) -> dict:
+        """
+        count / sum / mean / variance / min / max in a single pass
+        """
+        # Chan et al. pairwise combination of per chunk (count, mean, sum of squared deviations)
+        n, mean, m2 = 0, 0., 0.
+        total, low, high = 0, None, None
+        for (c_n, c_mean, c_m2), c_total, c_low, c_high in self._chunk_summaries():
+            delta = c_mean - mean
+            mean += delta * c_n / (n + c_n)
+            m2 += c_m2 + delta * delta * n * c_n / (n + c_n)
+            n += c_n
+            total += c_total
+            low = c_low if low is None else min(low, c_low)
+            high = c_high if high is None else max(high, c_high)
+        return {"count": n, "sum": total, "mean": mean if n else None, "variance": m2 / n if n else None,
+                "min": low, "max": high}
+
+    def mean(self) -> Union[float, None]:
+        return self.summary()["mean"]
+
+    def variance(self, ddof: int = 0) -> Union[float, None]:
+        """
+        :param ddof: delta degrees of freedom; 0 - population variance, 1 - sample variance
+        """
+        stats = self.summary()
+        if stats["count"] - ddof <= 0:
+            return None
+        return stats["variance"] * stats["count"] / (stats["count"] - ddof)
+
+    def histogram(self, bins: int = 10, bounds: Union[Tuple[Number, Number], None] = None) \
+            -> Tuple[List[int], List[float]]:
+        """
+        Count values into equal width bins; values outside of the bounds are ignored.
+        :param bins: number of bins
+        :param bounds: (low, high) of the bins; min / max of the values by default (buffers all chunks)
+        :return: (counts, bin edges)
+        """
+        chunks = self.__chunks
+        if bounds is None:
+            chunks = list(chunks)
+            low = self._derive(chunks).min()
+            high = self._derive(chunks).max()
+            if low is None:
+                low, high = 0, 1
+        else:
+            low, high = bounds
+        if high == low:
+            high = low + 1
+        width = (high - low) / bins
+        edges = [low + i * width for i in range(bins)] + [high]
+
+        counts = [0] * bins
+        for c in chunks:
+            if self.backend == BACKEND_NUMPY:
+                c_counts, _ = numpy.histogram(c, bins=bins, range=(low, high))
+                for i, x in enumerate(c_counts.tolist()):
+                    counts[i] += x
+                continue
+            scale = 1 / width
+            index = Counter(map(floor, map(operator.mul, map(operator.sub, c, repeat(low)), repeat(scale))))
+            for i, x in index.items():
+                if 0 <= i < bins:
+                    counts[i] += x
+            if index.get(bins):
+                # the last bin is closed: values up to high (included) rounded past it go in it
+                counts[-1] += sum(1 for x in filter(partial(operator.ge, high), c)
+                                  if floor((x - low) * scale) >= bins)
+        return counts, edges
+
+    def to_list(self) -> list:
+        return list(self)
+
+    def to_array(self):
+        """
+        All values in a single array.array, or a NumPy array with NumPy backend
+        """
+        if self.backend == BACKEND_NUMPY:
+            return numpy.concatenate([numpy.empty(0, dtype=self.DTYPE)] + list(self.__chunks))
+        result = array(self.TYPECODE)
+        for c in self.__chunks:
+            result.extend(c)
+        return result
+
+
+class IntStream(NumericStream):
+    """
+    A stream of 64-bit signed integers
+    """
+    TYPECODE = "q"
+    DTYPE = "int64"
+
+
+class FloatStream(NumericStream):
+    """
+    A stream of double precision floats
+    """
+    TYPECODE = "d"
+    DTYPE = "float64"
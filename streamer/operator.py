@@ -8,13 +8,18 @@ The module contains some iterator operator - add operation to an iterator and ke
 Treat this as a semi-internal module - subjected to breaking changes.
 """
 
-from typing import Generic, TypeVar, Iterator, Iterable, Callable, Union, Any, Tuple
+from typing import Generic, TypeVar, Iterator, Iterable, Callable, Union, Any, Tuple, List
 from collections import Counter, namedtuple, defaultdict, deque
 from functools import reduce
 from abc import ABCMeta, abstractmethod
+from heapq import merge
+import collections.abc
+from itertools import product
 import io
 import re
 from .collector import Collector
+from .memory import StageTracker, SpillRun, release_after
+from .seekable import Constant
 
 T = TypeVar('T')
 K = TypeVar('K')
@@ -33,13 +38,27 @@ class _AbstractOperator(Generic[T], metaclass=ABCMeta):
         return self
 
 
+class _TrackedCounter(Counter):
+    """
+    A counter charging a memory tracker for every new key
+    """
+    def __init__(self, tracker: StageTracker):
+        super(_TrackedCounter, self).__init__()
+        self.tracker = tracker
+
+    def __missing__(self, key):
+        self.tracker.add(key)
+        return 0
+
+
 class Deduplicator(_AbstractOperator[T]):
     """
     An iterator as stream operator for deduplication.
     It yields distinct elements that fulfill requirements lazily.
     """
-    def __init__(self, stream: Iterator[T], *, more_than: int = 1, key: Union[Callable[[T], Any], None] = None):
-        self.__appeared = Counter()
+    def __init__(self, stream: Iterator[T], *, more_than: int = 1, key: Union[Callable[[T], Any], None] = None,
+                 tracker: Union[StageTracker, None] = None):
+        self.__appeared = Counter() if tracker is None else _TrackedCounter(tracker)
         self.__stream = stream
         self.__more_than = more_than if more_than >= 1 else 1
         self.__key = key
@@ -177,18 +196,96 @@ class Collapser(_AbstractOperator[T]):
         return self._process_collection(elements)
 
 
-def Grouper(stream: Iterator[Tuple[K, V]]):
+def Grouper(stream: Iterator[Tuple[K, V]], tracker: Union[StageTracker, None] = None, partitions: int = 16):
     """
     An iterator as stream operator for grouping-by elements to a list according to its key
+    :param stream: key / value pairs
+    :param tracker: optional memory tracker; once over a spilling budget, entries are hash partitioned to disk and
+        grouped one partition at a time - groups are then no longer in order of first appearance.
+    :param partitions: number of spill partitions
     """
     # Thanks to python generator, the expensive overhead / stream consumption will be deferred until request of first
     # element.
     collect_by_key = defaultdict(deque)
+    runs = None
     for key, value in stream:
+        if runs is not None:
+            runs[hash(key) % partitions].write((key, value))
+            continue
         collect_by_key[key].append(value)
+        if tracker is not None and not tracker.add(value, spillable=True):
+            runs = [SpillRun(tracker.budget.spill_dir) for _ in range(partitions)]
+            for k, values in collect_by_key.items():
+                runs[hash(k) % partitions].extend((k, v) for v in values)
+            collect_by_key.clear()
+            tracker.spilled()
+
+    if runs is None:
+        for key, value in release_after(collect_by_key.items(), tracker):
+            yield key, list(value)
+        return
+
+    # A partition that does not fit any more cannot be spilled again
+    for run in runs:
+        collect_by_key = defaultdict(deque)
+        for key, value in run:
+            collect_by_key[key].append(value)
+            tracker.add(value)
+        for key, value in release_after(collect_by_key.items(), tracker):
+            yield key, list(value)
+
 
-    for key, value in collect_by_key.items():
-        yield key, list(value)
+def ExternalSorter(stream: Iterator[T], key: Union[Callable[[T], Any], None] = None, reverse: bool = False,
+                   tracker: Union[StageTracker, None] = None):
+    """
+    A generator of sorted elements. Once over a spilling memory budget, sorted runs are spilled to disk and merged.
+    :param stream: elements to sort
+    :param key: optional comparison method
+    :param reverse: if the order of sort should be reversed (decreasing order)
+    :param tracker: optional memory tracker
+    """
+    buf = []
+    runs = []
+    for item in stream:
+        buf.append(item)
+        if tracker is not None and not tracker.add(item, spillable=True):
+            buf.sort(key=key, reverse=reverse)
+            runs.append(SpillRun(tracker.budget.spill_dir).extend(buf))
+            buf = []
+            tracker.spilled()
+    buf.sort(key=key, reverse=reverse)
+
+    if runs:
+        # heapq merge is stable for runs in order, so is the sort
+        runs.append(buf)
+        source = merge(*runs, key=key, reverse=reverse)
+    else:
+        source = buf
+    for item in release_after(source, tracker):
+        yield item
+
+
+def Reverser(stream: Iterator[T], tracker: Union[StageTracker, None] = None):
+    """
+    A generator of elements in reverse order. Once over a spilling memory budget, chunks are spilled to disk and read
+    back one at a time.
+    :param stream: elements to reverse
+    :param tracker: optional memory tracker
+    """
+    buf = []
+    runs = []
+    for item in stream:
+        buf.append(item)
+        if tracker is not None and not tracker.add(item, spillable=True):
+            runs.append(SpillRun(tracker.budget.spill_dir).extend(buf))
+            buf = []
+            tracker.spilled()
+
+    for item in release_after(reversed(buf), tracker):
+        yield item
+    for run in reversed(runs):
+        for item in reversed(list(run)):
+            yield item
 
 
 def RepeatApply(init, transform: Callable):
@@ -205,50 +302,60 @@ def RepeatApply(init, transform: Callable):
 
 def ConstantOf(constant, repeat: int):
     """
-    A generator of same element x times
+    An iterator of same element x times, sized and seekable (see `seekable.Constant`)
     :param constant: element to yield every time
     :param repeat: repeat times
     """
     assert repeat > 0, "At least repeat 1 time."
-    for i in range(repeat):
-        yield constant
+    return Constant(constant, repeat)
+
 
+def _is_finite_collection(source) -> bool:
+    return isinstance(source, collections.abc.Sized) and not isinstance(source, collections.abc.Iterator)
 
-def Cartesian(*sources: Iterator):
+
+def Cartesian(*sources: Iterable, tracker: Union[StageTracker, None] = None) -> Iterator[Tuple]:
     """
-    A generator of the result of cartesian product of multiple collections / sets.
+    An iterator of the result of cartesian product of multiple collections / sets.
+    Sized collections go straight to `itertools.product` (lexicographic order); otherwise sources are consumed
+    lazily, one element of each per round, so that infinite sources still reach every combination.
     :param sources: all collections
+    :param tracker: optional memory tracker of the memorized values
     """
     if len(sources) == 0:
-        return
-    if len(sources) == 1:
-        for item in sources[0]:
-            yield [item]
-        return
+        return iter(())
+    if all(map(_is_finite_collection, sources)):
+        return product(*sources)
+    return _diagonal_product([iter(source) for source in sources], tracker)
 
-    # Iterators should be treated as one-time consumptions. Use minimal memory usage at any time
-    memo = [deque() for _ in sources]    # track values that known upto now
-    buf = [None for _ in sources]   # buffer for final set of values
-
-    def generate_cartesian(rnd: int, idx: int, all_less_than_round: bool = True):
-        for i, val in enumerate(memo[idx]):
-            buf[idx] = val
-            if idx == len(buf) - 1:     # last iterator
-                if all_less_than_round and i < rnd:     # all index before current round number, already yield before.
-                    continue
-                yield tuple(buf)
-            else:
-                for t in generate_cartesian(rnd, idx + 1, all_less_than_round and (i < rnd)):
-                    yield t
-
-    zipper = Zipper(*sources, stop_fast=False, back_fill=_EmptyReference)
-    for rnd, values in enumerate(zipper):
-        for i, val in enumerate(values):
-            if val != _EmptyReference:
-                memo[i].append(val)
 
-        for t in generate_cartesian(rnd, 0):
-            yield t
+def _diagonal_product(iterators: List[Iterator], tracker: Union[StageTracker, None]) -> Iterator[Tuple]:
+    """
+    Round r yields every combination involving the r-th element of some source, grouped by the first such source:
+    earlier sources range over their elements before round r, later sources over all elements known so far.
+    """
+    memo = [[] for _ in iterators]  # values known up to now
+    active = list(range(len(iterators)))
+    rnd = 0
+    while active:
+        grown = []
+        for i in active:
+            val = next(iterators[i], _EmptyReference)
+            if val is not _EmptyReference:
+                memo[i].append(val)
+                grown.append(i)
+                if tracker is not None:
+                    tracker.add(val)
+        if len(grown) < len(active):
+            if not all(memo):   # an empty source, the product is empty
+                return
+            active = grown
+        for j in grown:
+            pools = [values[:rnd] for values in memo[:j]]
+            pools.append((memo[j][rnd],))
+            pools.extend(memo[j + 1:])
+            yield from product(*pools)
+        rnd += 1
 
 
 def Splitter(source: io.TextIOBase, regex: str):
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.parallel
+---
+
+Parallel short-circuiting search behind `Stream.parallel_any_match`, `Stream.parallel_find_first` and friends, and the
+process-pool map behind `Stream.process_map`. Process pools move batches through shared memory, see `streamer.sharedmem`.
+
+The source is pulled a chunk at a time, and only a bounded number of chunks are in flight, so the source stops
+being read as soon as the answer is known. Chunks carry sequence numbers: the first match of the lowest sequence
+number wins, which keeps first-element semantics for `find_first` even though chunks complete out of order.
+Once the answer is known, queued chunks are cancelled and, on threads, running chunks stop at their next element.
+"""
+
+from typing import Any, Callable, Iterable, Iterator, List, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+from itertools import islice
+import os
+import sys
+import threading
+from .sharedmem import SharedBatchPool, DEFAULT_SLOT_BYTES
+
+DEFAULT_CHUNK_SIZE = 64
+DEFAULT_MAP_BATCH_SIZE = 1024
+
+THREAD = "thread"
+PROCESS = "process"
+
+
+class _Cancellation:
+    """
+    Chunks with a sequence number above `bound` are no longer needed
+    """
+    def __init__(self):
+        self.bound = sys.maxsize
+
+
+class Negation:
+    """
+    A picklable negated predicate
+    """
+    def __init__(self, match: Callable[[Any], bool]):
+        self.match = match
+
+    def __call__(self, item: Any) -> bool:
+        return not self.match(item)
+
+
+class MemberOf:
+    """
+    A picklable membership predicate
+    """
+    def __init__(self, candidates: Iterable[Any]):
+        self.candidates = frozenset(candidates)
+
+    def __call__(self, item: Any) -> bool:
+        return item in self.candidates
+
+
+class AllMembersSeen:
+    """
+    A predicate passing once every candidate has been seen, across the threads testing elements
+    """
+    def __init__(self, candidates: Iterable[Any]):
+        self.remaining = set(candidates)
+        self.lock = threading.Lock()
+
+    def __call__(self, item: Any) -> bool:
+        if item in self.remaining:
+            with self.lock:
+                self.remaining.discard(item)
+        return not self.remaining
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def _first_match(chunk: List[Any], match: Callable[[Any], bool], seq: int,
+                 cancellation: Union[_Cancellation, None]) -> int:
+    """
+    Index of the first element of the chunk passing the predicate, or -1
+    """
+    for i, item in enumerate(chunk):
+        if match(item):
+            return i
+        if cancellation is not None and cancellation.bound < seq:
+            return -1
+    return -1
+
+
+def search(items: Iterable[Any], match: Callable[[Any], bool], *, ordered: bool, workers: Union[int, None] = None,
+           chunk_size: int = DEFAULT_CHUNK_SIZE, executor: str = THREAD) -> Union[Tuple[Any], None]:
+    """
+    Find an element passing the predicate, testing chunks of elements in parallel
+    :param items: elements to search
+    :param match: (element -> bool) predicate; should be picklable for the process executor
+    :param ordered: find the first passing element; any passing element otherwise
+    :param workers: number of threads or processes; CPU count by default
+    :param chunk_size: elements tested per task
+    :param executor: "thread", or "process" for predicates holding the GIL
+    :return: a 1-tuple of the found element, or None if none passes
+    """
+    if executor not in (THREAD, PROCESS):
+        raise ValueError("Unknown executor %r, should be %r or %r" % (executor, THREAD, PROCESS))
+    if chunk_size < 1:
+        raise ValueError("A chunk should hold at least 1 element")
+    workers = workers or default_workers()
+    items = iter(items)
+    cancellation = _Cancellation() if executor == THREAD else None
+    pool = ThreadPoolExecutor(workers) if executor == THREAD else SharedBatchPool(workers)
+    pending = {}    # future -> (sequence number, chunk)
+    found = None    # (sequence number, element or error, is error)
+    seq = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and found is None and len(pending) < 2 * workers:
+                chunk = list(islice(items, chunk_size))
+                if not chunk:
+                    exhausted = True
+                    break
+                pending[pool.submit(_first_match, chunk, match, seq, cancellation)] = (seq, chunk)
+                seq += 1
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: pending[f][0]):
+                chunk_seq, chunk = pending.pop(future)
+                if found is not None and chunk_seq > found[0]:
+                    continue    # the serial search would never have reached it
+                try:
+                    index = future.result()
+                except Exception as error:
+                    if not ordered:
+                        raise
+                    # raised only if no earlier chunk has a match, like the serial search
+                    found = (chunk_seq, error, True)
+                else:
+                    if index < 0:
+                        continue
+                    found = (chunk_seq, chunk[index], False)
+                if cancellation is not None:
+                    cancellation.bound = chunk_seq
+            if found is not None:
+                if not ordered:
+                    break
+                for future, (chunk_seq, _) in list(pending.items()):
+                    if chunk_seq > found[0]:
+                        future.cancel()
+                        del pending[future]
+                if not pending:
+                    break
+    finally:
+        if cancellation is not None:
+            cancellation.bound = -1
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=executor == THREAD)
+    if found is None:
+        return None
+    if found[2]:
+        raise found[1]
+    return (found[1],)
+
+
+def _map_batch(batch: List[Any], func: Callable[[Any], Any]) -> List[Any]:
+    return list(map(func, batch))
+
+
+def ProcessMapper(items: Iterable[Any], func: Callable[[Any], Any], workers: Union[int, None] = None, *,
+                  batch_size: int = DEFAULT_MAP_BATCH_SIZE, slot_bytes: int = DEFAULT_SLOT_BYTES) -> Iterator[Any]:
+    """
+    A generator of func applied to every element on a process pool, in order.
+    Batches of numbers, bytes or fixed-width records (and list results of those) travel through shared memory.
+    :param items: elements
+    :param func: picklable (element -> result) function
+    :param workers: number of processes; CPU count by default
+    :param batch_size: elements per task
+    :param slot_bytes: shared memory capacity for a batch; larger batches are pickled
+    """
+    workers = workers or default_workers()
+    items = iter(items)
+    pool = SharedBatchPool(workers, slot_bytes=slot_bytes)
+    futures = deque()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(futures) < 2 * workers:
+                batch = list(islice(items, batch_size))
+                if not batch:
+                    exhausted = True
+                    break
+                futures.append(pool.submit(_map_batch, batch, func))
+            if not futures:
+                return
+            for result in futures.popleft().result():
+                yield result
+    finally:
+        for future in futures:
+            future.cancel()
+        pool.shutdown()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.pipeline
+---
+
+Source-independent, picklable stream pipeline templates.
+
+A `Pipeline` records stream operations by name, e.g. `Pipeline().map(f).filter(g).distinct()`, and replays them on
+any iterable when called: `pipeline(source)` gives the resulting `Stream` (or the result of a terminal operation).
+Its stages are plain (name, args, kwargs) tuples, so a pipeline pickles whenever its arguments do (module level
+functions, not lambdas) and can be shipped to `multiprocessing` workers once, then applied to every input.
+"""
+
+from typing import Any, Dict, Iterable, Tuple
+from .stream import Stream, DictStream, ColumnarStream
+from .numeric import IntStream, FloatStream
+
+Stage = Tuple[str, tuple, Dict[str, Any]]
+
+
+def _operation_names() -> frozenset:
+    return frozenset(
+        name for cls in (Stream, DictStream, ColumnarStream, IntStream, FloatStream) for name in dir(cls)
+        if not name.startswith("_") and callable(getattr(cls, name)))
+
+
+OPERATIONS = _operation_names()
+
+
+class Pipeline:
+    """
+    An immutable template of stream operations, with the vocabulary of `Stream` (and of the streams it derives:
+    `DictStream`, `ColumnarStream`, numeric streams). Every operation returns a new pipeline, so templates can be
+    extended and shared freely.
+    """
+    __slots__ = ("__stages",)
+
+    def __init__(self, stages: Iterable[Stage] = ()):
+        """
+        :param stages: (operation name, args, kwargs) tuples
+        """
+        stages = tuple((name, tuple(args), dict(kwargs)) for name, args, kwargs in stages)
+        for name, _, _ in stages:
+            if name not in OPERATIONS:
+                raise ValueError("Unknown stream operation %r" % name)
+        self.__stages = stages
+
+    @property
+    def stages(self) -> Tuple[Stage, ...]:
+        return self.__stages
+
+    def then(self, other: 'Pipeline') -> 'Pipeline':
+        """
+        The pipeline running the stages of this pipeline, then the stages of the other
+        """
+        return Pipeline(self.__stages + other.stages)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or name not in OPERATIONS:
+            raise AttributeError("%r is not a stream operation" % name)
+
+        def stage(*args, **kwargs) -> 'Pipeline':
+            return Pipeline(self.__stages + ((name, args, kwargs),))
+        stage.__name__ = name
+        return stage
+
+    def __call__(self, source: Iterable) -> Any:
+        """
+        Apply the pipeline to a source
+        :param source: any iterable, or a stream
+        :return: the resulting stream, or the result of the final terminal operation
+        """
+        result = source if isinstance(source, Stream) else Stream(source)
+        for name, args, kwargs in self.__stages:
+            result = getattr(result, name)(*args, **kwargs)
+        return result
+
+    def __len__(self) -> int:
+        return len(self.__stages)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Pipeline) and self.__stages == other.stages
+
+    def __hash__(self):
+        return hash(tuple(name for name, _, _ in self.__stages))
+
+    def __repr__(self) -> str:
+        def call(name: str, args: tuple, kwargs: Dict[str, Any]) -> str:
+            return "%s(%s)" % (name, ", ".join(
+                [getattr(arg, "__name__", None) or repr(arg) for arg in args]
+                + ["%s=%r" % item for item in kwargs.items()]))
+        return "".join(["Pipeline()"] + ["." + call(*stage) for stage in self.__stages])
+
+    def __getstate__(self):
+        return self.__stages
+
+    def __setstate__(self, stages):
+        self.__stages = stages
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.product
+---
+
+A random-access cartesian product of sized collections, behind `streams.product_space`.
+
+Combinations are numbered in lexicographic (`itertools.product`) order, i.e. as mixed-radix numbers whose digits
+are indices into the collections. Any combination can be computed from its number in O(dimensions), so the space can
+be split into contiguous shards, or resumed from a number, without enumerating what comes before.
+"""
+
+from typing import Collection, Iterator, List, Tuple, Union
+from itertools import chain, islice, product
+
+
+class ProductSpace:
+    """
+    Cartesian product of sized collections with len(), indexing and contiguous slices
+    """
+    def __init__(self, *collections: Collection, repeat: int = 1):
+        """
+        :param collections: the collections; each is copied into a tuple
+        :param repeat: product of the collections with themselves this many times, as in `itertools.product`
+        """
+        if repeat < 1:
+            raise ValueError("Repeat number should be at least 1")
+        self.__pools = tuple(tuple(collection) for collection in collections) * repeat
+        size = 1
+        for pool in self.__pools:
+            size *= len(pool)
+        self.__size = size if self.__pools else 0
+
+    @property
+    def pools(self) -> Tuple[tuple, ...]:
+        return self.__pools
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def _index(self, index: int) -> int:
+        if index < 0:
+            index += self.__size
+        if not 0 <= index < self.__size:
+            raise IndexError("Product space index out of range")
+        return index
+
+    def digits(self, index: int) -> List[int]:
+        """
+        Indices into each collection of a combination
+        :param index: combination number, negative numbers count from the end
+        """
+        index = self._index(index)
+        digits = [0] * len(self.__pools)
+        for d in range(len(self.__pools) - 1, -1, -1):
+            index, digits[d] = divmod(index, len(self.__pools[d]))
+        return digits
+
+    def nth(self, index: int) -> Tuple:
+        """
+        The combination with a number, in O(dimensions)
+        :param index: combination number, negative numbers count from the end
+        """
+        return tuple(pool[digit] for pool, digit in zip(self.__pools, self.digits(index)))
+
+    def __getitem__(self, index: int) -> Tuple:
+        return self.nth(index)
+
+    def index_of(self, combination: Tuple) -> int:
+        """
+        Number of a combination, the inverse of `nth`
+        """
+        if len(combination) != len(self.__pools):
+            raise ValueError("Combination should have %d elements" % len(self.__pools))
+        index = 0
+        for pool, value in zip(self.__pools, combination):
+            index = index * len(pool) + pool.index(value)
+        return index
+
+    def iter_range(self, start: int = 0, stop: Union[int, None] = None) -> Iterator[Tuple]:
+        """
+        Combinations numbered from start (inclusive) to stop (exclusive), without enumerating the ones before start.
+        The range is produced as a chain of `itertools.product` blocks: the rest of the innermost position after the
+        start combination, then the rest of each outer position.
+        """
+        stop = self.__size if stop is None else min(stop, self.__size)
+        start = max(start, 0)
+        if start >= stop:
+            return iter(())
+        if start == 0:
+            return islice(product(*self.__pools), stop)
+        pools = self.__pools
+        digits = self.digits(start)
+        blocks = []
+        for d in range(len(pools) - 1, -1, -1):
+            first = digits[d] + (d < len(pools) - 1)
+            if first < len(pools[d]):
+                prefix = [(pool[digit],) for pool, digit in zip(pools[:d], digits[:d])]
+                blocks.append(product(*prefix, pools[d][first:], *pools[d + 1:]))
+        return islice(chain.from_iterable(blocks), stop - start)
+
+    def __iter__(self) -> Iterator[Tuple]:
+        return self.iter_range()
+
+    def shard_range(self, shard: int, shards: int) -> Tuple[int, int]:
+        """
+        (start, stop) numbers of a shard; the space is split into `shards` contiguous ranges differing in size by 1
+        at most
+        """
+        if not 0 <= shard < shards:
+            raise ValueError("Invalid shard %d of %d" % (shard, shards))
+        return self.__size * shard // shards, self.__size * (shard + 1) // shards
+
+    def shard(self, shard: int, shards: int) -> Iterator[Tuple]:
+        """
+        Combinations of the shard-th of `shards` contiguous ranges of the space
+        """
+        return self.iter_range(*self.shard_range(shard, shards))
+
+    def __repr__(self) -> str:
+        return "ProductSpace(%s)" % ", ".join("<%d>" % len(pool) for pool in self.__pools)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.recordfile
+---
+
+A compact, seekable binary file of records, used by `Stream.to_records` and `streams.from_records`.
+
+Layout: a magic header, then blocks of records, then a block index footer.
+Every block is a pickled list of records (pickle protocol 5 where available) framed by its length, with the
+out-of-band buffers of protocol 5 (e.g. NumPy arrays) stored raw after it. Files are read through mmap, and
+out-of-band buffers are handed to the unpickler as views of the mapping, without copies.
+"""
+
+from typing import Any, Iterable, Iterator, List, Tuple, Union
+from bisect import bisect_right
+from itertools import islice
+from os import PathLike
+import mmap
+import os
+import pickle
+import struct
+
+MAGIC = b"STRMREC1"
+INDEX_MAGIC = b"STRMIDX1"
+
+PROTOCOL = min(5, pickle.HIGHEST_PROTOCOL)
+DEFAULT_BLOCK_RECORDS = 1024
+
+_FRAME = struct.Struct("<QI")        # pickle length, number of out-of-band buffers
+_LENGTH = struct.Struct("<Q")
+_FOOTER = struct.Struct("<Q8s")      # index offset, index magic
+
+Path = Union[str, PathLike]
+
+
+class RecordFileWriter:
+    """
+    Writes records into a record file, a block at a time
+    """
+    def __init__(self, path: Path, block_records: int = DEFAULT_BLOCK_RECORDS):
+        """
+        :param path: file path
+        :param block_records: records per block; blocks are the unit of random access and of parallel reading
+        """
+        if block_records < 1:
+            raise ValueError("A block should hold at least 1 record")
+        self.path = os.fspath(path)
+        self.block_records = block_records
+        self.records = 0
+        self.__file = open(self.path, "wb")
+        self.__file.write(MAGIC)
+        self.__index = []   # (offset, first record)
+
+    def write_block(self, records: List[Any]) -> None:
+        if not records:
+            return
+        buffers = []
+        if PROTOCOL >= 5:
+            payload = pickle.dumps(records, protocol=PROTOCOL, buffer_callback=buffers.append)
+        else:   # pragma: no cover - Python < 3.8
+            payload = pickle.dumps(records, protocol=PROTOCOL)
+        raws = [buffer.raw() for buffer in buffers]
+        f = self.__file
+        self.__index.append((f.tell(), self.records))
+        f.write(_FRAME.pack(len(payload), len(raws)))
+        for raw in raws:
+            f.write(_LENGTH.pack(raw.nbytes))
+        f.write(payload)
+        for raw in raws:
+            f.write(raw)
+        self.records += len(records)
+
+    def write(self, records: Iterable[Any]) -> int:
+        """
+        Write all records
+        :return: number of records written so far
+        """
+        records = iter(records)
+        while True:
+            block = list(islice(records, self.block_records))
+            if not block:
+                return self.records
+            self.write_block(block)
+
+    def close(self) -> int:
+        """
+        Write the block index footer and close the file
+        :return: file size in bytes
+        """
+        f = self.__file
+        index_offset = f.tell()
+        f.write(pickle.dumps((self.records, self.__index), protocol=pickle.HIGHEST_PROTOCOL))
+        f.write(_FOOTER.pack(index_offset, INDEX_MAGIC))
+        size = f.tell()
+        f.close()
+        return size
+
+    def abort(self) -> None:
+        self.__file.close()
+        os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class RecordFile:
+    """
+    A memory mapped record file with random access by record index and by block
+    """
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < len(MAGIC) + _FOOTER.size:
+                raise ValueError("Not a record file: %s" % os.fspath(path))
+            self.__data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self.__data
+        index_offset, index_magic = _FOOTER.unpack_from(data, size - _FOOTER.size)
+        if data[:len(MAGIC)] != MAGIC or index_magic != INDEX_MAGIC:
+            raise ValueError("Not a complete record file: %s" % os.fspath(path))
+        self.__records, index = pickle.loads(data[index_offset:size - _FOOTER.size])
+        self.__offsets = [offset for offset, _ in index]
+        self.__starts = [start for _, start in index]
+
+    def __len__(self) -> int:
+        return self.__records
+
+    @property
+    def block_count(self) -> int:
+        return len(self.__offsets)
+
+    def block_of(self, record: int) -> int:
+        """
+        Index of the block containing a record
+        """
+        return bisect_right(self.__starts, record) - 1
+
+    def block_start(self, block: int) -> int:
+        """
+        Index of the first record of a block
+        """
+        return self.__starts[block]
+
+    def read_block(self, block: int) -> List[Any]:
+        """
+        Unpickle all records of a block; out-of-band buffers are read-only views into the file mapping
+        """
+        data = self.__data
+        offset = self.__offsets[block]
+        payload_length, buffer_count = _FRAME.unpack_from(data, offset)
+        offset += _FRAME.size
+        lengths = struct.unpack_from("<%dQ" % buffer_count, data, offset)
+        offset += _LENGTH.size * buffer_count
+        view = memoryview(data)
+        payload = view[offset:offset + payload_length]
+        offset += payload_length
+        buffers = []
+        for length in lengths:
+            buffers.append(view[offset:offset + length])
+            offset += length
+        if PROTOCOL >= 5:
+            return pickle.loads(payload, buffers=buffers)
+        return pickle.loads(payload)    # pragma: no cover - Python < 3.8
+
+    def blocks(self, start: int = 0, stop: Union[int, None] = None, step: int = 1) -> Iterator[List[Any]]:
+        """
+        Records of a range of blocks, a block at a time
+        """
+        for block in range(start, self.block_count if stop is None else stop, step):
+            yield self.read_block(block)
+
+    def iter_from(self, start: int = 0, shard: Union[Tuple[int, int], None] = None) -> Iterator[Any]:
+        """
+        Records from a record index on
+        :param start: index of the first record
+        :param shard: (i, n) - only the blocks i, i + n, i + 2n... for reading blocks in n parallel workers
+        """
+        if start >= self.__records:
+            return
+        first = self.block_of(max(start, 0))
+        skip = max(start, 0) - self.__starts[first]
+        step = 1
+        if shard is not None:
+            i, n = shard
+            if not 0 <= i < n:
+                raise ValueError("Invalid shard %r" % (shard,))
+            first, skip, step = first + (i - first) % n, skip if (i - first) % n == 0 else 0, n
+        for records in self.blocks(first, step=step):
+            if skip:
+                records, skip = records[skip:], 0
+            for record in records:
+                yield record
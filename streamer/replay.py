@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.replay
+---
+
+Replayable streams: a single-pass source is pulled once into a buffer and replayed to any number of readers.
+Elements beyond the in-memory limit are spilled to a temporary file and read back from disk.
+"""
+
+from typing import Generic, TypeVar, Iterator, Iterable, Union
+from collections import deque
+import pickle
+import tempfile
+from .memory import estimate_size
+
+T = TypeVar('T')
+
+_SAMPLE_EVERY = 64
+
+
+class SpillableBuffer(Generic[T]):
+    """
+    A buffer pulling lazily from a source and keeping its most recent elements in memory; older elements are spilled
+    to a temporary file once the memory limits are reached. Every reader keeps its own position.
+    """
+    def __init__(self, source: Iterator[T], *, max_memory: Union[int, None] = None,
+                 max_items: Union[int, None] = None, spill_dir: Union[str, None] = None,
+                 discard_consumed: bool = False):
+        """
+        :param source: the single-pass source
+        :param max_memory: estimated bytes of elements kept in memory; unbounded by default
+        :param max_items: number of elements kept in memory; unbounded by default
+        :param spill_dir: directory for the spill file; system temporary directory by default
+        :param discard_consumed: drop elements all registered readers have passed (no new readers afterwards)
+        """
+        self.__source = source
+        self.__max_memory = max_memory
+        self.__max_items = max_items
+        self.__spill_dir = spill_dir
+        self.__discard_consumed = discard_consumed
+        self.__exhausted = False
+
+        self.__memory = deque()
+        self.__memory_start = 0     # global index of memory[0]
+        self.__spill_file = None
+        self.__spill_offsets = deque()
+        self.__spill_start = 0      # global index of spill_offsets[0]
+        self.__positions = {}
+
+        self.__sampled = 0
+        self.__sampled_bytes = 0
+
+    @property
+    def size(self) -> int:
+        """
+        Number of elements pulled from the source so far
+        """
+        return self.__memory_start + len(self.__memory)
+
+    @property
+    def spilled(self) -> int:
+        """
+        Number of elements currently on disk
+        """
+        return len(self.__spill_offsets)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.__exhausted
+
+    def _over_limits(self) -> bool:
+        held = len(self.__memory)
+        if self.__max_items is not None and held > self.__max_items:
+            return True
+        if self.__max_memory is not None and self.__sampled:
+            return held * self.__sampled_bytes // self.__sampled > self.__max_memory
+        return False
+
+    def _spill_oldest(self) -> None:
+        if self.__spill_file is None:
+            self.__spill_file = tempfile.TemporaryFile(dir=self.__spill_dir)
+        f = self.__spill_file
+        f.seek(0, 2)
+        self.__spill_offsets.append(f.tell())
+        pickle.dump(self.__memory.popleft(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.__memory_start += 1
+
+    def _pull(self) -> bool:
+        if self.__exhausted:
+            return False
+        try:
+            item = next(self.__source)
+        except StopIteration:
+            self.__exhausted = True
+            return False
+
+        if self.__max_memory is not None and not self.size % _SAMPLE_EVERY:
+            self.__sampled += 1
+            self.__sampled_bytes += estimate_size(item)
+        self.__memory.append(item)
+        while self.__memory and self._over_limits():
+            self._spill_oldest()
+        return True
+
+    def _read_spilled(self, index: int) -> T:
+        f = self.__spill_file
+        f.seek(self.__spill_offsets[index - self.__spill_start])
+        return pickle.load(f)
+
+    def _discard(self) -> None:
+        oldest = min(self.__positions.values(), default=self.size)
+        while self.__spill_offsets and self.__spill_start < oldest:
+            self.__spill_offsets.popleft()
+            self.__spill_start += 1
+        while self.__memory and self.__memory_start < oldest:
+            self.__memory.popleft()
+            self.__memory_start += 1
+            self.__spill_start = max(self.__spill_start, self.__memory_start)
+
+    def get(self, index: int) -> T:
+        """
+        Get the element of a global index, pulling from the source if needed
+        :param index: global index
+        :return: the element
+        :raise IndexError: if the source depletes before the index
+        """
+        while index >= self.size:
+            if not self._pull():
+                raise IndexError(index)
+        if index >= self.__memory_start:
+            return self.__memory[index - self.__memory_start]
+        if index >= self.__spill_start:
+            return self._read_spilled(index)
+        raise IndexError("Element %d is already discarded" % index)
+
+    def reader(self) -> Iterator[T]:
+        """
+        A new reader from the earliest element still buffered
+        :return: iterator
+        """
+        key = object()
+        self.__positions[key] = self.__spill_start if self.__discard_consumed else 0
+        return self._read(key)
+
+    def _read(self, key) -> Iterator[T]:
+        try:
+            while True:
+                position = self.__positions[key]
+                try:
+                    item = self.get(position)
+                except IndexError:
+                    return
+                self.__positions[key] = position + 1
+                if self.__discard_consumed:
+                    self._discard()
+                yield item
+        finally:
+            del self.__positions[key]
+            if self.__discard_consumed:
+                self._discard()
+
+
+class Replayable(Generic[T]):
+    """
+    A replayable source: the underlying stream is computed once and can be iterated many times.
+    Wrap it as `Stream(replayable)` for every new pass.
+    """
+    def __init__(self, source: Iterable[T], *, max_memory: Union[int, None] = None,
+                 spill_dir: Union[str, None] = None):
+        """
+        :param source: the single-pass source
+        :param max_memory: estimated bytes kept in memory; the rest is spilled to disk. Unbounded by default.
+        :param spill_dir: directory for the spill file; system temporary directory by default
+        """
+        self.__buffer = SpillableBuffer(iter(source), max_memory=max_memory, spill_dir=spill_dir)
+
+    def __iter__(self) -> Iterator[T]:
+        return self.__buffer.reader()
+
+    def materialize(self) -> 'Replayable[T]':
+        """
+        Pull the whole source into the cache now
+        :return: self
+        """
+        while self.__buffer._pull():
+            pass
+        return self
+
+    def __len__(self) -> int:
+        return self.materialize().__buffer.size
+
+    @property
+    def spilled(self) -> int:
+        return self.__buffer.spilled
+
+
+def Tee(source: Iterator[T], n: int = 2, *, max_lag: Union[int, None] = None, spill_dir: Union[str, None] = None):
+    """
+    Split a source into n independent iterators, like itertools.tee
+    :param source: the single-pass source
+    :param n: number of iterators
+    :param max_lag: number of elements between the slowest and fastest iterators kept in memory; further elements
+        are spilled to disk. Unbounded by default.
+    :param spill_dir: directory for the spill file; system temporary directory by default
+    :return: tuple of iterators
+    """
+    buffer = SpillableBuffer(source, max_items=max_lag, spill_dir=spill_dir, discard_consumed=True)
+    return tuple(buffer.reader() for _ in range(n))
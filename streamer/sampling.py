@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.sampling
+---
+
+Random sampling behind `Stream.sample`, `Stream.reservoir`, `Stream.sample_by` and the sampling collectors.
+
+Both samplers skip ahead instead of drawing a random number per element: Bernoulli sampling draws the geometric gap
+to the next selected element, and reservoir sampling uses Algorithm L (Li, 1994), drawing the gap to the next
+replacement. Skipped elements are passed over with `islice`, without Python code per element.
+Reservoirs are mergeable, so sharded runs can combine partial samples into a uniform sample of the whole.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Union
+from collections import deque
+from itertools import count, islice
+from math import exp, inf, log, log1p
+import random
+import sys
+
+Seed = Union[int, str, bytes, None]
+
+
+def _rng(seed: Union[Seed, random.Random]) -> random.Random:
+    return seed if isinstance(seed, random.Random) else random.Random(seed)
+
+
+def _open_unit(rng: random.Random) -> float:
+    """
+    A uniform number in (0, 1), safe for log
+    """
+    u = rng.random()
+    while u == 0.0:     # pragma: no cover - happens once in 2 ** 53 draws
+        u = rng.random()
+    return u
+
+
+def check_probability(p: float) -> None:
+    if not 0 <= p <= 1:
+        raise ValueError("Sampling probability should be within [0, 1]")
+
+
+def log_miss(p: float) -> float:
+    """
+    log(1 - p), exact for tiny p: the log of the probability of passing over an element kept with probability p
+    """
+    return log1p(-p) if p < 1 else -inf
+
+
+def geometric_gap(rng: random.Random, log_q: float) -> Union[int, float]:
+    """
+    Number of elements passed over before the next kept one ~ Geometric(p)
+    :param rng: random generator
+    :param log_q: `log_miss(p)`
+    :return: the gap, `math.inf` if no element is ever kept again (p == 0, or a gap beyond any iterator's reach)
+    """
+    if log_q == 0:
+        return inf
+    gap = log(_open_unit(rng)) / log_q
+    return int(gap) if gap < sys.maxsize else inf
+
+
+def BernoulliSampler(source: Iterable[Any], p: float, seed: Union[Seed, random.Random] = None) -> Iterator[Any]:
+    """
+    A generator of the elements each kept with probability p, independently
+    :param source: elements
+    :param p: keep probability, 0 <= p <= 1
+    :param seed: random seed, or a `random.Random`
+    """
+    check_probability(p)
+    source = iter(source)
+    if p == 1:
+        yield from source
+        return
+    if p == 0:
+        return
+    rng = _rng(seed)
+    log_q = log_miss(p)
+    while True:
+        gap = geometric_gap(rng, log_q)
+        if gap == inf:
+            return
+        for item in islice(source, gap, gap + 1):
+            yield item
+            break
+        else:
+            return
+
+
+class Reservoir:
+    """
+    A uniform random sample of at most k of the elements seen (Algorithm L); mergeable with another reservoir.
+    Conceptually every element draws a uniform key and the reservoir keeps the k smallest keys: `w` is the largest
+    kept key, so the gap to the next element beating it is geometric.
+    """
+    __slots__ = ("k", "seen", "items", "_rng", "_w", "_next")
+
+    def __init__(self, k: int, seed: Union[Seed, random.Random] = None):
+        if k < 0:
+            raise ValueError("Reservoir size should not be negative")
+        self.k = k
+        self.seen = 0
+        self.items = []     # type: List[Any]
+        self._rng = _rng(seed)
+        self._w = 1.0
+        self._next = k      # index of the next element to be put in the reservoir
+
+    def _schedule(self, last: int) -> None:
+        """
+        Index of the next replacement after the element at index `last`
+        """
+        self._next = last + 1 + int(log(_open_unit(self._rng)) / log1p(-self._w))
+
+    def add(self, item: Any) -> None:
+        index = self.seen
+        self.seen += 1
+        if index < self.k:
+            self.items.append(item)
+            if self.seen == self.k:
+                self._w = exp(log(_open_unit(self._rng)) / self.k)
+                self._schedule(index)
+        elif index == self._next and self.k:
+            self.items[self._rng.randrange(self.k)] = item
+            self._w *= exp(log(_open_unit(self._rng)) / self.k)
+            self._schedule(index)
+
+    def add_all(self, items: Iterable[Any]) -> 'Reservoir':
+        """
+        Add all elements; the ones skipped over are counted but never touched by Python code
+        """
+        items = iter(items)
+        while len(self.items) < self.k:
+            item = next(items, _END)
+            if item is _END:
+                return self
+            self.add(item)
+        counter = count()
+        base = self.seen
+        if self.k == 0:
+            deque(zip(items, counter), maxlen=0)
+            self.seen = base + next(counter)
+            return self
+        pairs = zip(items, counter)
+        while True:
+            gap = self._next - self.seen
+            for item, _ in islice(pairs, gap, gap + 1):
+                break
+            else:
+                self.seen = base + next(counter)
+                return self
+            self.seen = self._next
+            self.add(item)
+
+    def merge(self, other: 'Reservoir') -> 'Reservoir':
+        """
+        A uniform sample of both reservoirs' elements: the number taken from each side follows the hypergeometric
+        distribution of drawing k out of `self.seen + other.seen`
+        """
+        rng = self._rng
+        size = min(self.k, self.seen + other.seen)
+        left, right = self.seen, other.seen
+        take_left = 0
+        for _ in range(size):
+            if rng.randrange(left + right) < left:
+                take_left += 1
+                left -= 1
+            else:
+                right -= 1
+        merged = Reservoir(self.k, rng)
+        merged.items = rng.sample(self.items, take_left) + rng.sample(other.items, size - take_left)
+        merged.seen = self.seen + other.seen
+        if merged.seen >= self.k > 0:
+            # the largest kept key is the k-th smallest of `seen` uniforms, ~ Beta(k, seen - k + 1); given it, the
+            # kept elements are a uniform subset, so drawing it afresh continues Algorithm L exactly
+            merged._w = rng.betavariate(self.k, merged.seen - self.k + 1)
+            merged._schedule(merged.seen - 1)
+        return merged
+
+
+_END = object()
+
+
+def reservoir_sample(source: Iterable[Any], k: int, seed: Union[Seed, random.Random] = None) -> List[Any]:
+    """
+    A uniform random sample of k elements (all if fewer), in no particular order
+    """
+    return Reservoir(k, seed).add_all(source).items
+
+
+class Strata:
+    """
+    A reservoir of at most k elements per key group; mergeable with other strata
+    """
+    __slots__ = ("k", "reservoirs", "_rng")
+
+    def __init__(self, k: int, seed: Union[Seed, random.Random] = None):
+        self.k = k
+        self.reservoirs = {}    # type: Dict[Any, Reservoir]
+        self._rng = _rng(seed)
+
+    def add(self, group: Any, item: Any) -> None:
+        reservoir = self.reservoirs.get(group)
+        if reservoir is None:
+            reservoir = self.reservoirs[group] = Reservoir(self.k, self._rng)
+        reservoir.add(item)
+
+    def merge(self, other: 'Strata') -> 'Strata':
+        merged = Strata(self.k, self._rng)
+        merged.reservoirs = dict(self.reservoirs)
+        for group, reservoir in other.reservoirs.items():
+            mine = merged.reservoirs.get(group)
+            merged.reservoirs[group] = reservoir if mine is None else mine.merge(reservoir)
+        return merged
+
+    def samples(self) -> Dict[Any, List[Any]]:
+        return {group: reservoir.items for group, reservoir in self.reservoirs.items()}
+
+
+def stratified_sample(source: Iterable[Any], key: Callable[[Any], Any], k: int,
+                      seed: Union[Seed, random.Random] = None) -> Dict[Any, List[Any]]:
+    """
+    A uniform random sample of k elements (all if fewer) of every key group, groups in order of first appearance
+    """
+    strata = Strata(k, seed)
+    for item in source:
+        strata.add(key(item), item)
+    return strata.samples()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.seekable
+---
+
+Sized, seekable generator sources behind `streams.constant_of`, `streams.arange` and `streams.counter`, and the fast
+paths they enable: `Stream.count` reads the length, `Stream.skip` / `Stream.limit` move or cut the source in O(1), and
+numeric streams build whole chunks of an arithmetic progression at once.
+
+The sources subclass the C iterators (`itertools.repeat`, `itertools.count`, `map` over indices), so elements are
+still produced without Python code per element; the subclasses only remember what they were made of. Integer ranges
+are plain `range` iterators, and iterators of lists, tuples and ranges are moved through their pickling state.
+"""
+
+from typing import Iterator, Tuple, Union
+from itertools import count, repeat
+from math import ceil
+from operator import add, length_hint, mul
+
+Number = Union[int, float]
+
+_LIST_ITERATOR = type(iter([]))
+_TUPLE_ITERATOR = type(iter(()))
+_RANGE_ITERATORS = (type(iter(range(0))), type(iter(range(1 << 64))))
+_SEQUENCE_ITERATORS = (_LIST_ITERATOR, _TUPLE_ITERATOR) + _RANGE_ITERATORS
+
+
+class Constant(repeat):
+    """
+    A value repeated a number of times
+    """
+    __slots__ = ("value", )
+
+    def __new__(cls, value, times: int):
+        self = repeat.__new__(cls, value, max(times, 0))
+        self.value = value
+        return self
+
+    def skip(self, num: int) -> 'Constant':
+        return Constant(self.value, length_hint(self) - num)
+
+    def split(self, num: int) -> Tuple['Constant', 'Constant']:
+        length = length_hint(self)
+        return Constant(self.value, min(length, num)), Constant(self.value, length - num)
+
+
+class Counter(count):
+    """
+    Integers from start, step apart, forever
+    """
+    __slots__ = ("step", )
+
+    def __new__(cls, start: int = 0, step: int = 1):
+        self = count.__new__(cls, start, step)
+        self.step = step
+        return self
+
+    def skip(self, num: int) -> 'Counter':
+        # the iterator is given up for the one returned, reading its current value is harmless
+        return Counter(next(self) + num * self.step, self.step)
+
+    def split(self, num: int) -> Tuple[Iterator[int], 'Counter']:
+        current = next(self)
+        rest = Counter(current + num * self.step, self.step)
+        if self.step == 0:
+            return Constant(current, num), rest
+        return iter(range(current, current + num * self.step, self.step)), rest
+
+
+class Affine(map):
+    """
+    `start + i * step` for the indices i of an index source (a range iterator or a `Counter`), computed like NumPy's
+    `arange` rather than by repeated addition
+    """
+    __slots__ = ("start", "step", "indices")
+
+    def __new__(cls, start: Number, step: Number, indices: Iterator[int]):
+        self = map.__new__(cls, add, repeat(start), map(mul, indices, repeat(step)))
+        self.start = start
+        self.step = step
+        self.indices = indices
+        return self
+
+    def __length_hint__(self) -> int:
+        return length_hint(self.indices)
+
+    def skip(self, num: int) -> 'Affine':
+        return Affine(self.start, self.step, skip_ahead(self.indices, num))
+
+    def split(self, num: int) -> Tuple['Affine', 'Affine']:
+        first, rest = split_at(self.indices, num)
+        return Affine(self.start, self.step, first), Affine(self.start, self.step, rest)
+
+
+def progression(start: Number, stop: Union[Number, None], step: Number) -> Iterator[Number]:
+    """
+    Iterator of the arithmetic progression from start, step apart, up to stop (excluded) or forever
+    """
+    if step == 0 and stop is not None:
+        raise ValueError("Step of a bounded progression should not be zero")
+    if any(isinstance(x, bool) for x in (start, stop, step)):
+        raise TypeError("Progression bounds and step should be numbers, not booleans")
+    if isinstance(start, int) and isinstance(step, int) and (stop is None or isinstance(stop, int)):
+        return Counter(start, step) if stop is None else iter(range(start, stop, step))
+    if stop is None:
+        return Affine(start, step, Counter())
+    return Affine(start, step, iter(range(max(0, ceil((stop - start) / step)))))
+
+
+def _remaining_range(iterator) -> range:
+    state = iterator.__reduce__()
+    # an exhausted iterator forgets its range
+    return state[1][0][state[2]:] if len(state) > 2 else range(0)
+
+
+def exact_length(iterator: Iterator) -> Union[int, None]:
+    """
+    Number of elements left in an iterator, if known without walking it
+    """
+    cls = type(iterator)
+    if cls in _SEQUENCE_ITERATORS or cls is Constant or (cls is Affine and type(iterator.indices) is not Counter):
+        return length_hint(iterator)
+    return None
+
+
+def skip_ahead(iterator: Iterator, num: int) -> Union[Iterator, None]:
+    """
+    The iterator without its first num elements, in O(1); None if it cannot be done without walking it
+    """
+    cls = type(iterator)
+    if cls in _SEQUENCE_ITERATORS:
+        state = iterator.__reduce__()
+        if len(state) > 2:
+            iterator.__setstate__(state[2] + num)
+        return iterator
+    if cls is Constant or cls is Counter or cls is Affine:
+        return iterator.skip(num)
+    return None
+
+
+def split_at(iterator: Iterator, num: int) -> Union[Tuple[Iterator, Iterator], None]:
+    """
+    (the first num elements, the elements after them) of the iterator, both sources as sized and seekable as the
+    iterator, in O(1); None if it cannot be done without walking it. The iterator itself is given up for the rest.
+    """
+    cls = type(iterator)
+    if cls in _RANGE_ITERATORS:
+        return iter(_remaining_range(iterator)[:num]), skip_ahead(iterator, num)
+    if cls is Constant or cls is Counter or cls is Affine:
+        return iterator.split(num)
+    return None
+
+
+def arithmetic_of(iterator: Iterator) -> Union[Tuple[range, Number, Number], None]:
+    """
+    (indices, start, step) if the finite iterator left is `start + i * step` for the i in indices
+    """
+    cls = type(iterator)
+    if cls in _RANGE_ITERATORS:
+        return _remaining_range(iterator), 0, 1
+    if cls is Affine and type(iterator.indices) in _RANGE_ITERATORS:
+        return _remaining_range(iterator.indices), iterator.start, iterator.step
+    return None
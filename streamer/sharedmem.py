@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.sharedmem
+---
+
+Shared-memory batch transport for process-pool stages (`Stream.process_map`, and the process executor of the
+parallel search terminals).
+
+A `SharedBatchPool` owns a process pool and one `multiprocessing.shared_memory` segment cut into fixed-size slots,
+used as a ring: each batch in flight borrows a slot. Batches of ints, floats, bytes, or fixed-width records (tuples of
+ints and floats) are packed into the slot and only (slot offset, kind, size) crosses the process boundary; the worker
+unpacks them, runs the task, and packs a list result back into the same slot. Anything else - other element types,
+batches too large for a slot, no free slot, Python without `shared_memory` - is pickled as usual.
+"""
+
+from typing import Any, Callable, List, Tuple, Union
+from array import array
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import accumulate, chain
+import struct
+import threading
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:     # pragma: no cover - Python < 3.8
+    shared_memory = None
+
+DEFAULT_SLOT_BYTES = 1 << 20
+
+INTS = "ints"
+FLOATS = "floats"
+BYTES = "bytes"
+RECORDS = "records"
+
+_WORD = 8
+_RECORD_CODES = {int: "q", float: "d"}
+
+Encoding = Tuple[str, Any, int]     # kind, meta, number of bytes
+
+
+def encode_into(batch: List[Any], buf: memoryview) -> Union[Encoding, None]:
+    """
+    Pack a batch into a buffer
+    :return: (kind, meta, number of bytes), or None if the batch type or size does not allow it
+    """
+    if not isinstance(batch, list) or not batch:
+        return None
+    types = set(map(type, batch))
+    if len(types) != 1:
+        return None
+    kind = types.pop()
+    try:
+        if kind is int or kind is float:
+            packed = array("q" if kind is int else "d", batch)
+            nbytes = len(packed) * _WORD
+            if nbytes > len(buf):
+                return None
+            buf[:nbytes] = memoryview(packed).cast("B")
+            return INTS if kind is int else FLOATS, len(batch), nbytes
+        if kind is bytes:
+            ends = array("q", accumulate(map(len, batch)))
+            head = len(batch) * _WORD
+            nbytes = head + ends[-1]
+            if nbytes > len(buf):
+                return None
+            buf[:head] = memoryview(ends).cast("B")
+            buf[head:nbytes] = b"".join(batch)
+            return BYTES, len(batch), nbytes
+        if kind is tuple:
+            signatures = set(tuple(map(type, record)) for record in batch)
+            if len(signatures) != 1:
+                return None
+            fmt = "<" + "".join(_RECORD_CODES[t] for t in signatures.pop())
+            record = struct.Struct(fmt)
+            nbytes = record.size * len(batch)
+            if nbytes > len(buf) or record.size == 0:
+                return None
+            struct.pack_into("<" + fmt[1:] * len(batch), buf, 0, *chain.from_iterable(batch))
+            return RECORDS, fmt, nbytes
+    except (OverflowError, KeyError, struct.error):
+        return None
+    return None
+
+
+def decode_from(encoding: Encoding, buf: memoryview) -> List[Any]:
+    """
+    Unpack a batch packed by `encode_into`; the result owns its data
+    """
+    kind, meta, nbytes = encoding
+    if kind == INTS:
+        return buf[:nbytes].cast("q").tolist()
+    if kind == FLOATS:
+        return buf[:nbytes].cast("d").tolist()
+    if kind == BYTES:
+        head = meta * _WORD
+        ends = buf[:head].cast("q").tolist()
+        data = bytes(buf[head:nbytes])
+        return [data[start:end] for start, end in zip(chain((0,), ends), ends)]
+    if kind == RECORDS:
+        return list(struct.iter_unpack(meta, buf[:nbytes]))
+    raise ValueError("Unknown batch encoding %r" % kind)
+
+
+###
+# Worker process side
+###
+
+_segment = None
+
+
+def _attach(name: str) -> None:
+    global _segment
+    # the pool shares the resource tracker of the creating process, which unlinks the segment
+    _segment = shared_memory.SharedMemory(name)
+
+
+def _run(task: Callable[..., Any], args: tuple, location: Tuple[Any, ...]) -> Tuple[Any, ...]:
+    """
+    Run a task on a batch
+    :param location: ("value", batch), or ("slot", offset, slot bytes, encoding)
+    :return: ("value", result), or ("slot", encoding) for a list result packed in the same slot
+    """
+    if location[0] == "value":
+        return "value", task(location[1], *args)
+    _, offset, slot_bytes, encoding = location
+    slot = _segment.buf[offset:offset + slot_bytes]
+    try:
+        result = task(decode_from(encoding, slot), *args)
+        if isinstance(result, list):
+            packed = encode_into(result, slot)
+            if packed is not None:
+                return "slot", packed
+        return "value", result
+    finally:
+        slot.release()
+
+
+###
+# Coordinator side
+###
+
+class _SharedFuture(Future):
+    def __init__(self, inner: Future):
+        super(_SharedFuture, self).__init__()
+        self.__inner = inner
+
+    def cancel(self) -> bool:
+        return self.__inner.cancel() and super(_SharedFuture, self).cancel()
+
+
+class SharedBatchPool:
+    """
+    A process pool whose tasks take a batch (list) as their first argument, transferred through shared memory
+    """
+    def __init__(self, workers: int, *, slots: Union[int, None] = None, slot_bytes: int = DEFAULT_SLOT_BYTES):
+        """
+        :param workers: number of processes
+        :param slots: batches that can be in shared memory at once; 2 per worker by default
+        :param slot_bytes: capacity of a slot
+        """
+        slots = slots or 2 * workers
+        self.__slot_bytes = slot_bytes
+        self.__segment = None
+        if shared_memory is not None:
+            self.__segment = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+            self.__pool = ProcessPoolExecutor(workers, initializer=_attach, initargs=(self.__segment.name,))
+        else:   # pragma: no cover - Python < 3.8
+            self.__pool = ProcessPoolExecutor(workers)
+        self.__free = list(range(slots))
+        self.__lock = threading.Lock()
+        self.__pending = 0          # tasks whose done callback has not finished
+        self.__closing = False
+
+    def _borrow(self) -> Union[int, None]:
+        with self.__lock:
+            return self.__free.pop() if self.__free else None
+
+    def _give_back(self, slot: int) -> None:
+        with self.__lock:
+            self.__free.append(slot)
+
+    def submit(self, task: Callable[..., Any], batch: List[Any], *args) -> Future:
+        """
+        Run `task(batch, *args)` in a worker process; task should be picklable
+        :return: future of the result
+        """
+        slot = None if self.__segment is None else self._borrow()
+        location = ("value", batch)
+        if slot is not None:
+            offset = slot * self.__slot_bytes
+            view = self.__segment.buf[offset:offset + self.__slot_bytes]
+            try:
+                encoding = encode_into(batch, view)
+            finally:
+                view.release()
+            if encoding is None:
+                self._give_back(slot)
+                slot = None
+            else:
+                location = ("slot", offset, self.__slot_bytes, encoding)
+
+        with self.__lock:
+            self.__pending += 1
+        try:
+            inner = self.__pool.submit(_run, task, args, location)
+        except BaseException:
+            if slot is not None:
+                self._give_back(slot)
+            self._task_done()
+            raise
+        outer = _SharedFuture(inner)
+
+        def done(future: Future) -> None:
+            try:
+                if future.cancelled():
+                    return
+                if not outer.set_running_or_notify_cancel():
+                    return
+                try:
+                    where, value = future.result()
+                    if where == "slot":
+                        view = self.__segment.buf[offset:offset + self.__slot_bytes]
+                        try:
+                            value = decode_from(value, view)
+                        finally:
+                            view.release()
+                    outer.set_result(value)
+                except BaseException as e:
+                    outer.set_exception(e)
+            finally:
+                if slot is not None:
+                    self._give_back(slot)
+                self._task_done()
+        inner.add_done_callback(done)
+        return outer
+
+    def _task_done(self) -> None:
+        with self.__lock:
+            self.__pending -= 1
+            release = self.__closing and self.__pending == 0
+        if release:
+            self._release()
+
+    def _release(self) -> None:
+        with self.__lock:
+            segment, self.__segment = self.__segment, None
+        if segment is not None:
+            segment.close()
+            segment.unlink()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Shut the pool down; the shared memory is released once the tasks still running are done
+        """
+        self.__pool.shutdown(wait=wait)
+        with self.__lock:
+            self.__closing = True
+            release = self.__pending == 0
+        if release:
+            self._release()
+
+    def __enter__(self) -> 'SharedBatchPool':
+        return self
+
+    def __exit__(self, *_):
+        self.shutdown()
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.sinks
+---
+
+Buffered text sinks behind `Stream.write_lines`, `Stream.to_file`, `Stream.to_jsonl` and `Stream.to_csv`.
+Serialized records are gathered into large buffers written with a single call each, optionally on a background
+thread so that serialization overlaps I/O. Files can be written atomically (renamed into place once complete) and
+rolled over by size or record count.
+"""
+
+from typing import Any, Callable, IO, Iterable, Iterator, List, Union
+from collections import namedtuple
+from itertools import accumulate, islice
+from os import PathLike
+import csv
+import os
+import queue
+import threading
+import uuid
+from types import SimpleNamespace
+from .compression import open_text, compression_of_path, AUTO
+
+WriteResult = namedtuple("WriteResult", "records size paths")
+
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+_CHUNK = 4096
+_STOP = object()
+
+
+class _BackgroundWriter:
+    """
+    Runs write / close operations in order on a single thread; errors are raised on the caller's next call
+    """
+    def __init__(self, depth: int = 4):
+        self.__operations = queue.Queue(depth)
+        self.__error = None
+        self.__thread = threading.Thread(target=self._run, daemon=True)
+        self.__thread.start()
+
+    def _run(self) -> None:
+        while True:
+            operation = self.__operations.get()
+            if operation is _STOP:
+                return
+            if self.__error is None:
+                try:
+                    operation()
+                except BaseException as e:
+                    self.__error = e
+
+    def _raise_error(self) -> None:
+        if self.__error is not None:
+            error, self.__error = self.__error, None
+            raise error
+
+    def submit(self, operation: Callable[[], Any]) -> None:
+        self._raise_error()
+        self.__operations.put(operation)
+
+    def join(self) -> None:
+        self.__operations.put(_STOP)
+        self.__thread.join()
+        self._raise_error()
+
+
+class _Inline:
+    @staticmethod
+    def submit(operation: Callable[[], Any]) -> None:
+        operation()
+
+    @staticmethod
+    def join() -> None:
+        pass
+
+
+class TextSink:
+    """
+    Writes serialized records (str) to a file object, or to files at a path
+    """
+    def __init__(self, target: Union[str, PathLike, IO[str]], *, compress: Union[str, None] = AUTO,
+                 encoding: str = "utf-8", compresslevel: Union[int, None] = None, atomic: bool = False,
+                 max_bytes: Union[int, None] = None, max_records: Union[int, None] = None, background: bool = False,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE, header: Union[Callable[[], str], None] = None):
+        """
+        :param target: an open text file, or a file path. With rolling the path should contain an `{index}` field,
+            e.g. "part-{index:05d}.jsonl.gz"
+        :param compress: for paths - "gzip", "bz2", "xz", None; or "auto" - by the file extension
+        :param encoding: text encoding for paths
+        :param compresslevel: compression level for paths
+        :param atomic: for paths - write into a temporary file in the same directory, renamed into place once complete
+        :param max_bytes: for paths - start a new file once a file has this many characters (before compression)
+        :param max_records: for paths - start a new file once a file has this many records
+        :param background: write on a background thread
+        :param buffer_size: characters gathered before each write call
+        :param header: function producing the header text of every file, e.g. CSV header row
+        """
+        is_path = isinstance(target, (str, PathLike))
+        if not is_path and (atomic or max_bytes is not None or max_records is not None):
+            raise ValueError("Atomic writes and rolling need a file path, not an open file")
+        rolling = max_bytes is not None or max_records is not None
+        if rolling and "{index" not in os.fspath(target):
+            raise ValueError("Rolling file path should contain an `{index}` field, e.g. part-{index:05d}.txt")
+        self.__target = target
+        self.__is_path = is_path
+        self.__rolling = rolling
+        self.__open_options = {"compression": compress, "encoding": encoding, "compresslevel": compresslevel}
+        self.__atomic = atomic
+        self.__max_bytes = max_bytes
+        self.__max_records = max_records
+        self.__background = background
+        self.__buffer_size = buffer_size
+        self.__header = header
+
+        self.__file = None
+        self.__file_path = None
+        self.__temp_path = None
+        self.__file_size = 0
+        self.__file_records = 0
+        self.__paths = []
+        self.__writer = None
+        self.__buffer = []
+        self.__buffered = 0
+
+    def _path_of(self, index: int) -> str:
+        return os.fspath(self.__target).format(index=index) if self.__rolling else os.fspath(self.__target)
+
+    def _open(self) -> None:
+        # opened once the first records are serialized, as the header may depend on them (e.g. CSV field names)
+        if not self.__is_path:
+            self.__file = self.__target
+            self._start_file()
+            return
+        path = self._path_of(len(self.__paths))
+        self.__file_path = path
+        self.__paths.append(path)
+        options = dict(self.__open_options)
+        if options["compression"] == AUTO:
+            options["compression"] = compression_of_path(path)
+        if self.__atomic:
+            directory, name = os.path.split(os.path.abspath(path))
+            self.__temp_path = os.path.join(directory, ".%s.%s.tmp" % (name, uuid.uuid4().hex[:12]))
+            self.__file = open_text(self.__temp_path, "wt", **options)
+        else:
+            self.__file = open_text(path, "wt", **options)
+        self._start_file()
+
+    def _start_file(self) -> None:
+        self.__file_size = self.__file_records = 0
+        if self.__header is not None:
+            text = self.__header()
+            self.__buffer.append(text)
+            self.__buffered += len(text)
+            self.__file_size += len(text)
+
+    def _flush(self) -> None:
+        if self.__buffer:
+            data = "".join(self.__buffer)
+            self.__buffer, self.__buffered = [], 0
+            self.__writer.submit(lambda fp=self.__file: fp.write(data))
+
+    def _finish_file(self) -> None:
+        self._flush()
+        fp, temp_path, path = self.__file, self.__temp_path, self.__file_path
+        self.__file = self.__temp_path = None
+        if not self.__is_path:
+            self.__writer.submit(fp.flush)
+            return
+
+        def finish():
+            fp.close()
+            if temp_path is not None:
+                os.replace(temp_path, path)
+        self.__writer.submit(finish)
+
+    def _abort(self) -> None:
+        fp, temp_path = self.__file, self.__temp_path
+        self.__buffer, self.__buffered = [], 0
+        try:
+            self.__writer.join()
+        except BaseException:
+            pass
+        if self.__is_path and fp is not None:
+            fp.close()
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    def _take(self, chunk: List[str]) -> int:
+        """
+        Number of leading records of the chunk that belong to the current file
+        """
+        take = len(chunk)
+        if self.__max_records is not None:
+            take = min(take, self.__max_records - self.__file_records)
+        if self.__max_bytes is not None:
+            room = self.__max_bytes - self.__file_size
+            for i, total in enumerate(accumulate(map(len, islice(chunk, take)))):
+                if total >= room:
+                    return i + 1
+        return max(take, 1)
+
+    def write(self, texts: Iterable[str]) -> WriteResult:
+        """
+        Write all serialized records and close the files
+        :param texts: serialized records
+        :return: WriteResult(records, size, paths) - number of records, characters written and paths of files
+        """
+        self.__writer = _BackgroundWriter() if self.__background else _Inline()
+        records = size = 0
+        texts = iter(texts)
+        try:
+            while True:
+                chunk = list(islice(texts, _CHUNK))
+                if not chunk:
+                    break
+                while chunk:
+                    if self.__file is None:
+                        self._open()
+                    take = self._take(chunk) if self.__rolling else len(chunk)
+                    part, chunk = (chunk, []) if take == len(chunk) else (chunk[:take], chunk[take:])
+                    part_size = sum(map(len, part))
+                    self.__buffer.extend(part)
+                    self.__buffered += part_size
+                    self.__file_size += part_size
+                    self.__file_records += len(part)
+                    records += len(part)
+                    size += part_size
+                    if self.__rolling and (
+                            self.__max_records is not None and self.__file_records >= self.__max_records
+                            or self.__max_bytes is not None and self.__file_size >= self.__max_bytes):
+                        self._finish_file()
+                    elif self.__buffered >= self.__buffer_size:
+                        self._flush()
+            if self.__file is None and not self.__paths:
+                self._open()    # an empty output still creates its file, or gets its header
+            if self.__file is not None:
+                self._finish_file()
+            self.__writer.join()
+        except BaseException:
+            self._abort()
+            raise
+        return WriteResult(records, size, list(self.__paths))
+
+
+class CsvFormatter:
+    """
+    Formats rows (dicts, or sequences) into CSV lines, a chunk of rows at a time
+    """
+    def __init__(self, fieldnames: Union[List[str], None] = None, **csv_options):
+        self.fieldnames = fieldnames
+        self.__lines = []
+        # csv writers issue exactly one write call per row
+        self.__writer = csv.writer(SimpleNamespace(write=self.__lines.append),
+                                   **dict(csv_options, lineterminator=csv_options.get("lineterminator", "\n")))
+
+    def header(self) -> str:
+        if self.fieldnames is None:
+            return ""
+        self.__writer.writerow(self.fieldnames)
+        return self.__lines.pop()
+
+    def format_all(self, rows: Iterable[Any]) -> Iterator[str]:
+        rows = iter(rows)
+        chunk = list(islice(rows, _CHUNK))
+        if not chunk:
+            return
+        to_values = None
+        if hasattr(chunk[0], "keys"):
+            if self.fieldnames is None:
+                self.fieldnames = list(chunk[0].keys())
+            fieldnames = self.fieldnames
+            to_values = (lambda row: [row.get(name, "") for name in fieldnames])
+        lines = self.__lines
+        while chunk:
+            self.__writer.writerows(chunk if to_values is None else map(to_values, chunk))
+            for line in lines:
+                yield line
+            lines.clear()
+            chunk = list(islice(rows, _CHUNK))
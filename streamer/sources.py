@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+
+"""
+streamer.sources
+---
+
+Bulk record readers for JSON-lines and CSV sources, used by `streams.jsonl` and `streams.csv_records`.
+Input is read a batch of lines at a time; only the requested columns are kept and typed, and a `where` column
+expression is evaluated on those columns before any record is built.
+Fixed-size binary records (`streams.structs`) are decoded straight from a memory mapping, and growing log files are
+tailed by `streams.follow`.
+"""
+
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Tuple, Union
+from itertools import islice
+from operator import itemgetter
+from os import PathLike
+import csv
+import json
+import mmap
+import os
+import struct
+import time
+from .columnar import RecordBatch, Schema, DEFAULT_BATCH_SIZE
+from .expr import Expr
+
+try:
+    import numpy
+except ImportError:     # pragma: no cover - NumPy is optional
+    numpy = None
+
+Source = Union[str, PathLike, IO[str]]
+
+
+def _open_text(source: Source, **open_options) -> IO[str]:
+    if isinstance(source, (str, PathLike)):
+        return open(source, encoding="utf-8", **open_options)
+    return source
+
+
+def _projected_batch(columns: Dict[Any, list], names: List[Any], start: int, size: int,
+                     where: Union[Expr, None]) -> RecordBatch:
+    batch = RecordBatch(Schema(list(columns)), list(columns.values()), range(start, start + size))
+    if where is not None:
+        batch = batch.compress(where.evaluate_columns(columns, size))
+    return batch if list(batch.schema) == names else batch.select(*names)
+
+
+_raw_decode = json.JSONDecoder().raw_decode
+
+
+def _decode_lines(lines: List[str]) -> List[Any]:
+    values = []
+    append = values.append
+    for line in lines:
+        # the C scanner without the checks of `json.loads`; each value should end its own line
+        try:
+            value, end = _raw_decode(line)
+        except ValueError:
+            if line.isspace():
+                continue
+            value, end = json.loads(line), len(line)    # leading whitespace, or fails on the bad line
+        if end != len(line) and not line[end:].isspace():
+            json.loads(line)    # fails on the extra data
+        append(value)
+    return values
+
+
+def JsonLinesDecoder(source: Source, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Any]:
+    """
+    A generator of all decoded values of a JSON-lines source, decoded a batch of lines at a time
+    """
+    fp = _open_text(source)
+    try:
+        while True:
+            lines = list(islice(fp, batch_size))
+            if not lines:
+                return
+            for value in _decode_lines(lines):
+                yield value
+    finally:
+        if fp is not source:
+            fp.close()
+
+
+def JsonLinesReader(source: Source, fields: Union[Iterable[Any], None] = None, *,
+                    where: Union[Expr, None] = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[RecordBatch]:
+    """
+    A generator of record batches of a JSON-lines source; blank lines are skipped
+    :param source: file path or text buffer
+    :param fields: fields to keep; missing fields are None. All fields of the first record by default.
+    :param where: column expression records are filtered with
+    :param batch_size: lines read and decoded together
+    """
+    fp = _open_text(source)
+    names = None if fields is None else list(fields)
+    try:
+        start = 0
+        while True:
+            lines = list(islice(fp, batch_size))
+            if not lines:
+                return
+            records = _decode_lines(lines)
+            if not records:
+                continue
+            if names is None:
+                names = list(records[0])
+            wanted = names if where is None else names + [c for c in where.columns() if c not in names]
+            columns = {name: [record.get(name) for record in records] for name in wanted}
+            yield _projected_batch(columns, names, start, len(records), where)
+            start += len(records)
+    finally:
+        if fp is not source:
+            fp.close()
+
+
+def CsvReader(source: Source, columns: Union[Iterable[str], None] = None, *,
+              types: Union[Dict[str, Callable[[str], Any]], None] = None, where: Union[Expr, None] = None,
+              batch_size: int = DEFAULT_BATCH_SIZE, **csv_options) -> Iterator[RecordBatch]:
+    """
+    A generator of record batches of a CSV source with a header row
+    :param source: file path or text buffer
+    :param columns: columns to keep; all columns by default
+    :param types: column -> (str -> value) converter, applied on whole columns; values are str by default
+    :param where: column expression records are filtered with, evaluated after type conversion
+    :param batch_size: rows read and converted together
+    :param csv_options: `csv.reader` options, e.g. delimiter
+    """
+    fp = _open_text(source, newline="")
+    types = types or {}
+    try:
+        reader = csv.reader(fp, **csv_options)
+        header = next(reader, None)
+        if header is None:
+            return
+        names = header if columns is None else list(columns)
+        wanted = names if where is None else names + [c for c in where.columns() if c not in names]
+        missing = [name for name in wanted if name not in header]
+        if missing:
+            raise ValueError("Columns not found in CSV header: %r" % (missing,))
+        indices = [header.index(name) for name in wanted]
+        width = max(indices) + 1 if indices else 0
+        start = 0
+        while True:
+            rows = list(islice(reader, batch_size))
+            if not rows:
+                return
+            # blank lines are read as [], and skipped like `csv.DictReader` does
+            rows = list(filter(None, rows))
+            if not rows:
+                continue
+            if min(map(len, rows)) < width:
+                short = next(i for i, row in enumerate(rows) if len(row) < width)
+                raise ValueError("CSV record %d has %d fields, %d expected" % (start + short + 1, len(rows[short]),
+                                                                               width))
+            if not indices:
+                picked = []
+            elif len(indices) == 1:
+                picked = [list(map(itemgetter(indices[0]), rows))]
+            else:
+                picked = [list(values) for values in zip(*map(itemgetter(*indices), rows))]
+            columns = {name: list(map(types[name], values)) if name in types else values
+                       for name, values in zip(wanted, picked)}
+            yield _projected_batch(columns, names, start, len(rows), where)
+            start += len(rows)
+    finally:
+        if fp is not source:
+            fp.close()
+
+
+_NUMPY_CODES = {
+    "b": "i1", "B": "u1", "?": "?", "h": "i2", "H": "u2", "i": "i4", "I": "u4", "l": "i4", "L": "u4",
+    "q": "i8", "Q": "u8", "e": "f2", "f": "f4", "d": "f8",
+}
+
+
+def struct_dtype(fmt: str):
+    """
+    The NumPy structured dtype of a struct format with standard sizes (starting with "<", ">", "!" or "="),
+    with fields f0, f1...; None if the format has no NumPy equivalent
+    """
+    if numpy is None or not fmt or fmt[0] not in "<>!=":
+        return None
+    order = {"<": "<", ">": ">", "!": ">", "=": "="}[fmt[0]]
+    fields, offset = [], 0
+    for count, code in _struct_codes(fmt[1:]):
+        if code == "x":
+            offset += count
+            continue
+        if code == "s":
+            fields.append(("f%d" % len(fields), "S%d" % count, offset))
+            offset += count
+            continue
+        if code not in _NUMPY_CODES:
+            return None
+        size = struct.calcsize("<" + code)
+        for _ in range(count):
+            fields.append(("f%d" % len(fields), order + _NUMPY_CODES[code], offset))
+            offset += size
+    return numpy.dtype({"names": [f[0] for f in fields], "formats": [f[1] for f in fields],
+                        "offsets": [f[2] for f in fields], "itemsize": offset})
+
+
+def _struct_codes(fmt: str) -> Iterator[Tuple[int, str]]:
+    digits = ""
+    for char in fmt:
+        if char.isspace():
+            continue
+        if char.isdigit():
+            digits += char
+            continue
+        yield int(digits) if digits else 1, char
+        digits = ""
+
+
+def _buffer_of(source) -> memoryview:
+    if isinstance(source, (str, PathLike)):
+        with open(source, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"")
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    return memoryview(source).cast("B")
+
+
+def StructReader(source, fmt: str, *, batch: Union[int, None] = None, start: int = 0, stop: Union[int, None] = None,
+                 shard: Union[Tuple[int, int], None] = None, backend: str = "auto") -> Iterator[Any]:
+    """
+    A generator of fixed-size binary records, decoded from a memory mapping without intermediate copies
+    :param source: file path, or a bytes-like buffer
+    :param fmt: struct format of one record
+    :param batch: yield batches of this many records: NumPy structured arrays (views of the buffer) with NumPy
+        backend, lists of tuples otherwise; single tuples by default
+    :param start: index of the first record
+    :param stop: index after the last record; all records by default
+    :param shard: (i, n) - only the i-th of n contiguous, equal ranges of the selected records
+    :param backend: "struct", "numpy" (batches only), or "auto" - NumPy for batches when it supports the format
+    """
+    record_size = struct.calcsize(fmt)
+    view = _buffer_of(source)
+    if len(view) % record_size:
+        raise ValueError("Buffer size %d is not a multiple of the record size %d" % (len(view), record_size))
+    total = len(view) // record_size
+    start = min(max(start, 0), total)
+    stop = total if stop is None else min(max(stop, start), total)
+    if shard is not None:
+        i, n = shard
+        if not 0 <= i < n:
+            raise ValueError("Invalid shard %r" % (shard,))
+        count = stop - start
+        start, stop = start + count * i // n, start + count * (i + 1) // n
+
+    dtype = None
+    if backend != "struct" and batch is not None:
+        dtype = struct_dtype(fmt)
+        if dtype is None and backend == "numpy":
+            raise ValueError("NumPy backend does not support struct format %r" % fmt)
+
+    if batch is None:
+        for record in struct.iter_unpack(fmt, view[start * record_size:stop * record_size]):
+            yield record
+        return
+    for first in range(start, stop, batch):
+        last = min(first + batch, stop)
+        if dtype is not None:
+            yield numpy.frombuffer(view, dtype=dtype, count=last - first, offset=first * record_size)
+        else:
+            yield list(struct.iter_unpack(fmt, view[first * record_size:last * record_size]))
+
+
+FOLLOW_CHUNK_SIZE = 1 << 20
+
+
+def _identity(stat: os.stat_result) -> Tuple[int, int]:
+    return stat.st_dev, stat.st_ino
+
+
+def _stat_or_none(path) -> Union[os.stat_result, None]:
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def _follow(path, f: Union[IO[bytes], None], poll_interval: float, encoding: str,
+            idle_timeout: Union[float, None]) -> Iterator[str]:
+    identity = None if f is None else _identity(os.fstat(f.fileno()))
+    partial = b""
+    last_data = time.monotonic()
+    try:
+        while True:
+            if f is None and _stat_or_none(path) is not None:
+                f = open(path, "rb")    # created, or recreated after rotation: read it whole
+                identity = _identity(os.fstat(f.fileno()))
+
+            chunk = f.read(FOLLOW_CHUNK_SIZE) if f is not None else b""
+            if chunk:
+                last_data = time.monotonic()
+                end = chunk.rfind(b"\n")
+                if end < 0:
+                    partial += chunk
+                    continue
+                complete, partial = partial + chunk[:end], chunk[end + 1:]
+                for line in complete.decode(encoding).split("\n"):
+                    yield line + "\n"
+                continue
+
+            if f is not None:
+                stat = _stat_or_none(path)
+                if stat is None or _identity(stat) != identity:
+                    # rotated: the old file is drained (nothing more to read), its last line is complete now
+                    f.close()
+                    f = None
+                    if partial:
+                        yield partial.decode(encoding)
+                        partial = b""
+                    continue
+                if stat.st_size < f.tell():
+                    # truncated in place: start over, an unfinished line is dropped
+                    f.seek(0)
+                    partial = b""
+                    continue
+
+            if idle_timeout is not None and time.monotonic() - last_data >= idle_timeout:
+                return
+            time.sleep(poll_interval)
+    finally:
+        if f is not None:
+            f.close()
+
+
+def Follower(path: Union[str, PathLike], *, poll_interval: float = 1.0, from_end: bool = True,
+             encoding: str = "utf-8", idle_timeout: Union[float, None] = None) -> Iterator[str]:
+    """
+    Lines appended to a file, like `tail -F`. The starting position is taken when called, not on first iteration.
+    :param path: file path; waited for if it does not exist yet
+    :param poll_interval: seconds between checks for new data, rotation and truncation
+    :param from_end: start at the current end of the file; from its start otherwise. Files created or rotated in
+        later are always read from their start.
+    :param encoding: text encoding
+    :param idle_timeout: stop once no new data has arrived for this many seconds; follow forever by default
+    """
+    f = None
+    if _stat_or_none(path) is not None:
+        f = open(path, "rb")
+        if from_end:
+            f.seek(0, os.SEEK_END)
+    return _follow(path, f, poll_interval, encoding, idle_timeout)
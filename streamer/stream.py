@@ -7,12 +7,31 @@ streamer.stream
 The main module with Stream, DictStream implementations
 """
 
-from itertools import chain, islice, dropwhile, takewhile, starmap
+from itertools import chain, islice, dropwhile, takewhile, starmap, repeat
+from operator import add, length_hint
 from functools import reduce
-from typing import Callable, Union, List, Set, Iterator, Iterable, TypeVar, Generic, Dict, Tuple, Any
-from .util import to_iterator
-from .operator import Deduplicator, Inserter, PairUp, Zipper, Collapser, Grouper
+from collections import ChainMap, deque
+from os import PathLike
+import json
+import os
+from typing import Callable, Union, List, Set, Iterator, Iterable, TypeVar, Generic, Dict, Tuple, Any, IO
+from .util import to_iterator, as_iterable, as_iterable_or_scalar
+from .operator import Deduplicator, Inserter, PairUp, Zipper, Collapser, Grouper, ExternalSorter, Reverser
 from .collector import Collector, CountCollector
+from .instrument import Probe, StageMetrics
+from .memory import MemoryBudget, StageTracker, track, release_after
+from .replay import Replayable, Tee
+from .memo import MemoCache, CachedMapper
+from .numeric import NumericStream, IntStream, FloatStream
+from .expr import Expr, ExprFilter, ExprMapper, ExprValueFilter
+from .columnar import Schema, Row, RecordBatch, batches_of, DEFAULT_BATCH_SIZE
+from .sinks import TextSink, CsvFormatter, WriteResult
+from .recordfile import RecordFileWriter, DEFAULT_BLOCK_RECORDS
+from .sampling import BernoulliSampler, check_probability, reservoir_sample, stratified_sample, Seed
+from .parallel import search, AllMembersSeen, Negation, MemberOf, ProcessMapper, DEFAULT_CHUNK_SIZE, \
+    DEFAULT_MAP_BATCH_SIZE, THREAD
+from .checkpoint import Checkpointer, PositionedSource, cursor_of
+from .seekable import exact_length, skip_ahead, split_at
 
 T = TypeVar('T')
 R = TypeVar('R')
@@ -46,6 +65,57 @@ class Stream(Generic[T]):
         :param generators_or_iterables: any numbers of generators or iterables
         """
         self.__stream = Stream._prepare_stream(*generators_or_iterables)
+        self.__memory_budget = None
+        self.__origin = generators_or_iterables
+        self.__source = None        # the stream positions are taken from, if not this one
+        self.__checkpointer = None
+
+    def _derive(self, *generators_or_iterables: ElementOrIter):
+        """
+        Create the next Stream of the pipeline, carrying over the pipeline settings (e.g. memory budget)
+        """
+        return self._inherit(Stream(*generators_or_iterables))
+
+    def _derive_dict(self, wrap: Iterator[Tuple[K, V]]):
+        return self._inherit(DictStream(wrap=wrap))
+
+    def _inherit(self, stream: 'Stream') -> 'Stream':
+        self._check_not_checkpointed()
+        stream.__memory_budget = self.__memory_budget
+        return stream
+
+    def _check_not_checkpointed(self) -> None:
+        if self.__checkpointer is not None:
+            raise ValueError("Only element-wise stages (map, filter, exclude, without, instrument) can follow "
+                             "`checkpoint` or `resume`")
+
+    def _derive_elementwise(self, iterator: Iterator):
+        """
+        Create the next Stream of the pipeline for a stage taking one element at a time without reading ahead (map,
+        filter...); the position of the source still tells which elements went through, so checkpoints carry over
+        """
+        stream = Stream(iterator)
+        stream.__memory_budget = self.__memory_budget
+        stream.__source = self if self.__source is None else self.__source
+        stream.__checkpointer = self.__checkpointer
+        return stream
+
+    def _cursor(self) -> PositionedSource:
+        source = self if self.__source is None else self.__source
+        cursor = cursor_of(source.__origin, source.__stream)
+        if cursor is None:
+            raise ValueError("Only streams of a list, tuple, range, `streams.lines_of` file or `streams.split` text, "
+                             "through element-wise stages (map, filter...), can be checkpointed")
+        return cursor
+
+    def _track(self, stage: str) -> Union[StageTracker, None]:
+        if self.__memory_budget is None:
+            return None
+        return self.__memory_budget.tracker(stage)
+
+    @property
+    def memory_budget(self) -> Union[MemoryBudget, None]:
+        return self.__memory_budget
 
     def __next__(self) -> T:
         return next(self.__stream)
@@ -54,6 +124,10 @@ class Stream(Generic[T]):
     def __iter__(self) -> Iterator[T]:
         return self.__stream
 
+    def __length_hint__(self) -> int:
+        length = exact_length(self.__stream)
+        return NotImplemented if length is None else length
+
     ###
     # Common operations
     ###
@@ -64,7 +138,7 @@ class Stream(Generic[T]):
         :param generators_or_iterables: any numbers of generators or iterables
         :return: New Stream instance wrapping the union stream
         """
-        return Stream(self.__stream, *generators_or_iterables)
+        return self._derive(self.__stream, *generators_or_iterables)
 
     def chain(self, *generators_or_iterables: ElementOrIter):
         """
@@ -87,15 +161,94 @@ class Stream(Generic[T]):
         Similar to builtin enumerate function
         :return: A Stream with original stream enumerated
         """
-        return Stream(enumerate(self.__stream))
+        return self._derive(enumerate(self.__stream))
 
-    def map(self, func: Callable[[T], R]):
+    def map(self, func: Union[Callable[[T], R], Expr]):
         """
         Equivalent to builtin map function
-        :param func: function each element will be passed to for transformation
+        :param func: function each element will be passed to for transformation; or a column expression
+            (`streamer.expr.col`), compiled once into a function of each record
+        :return: New Stream instance wrapping the mapped stream
+        """
+        if isinstance(func, Expr):
+            return self._derive_elementwise(ExprMapper(self.__stream, func))
+        return self._derive_elementwise(map(func, self.__stream))
+
+    def cached_map(self, func: Callable[[T], R], *, maxsize: Union[int, None] = 65536, ttl: Union[float, None] = None,
+                   persist_path: Union[str, None] = None, key: Union[Callable[[T], Any], None] = None,
+                   batch_size: int = 64, batch_func: Union[Callable[[List[Any]], List[R]], None] = None,
+                   cache: Union[MemoCache, None] = None):
+        """
+        Map with a memoized pure function. Elements are looked up a batch at a time, with keys deduplicated in a batch.
+        :param func: (key -> any) pure function each element (or its key) will be passed to
+        :param maxsize: max entries in the in-process LRU tier; unbounded if None
+        :param ttl: seconds a result stays valid; forever if None
+        :param persist_path: sqlite file of a persistent tier shared across runs; none by default
+        :param key: optional function deriving the cache key, which is passed to `func` instead of the element
+        :param batch_size: elements looked up together; 1 for a lookup per element
+        :param batch_func: optional (list of keys -> list of results) function computing all misses in a batch at once
+        :param cache: <OR> an existing `streamer.memo.MemoCache` to share, e.g. for hit / miss stats
         :return: New Stream instance wrapping the mapped stream
         """
-        return Stream(map(func, self.__stream))
+        own_cache = cache is None
+        if own_cache:
+            cache = MemoCache(maxsize, ttl, persist_path)
+        return self._derive(CachedMapper(self.__stream, func, cache, key=key, batch_size=batch_size,
+                                         batch_func=batch_func, close_cache=own_cache))
+
+    def map_to_int(self, func: Union[Callable[[T], int], None] = None, **numeric_options) -> IntStream:
+        """
+        Creates a primitive int stream, values of which are buffered and reduced a chunk at a time.
+        :param func: optional function each element will be passed to before conversion
+        :param numeric_options: `chunk_size` / `backend` of `streamer.numeric.IntStream`
+        :return: IntStream
+        """
+        self._check_not_checkpointed()
+        return IntStream(self.__stream if func is None else map(func, self.__stream), **numeric_options)
+
+    def map_to_float(self, func: Union[Callable[[T], float], None] = None, **numeric_options) -> FloatStream:
+        """
+        Creates a primitive float stream, values of which are buffered and reduced a chunk at a time.
+        :param func: optional function each element will be passed to before conversion
+        :param numeric_options: `chunk_size` / `backend` of `streamer.numeric.FloatStream`
+        :return: FloatStream
+        """
+        self._check_not_checkpointed()
+        return FloatStream(self.__stream if func is None else map(func, self.__stream), **numeric_options)
+
+    def to_numeric(self, kind: type = float, **numeric_options) -> NumericStream:
+        """
+        Converts a stream of numbers to a primitive numeric stream
+        :param kind: int - IntStream; float - FloatStream
+        :param numeric_options: `chunk_size` / `backend` of `streamer.numeric.NumericStream`
+        :return: IntStream or FloatStream
+        """
+        if kind is int:
+            return self.map_to_int(**numeric_options)
+        elif kind is float:
+            return self.map_to_float(**numeric_options)
+        raise ValueError("Numeric stream kind should be either int or float, not %s" % kind)
+
+    def to_columnar(self, batch_size: int = DEFAULT_BATCH_SIZE, schema: Union[Schema, Iterable[Any], None] = None):
+        """
+        Pivot dict-like records into columnar record batches, keyed by record index
+        :param batch_size: records per batch
+        :param schema: columns to keep; keys of the first record by default. Missing fields are None.
+        :return: ColumnarStream
+        """
+        return self._inherit(ColumnarStream(batches_of(self.__stream, batch_size, schema)))
+
+    def process_map(self, func: Callable[[T], R], workers: Union[int, None] = None, *,
+                    batch_size: int = DEFAULT_MAP_BATCH_SIZE):
+        """
+        Map on a process pool, keeping the order. Batches of numbers, bytes or fixed-width records (tuples of
+        ints / floats), and list results of those, travel through shared memory instead of pickles.
+        :param func: picklable (element -> result) function, e.g. defined at module level
+        :param workers: number of processes; CPU count by default
+        :param batch_size: elements per task
+        :return: A mapped stream
+        """
+        return self._derive(ProcessMapper(self.__stream, func, workers, batch_size=batch_size))
 
     def map_with_index(self, func: Callable[[int, T], R]):
         """
@@ -103,23 +256,37 @@ class Stream(Generic[T]):
         :param func: ([int index, element] -> any) function each element and its index will be passed to
         :return: New Stream instance wrapping the mapped stream
         """
-        return Stream(func(i, elem) for i, elem in enumerate(self.__stream))
+        return self._derive(func(i, elem) for i, elem in enumerate(self.__stream))
 
-    def flat_map(self, func: Callable[[T], R]):
+    def flat_map(self, func: Callable[[T], R], kind: str = "auto"):
         """
         Flattening (once) if any element is a collection or iterator
         :param func: function each current element will be passed to
+        :param kind: what func returns -
+            "auto": anything; iterables (strings included) are flattened, other results kept as elements;
+            "iterable": always an iterable, flattened without any type check;
+            "scalar_or_iterable": like "auto", but strings and bytes are kept whole
         :return: New Stream instance wrapping the flat_mapped stream
         """
-        return Stream(chain.from_iterable(map(to_iterator, map(func, self.__stream))))
+        mapped = map(func, self.__stream)
+        if kind == "iterable":
+            return self._derive(chain.from_iterable(mapped))
+        elif kind == "auto":
+            return self._derive(chain.from_iterable(map(as_iterable, mapped)))
+        elif kind == "scalar_or_iterable":
+            return self._derive(chain.from_iterable(map(as_iterable_or_scalar, mapped)))
+        raise ValueError("Unknown flat_map kind %r, should be auto, iterable or scalar_or_iterable" % kind)
 
-    def filter(self, func: Callable[[T], bool]):
+    def filter(self, func: Union[Callable[[T], bool], Expr]):
         """
         Pick elements that pass the test
-        :param func: (element -> boolean) function each current element will be tested against
+        :param func: (element -> boolean) function each current element will be tested against; or a column
+            expression (`streamer.expr.col`), compiled once into a test of each record
         :return: New Stream instance wrapping the filtered stream
         """
-        return Stream(filter(func, self.__stream))
+        if isinstance(func, Expr):
+            return self._derive_elementwise(ExprFilter(self.__stream, func))
+        return self._derive_elementwise(filter(func, self.__stream))
 
     def exclude(self, func: Callable[[T], bool]):
         """
@@ -127,7 +294,7 @@ class Stream(Generic[T]):
         :param func: (element -> boolean) function each current element will be tested against
         :return: New Stream instance wrapping the filtered stream
         """
-        return Stream(elem for elem in self.__stream if not func(elem))
+        return self._derive_elementwise(elem for elem in self.__stream if not func(elem))
 
     def minus(self, func: Callable[[T], bool]):
         """
@@ -154,7 +321,7 @@ class Stream(Generic[T]):
             return self
 
         all_exclusions = set(exclusion)
-        return Stream(elem for elem in self.__stream if elem not in all_exclusions)
+        return self._derive_elementwise(elem for elem in self.__stream if elem not in all_exclusions)
 
     def peek(self, func: Callable[[T], None], raise_on_error: bool = False):
         """
@@ -170,7 +337,47 @@ class Stream(Generic[T]):
             return self
         else:
             func(maybe_elem)
-        return Stream((maybe_elem,), self)
+        return self._derive((maybe_elem,), self)
+
+    def instrument(self, name: str, *, sample_every: int = 1,
+                   hook: Union[Callable[[StageMetrics], None], None] = None):
+        """
+        Mark the end of a pipeline stage for instrumentation. The stage spans back to the previous instrumented stage;
+        its element counts, wall / cpu time and selectivity are recorded in `streamer.instrument.StageMetrics`.
+        :param name: stage name to report
+        :param sample_every: only time one call in every x calls, to keep overhead negligible; counts stay exact
+        :param hook: (StageMetrics -> void) optional function called once the stage is exhausted
+        :return: Effectively same stream
+        """
+        return self._derive_elementwise(Probe(self.__stream, name, sample_every=sample_every, hook=hook))
+
+    def with_memory_budget(self, budget: Union[int, MemoryBudget], *, on_exceed: str = "raise",
+                           spill_dir: Union[str, None] = None):
+        """
+        Govern the memory held by buffering operations further down the pipeline (sorted, reduce_right, distinct,
+        group_by, cross, collect_as_*). Peak usage per stage is kept in `memory_budget.stages`.
+        :param budget: max bytes, or a `streamer.memory.MemoryBudget` shared with other pipelines
+        :param on_exceed: "raise" - raise `MemoryBudgetExceeded` naming the stage; "spill" - spill to disk in stages
+            supporting it (sorted, reduce_right, group_by) and raise in the others
+        :param spill_dir: directory for spill files; system temporary directory by default
+        :return: Effectively same stream
+        """
+        if not isinstance(budget, MemoryBudget):
+            budget = MemoryBudget(budget, on_exceed=on_exceed, spill_dir=spill_dir)
+        stream = self._derive_elementwise(self.__stream)
+        stream.__memory_budget = budget
+        return stream
+
+    def tee(self, n: int = 2, *, max_lag: Union[int, None] = None, spill_dir: Union[str, None] = None):
+        """
+        Split into n independent streams of the same elements; the source is only pulled once.
+        :param n: number of streams
+        :param max_lag: number of elements kept in memory between the slowest and fastest stream; elements further
+            behind are spilled to disk. Unbounded by default.
+        :param spill_dir: directory for the spill file; system temporary directory by default
+        :return: tuple of Streams
+        """
+        return tuple(self._derive(it) for it in Tee(self.__stream, n, max_lag=max_lag, spill_dir=spill_dir))
 
     ###
     # Terminal operations
@@ -182,6 +389,11 @@ class Stream(Generic[T]):
         :param collector: (Stream -> any) function iterates through the stream
         :return: the result after piping stream to collector function
         """
+        if self.__checkpointer is not None:
+            if not isinstance(collector, Collector) or collector.SIMPLE_FLAG:
+                raise ValueError("A checkpointed stream should be collected with a `Collector`, whose accumulator "
+                                 "is saved")
+            return self.__checkpointer.collect(self.__stream, collector)
         if isinstance(collector, Collector):
             return collector.collect(self)
         elif callable(collector):
@@ -189,19 +401,129 @@ class Stream(Generic[T]):
         else:
             raise ValueError("Collect seems to be neither a collector nor a callable function.")
 
+    def checkpoint(self, path: Union[str, PathLike], every: Union[int, None] = None, *,
+                   every_seconds: Union[float, None] = None):
+        """
+        Save the progress of the terminal `collect` (or `count`) to a file: the position of the stream source and a
+        snapshot of the collector accumulator, every x elements and / or seconds, and once done. After a crash, the
+        same pipeline built again continues from the last checkpoint with `resume`.
+        The source should be a list, tuple or range, a `streams.lines_of` file or a `streams.split` text, followed
+        by element-wise stages only (map, filter, exclude, without, instrument); the accumulator should pickle.
+        :param path: checkpoint file; checkpoints are appended to it, and it is compacted once large
+        :param every: elements collected between checkpoints
+        :param every_seconds: seconds between checkpoints
+        :return: Effectively same stream
+        """
+        stream = self._derive_elementwise(self.__stream)
+        stream.__checkpointer = Checkpointer(path, self._cursor(), every, every_seconds)
+        return stream
+
+    def resume(self, path: Union[str, PathLike]):
+        """
+        Continue from the last checkpoint saved to a file by `checkpoint`: the terminal `collect` moves the source to
+        the recorded position and starts from the recorded accumulator, saving checkpoints as before.
+        A stream checkpointed to the same file starts from the beginning if there is no checkpoint yet, so that
+        `.checkpoint(path, every=x).resume(path)` fits both the first run and the reruns.
+        :param path: checkpoint file
+        :return: the stream, continuing from the checkpoint once collected
+        """
+        checkpointer = self.__checkpointer
+        if checkpointer is not None and os.fspath(checkpointer.path) == os.fspath(path) and not os.path.exists(path):
+            return self
+        stream = self._derive_elementwise(self.__stream)
+        stream.__checkpointer = Checkpointer.resume(path, self._cursor())
+        return stream
+
+    def cache(self, max_memory: Union[int, None] = None, spill_dir: Union[str, None] = None) -> Replayable[T]:
+        """
+        [Near terminal operation] compute the stream once into a replayable source, which can be iterated many times,
+        e.g. `Stream(cached)` for every new pass. Elements are pulled lazily by the first pass needing them.
+        :param max_memory: estimated bytes kept in memory; the rest is spilled to disk. Unbounded by default.
+        :param spill_dir: directory for the spill file; system temporary directory by default
+        :return: Replayable
+        """
+        return Replayable(self.__stream, max_memory=max_memory, spill_dir=spill_dir)
+
+    def to_file(self, path: Union[str, PathLike], compress: Union[str, None] = "auto", **sink_options) -> WriteResult:
+        """
+        [Terminal operation] Write all str elements into a file as they are, e.g. lines with their new line chars
+        :param path: file path; with rolling, a path with an `{index}` field
+        :param compress: "gzip", "bz2", "xz", None; or "auto" - by the file extension (.gz, .bz2, .xz)
+        :param sink_options: encoding, compresslevel, atomic, max_bytes, max_records, background, buffer_size - see
+            `streamer.sinks.TextSink`
+        :return: WriteResult(records, size, paths)
+        """
+        return TextSink(path, compress=compress, **sink_options).write(self.__stream)
+
+    def write_lines(self, target: Union[str, PathLike, IO[str]], line_end: str = "\n", **sink_options) -> WriteResult:
+        """
+        [Terminal operation] Write every element as a line, buffered into few large writes
+        :param target: an open text file (left open), or a file path
+        :param line_end: appended to every element
+        :param sink_options: options of `streamer.sinks.TextSink`, e.g. atomic, max_records, background
+        :return: WriteResult(records, size, paths)
+        """
+        return TextSink(target, **sink_options).write(map(add, map(str, self.__stream), repeat(line_end)))
+
+    def to_jsonl(self, target: Union[str, PathLike, IO[str]], dumps: Callable[[Any], str] = json.dumps,
+                 **sink_options) -> WriteResult:
+        """
+        [Terminal operation] Write every element as a line of JSON
+        :param target: an open text file (left open), or a file path
+        :param dumps: JSON serializer
+        :param sink_options: options of `streamer.sinks.TextSink`, e.g. atomic, max_bytes, background
+        :return: WriteResult(records, size, paths)
+        """
+        return TextSink(target, **sink_options).write(map(add, map(dumps, self.__stream), repeat("\n")))
+
+    def to_csv(self, target: Union[str, PathLike, IO[str]], fieldnames: Union[List[str], None] = None, *,
+               header: bool = True, csv_options: Union[Dict[str, Any], None] = None, **sink_options) -> WriteResult:
+        """
+        [Terminal operation] Write dicts or sequences as CSV rows
+        :param target: an open text file (left open), or a file path
+        :param fieldnames: columns of dict rows; keys of the first row by default
+        :param header: write a header row at the start of every file
+        :param csv_options: `csv.writer` options, e.g. delimiter
+        :param sink_options: options of `streamer.sinks.TextSink`, e.g. atomic, max_records, background
+        :return: WriteResult(records, size, paths)
+        """
+        formatter = CsvFormatter(fieldnames, **(csv_options or {}))
+        sink = TextSink(target, header=formatter.header if header else None, **sink_options)
+        return sink.write(formatter.format_all(self.__stream))
+
+    def to_records(self, path: Union[str, PathLike], block_records: int = DEFAULT_BLOCK_RECORDS) -> WriteResult:
+        """
+        [Terminal operation] Write all elements into a binary record file (`streamer.recordfile`), readable with
+        `streams.from_records`
+        :param path: file path
+        :param block_records: elements per block; blocks are the unit of random access and of parallel reading
+        :return: WriteResult(records, size, paths) - size in bytes
+        """
+        with RecordFileWriter(path, block_records) as writer:
+            records = writer.write(self.__stream)
+        return WriteResult(records, os.path.getsize(writer.path), [writer.path])
+
     def collect_as_list(self) -> List[T]:
         """
         [Terminal operation] convert to a list
         :return: List
         """
-        return list(self)
+        tracker = self._track("collect_as_list")
+        result = list(track(self, tracker))
+        if tracker is not None:
+            tracker.release()
+        return result
 
     def collect_as_set(self) -> Set[T]:
         """
         [Terminal operation] convert to a set
         :return: Set
         """
-        return set(self)
+        tracker = self._track("collect_as_set")
+        result = set(track(self, tracker))
+        if tracker is not None:
+            tracker.release()
+        return result
 
     def collect_dict(self, dict_collector: Callable[[Iterator[T]], Dict] = dict):
         """
@@ -209,7 +531,11 @@ class Stream(Generic[T]):
         :param dict_collector: (Stream<I extends map.entry> -> Dict<K, V>) function iterates through the stream
         :return: the result after piping stream to dict collector function
         """
-        return dict_collector(self.wrap_as_dict_stream())
+        tracker = self._track("collect_dict")
+        result = dict_collector(track(self.wrap_as_dict_stream(), tracker))
+        if tracker is not None:
+            tracker.release()
+        return result
 
     def build_dict(self, dict_collector: Callable[[Iterator[T]], Dict] = dict):
         """
@@ -247,7 +573,11 @@ class Stream(Generic[T]):
         :param initial_value: (R) optional value, served as the starting value.
         :return: R - the result after reducing the stream
         """
-        reversed_seq = list(self.__stream)[::-1]
+        tracker = self._track("reduce_right")
+        if tracker is None:
+            reversed_seq = list(self.__stream)[::-1]
+        else:
+            reversed_seq = Reverser(self.__stream, tracker)
         if initial_value is not None:
             return reduce(reducer, reversed_seq, initial_value)
         else:
@@ -324,9 +654,15 @@ class Stream(Generic[T]):
 
     def count(self) -> int:
         """
-        [Terminal operation] count total number of elements
+        [Terminal operation] count total number of elements; a sized source (list, tuple, range, `streams.arange`,
+        `streams.constant_of`...) is not walked
         :return: total number
         """
+        if self.__checkpointer is None:
+            length = exact_length(self.__stream)
+            if length is not None:
+                self.__stream = skip_ahead(self.__stream, length)
+                return length
         return self.collect(CountCollector())
 
     def sorted(self, key: Union[Callable[[T], Any], None] = None, reverse: bool = False):
@@ -338,7 +674,10 @@ class Stream(Generic[T]):
         TODO: stream sort condition marker
         TODO: parallel implementation
         """
-        return Stream(sorted(self, key=key, reverse=reverse))
+        tracker = self._track("sorted")
+        if tracker is None:
+            return self._derive(sorted(self, key=key, reverse=reverse))
+        return self._derive(ExternalSorter(self.__stream, key, reverse, tracker))
 
     def for_pairs(self, func: Callable[[Tuple[T, T]], None]) -> None:
         """
@@ -370,6 +709,70 @@ class Stream(Generic[T]):
         """
         return self.find_any()
 
+    ###
+    # Parallel search
+    ###
+
+    def parallel_any_match(self, match: Callable[[T], bool], workers: Union[int, None] = None, *,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE, executor: str = THREAD) -> bool:
+        """
+        [Terminal operation] any_match with chunks of elements tested in parallel; the source stops being pulled and
+        outstanding chunks are cancelled once a match is found
+        :param match: (element -> bool) function tests each element; should be picklable for the process executor
+        :param workers: number of threads or processes; CPU count by default
+        :param chunk_size: elements tested per task
+        :param executor: "thread", or "process" for predicates holding the GIL
+        :return: test result
+        """
+        return search(self.__stream, match, ordered=False, workers=workers, chunk_size=chunk_size,
+                      executor=executor) is not None
+
+    def parallel_all_match(self, match: Callable[[T], bool], workers: Union[int, None] = None, *,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE, executor: str = THREAD) -> bool:
+        """
+        [Terminal operation] all_match with chunks of elements tested in parallel, see `parallel_any_match`
+        """
+        return search(self.__stream, Negation(match), ordered=False, workers=workers, chunk_size=chunk_size,
+                      executor=executor) is None
+
+    def parallel_none_match(self, match: Callable[[T], bool], workers: Union[int, None] = None, *,
+                            chunk_size: int = DEFAULT_CHUNK_SIZE, executor: str = THREAD) -> bool:
+        """
+        [Terminal operation] none_match with chunks of elements tested in parallel, see `parallel_any_match`
+        """
+        return not self.parallel_any_match(match, workers, chunk_size=chunk_size, executor=executor)
+
+    def parallel_has_any(self, *candidate: T, workers: Union[int, None] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         executor: str = THREAD) -> bool:
+        """
+        [Terminal operation] has_any with chunks of elements tested in parallel, see `parallel_any_match`
+        """
+        return self.parallel_any_match(MemberOf(candidate), workers, chunk_size=chunk_size, executor=executor)
+
+    def parallel_has_all(self, *candidate: T, workers: Union[int, None] = None,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE) -> bool:
+        """
+        [Terminal operation] has_all with chunks of elements tested in parallel, see `parallel_any_match`; the search
+        ends once the candidates not seen yet run out. The candidates left are shared by threads, so there is no
+        process executor.
+        """
+        return search(self.__stream, AllMembersSeen(candidate), ordered=False, workers=workers,
+                      chunk_size=chunk_size) is not None
+
+    def parallel_find_first(self, match: Callable[[T], bool], workers: Union[int, None] = None, *,
+                            chunk_size: int = DEFAULT_CHUNK_SIZE, executor: str = THREAD) -> Union[T, None]:
+        """
+        [Terminal operation] get the first element passing the predicate, with chunks of elements tested in parallel.
+        Chunks after a match are cancelled, and the source stops being pulled; chunks before it are still waited for.
+        :param match: (element -> bool) function tests each element; should be picklable for the process executor
+        :param workers: number of threads or processes; CPU count by default
+        :param chunk_size: elements tested per task
+        :param executor: "thread", or "process" for predicates holding the GIL
+        :return: Optional[T] - maybe element
+        """
+        found = search(self.__stream, match, ordered=True, workers=workers, chunk_size=chunk_size, executor=executor)
+        return None if found is None else found[0]
+
     ###
     # Element removal Operations
     ###
@@ -383,16 +786,26 @@ class Stream(Generic[T]):
         :return: stream with distinct elements
         TODO: stream distinct condition marker
         """
-        return Stream(Deduplicator(self.__stream, more_than=more_than, key=key))
+        tracker = self._track("distinct")
+        deduplicator = Deduplicator(self.__stream, more_than=more_than, key=key, tracker=tracker)
+        if tracker is None:
+            return self._derive(deduplicator)
+        return self._derive(release_after(deduplicator, tracker))
 
     def limit(self, num: int):
         """
-        Limit the stream to certain amount of elements
+        Limit the stream to certain amount of elements; a range or arithmetic source stays sized and seekable
         :param num: number of elements stream limit to
         :return: the limited stream
         """
         if num > 0:
-            return Stream(islice(self.__stream, num))
+            parts = split_at(self.__stream, num)
+            if parts is None:
+                return self._derive(islice(self.__stream, num))
+            limited = self._derive(parts[0])
+            # this stream goes on after the limited elements, as if they had been read through it
+            self.__stream = parts[1]
+            return limited
         return self
 
     def takewhile(self, func: Callable[[T], bool]):
@@ -401,7 +814,7 @@ class Stream(Generic[T]):
         :param func: (element -> boolean) function each current element will be tested against
         :return: the limited stream
         """
-        return Stream(takewhile(func, self.__stream))
+        return self._derive(takewhile(func, self.__stream))
 
     def cutoff_if(self, func: Callable[[T], bool]):
         """
@@ -413,12 +826,17 @@ class Stream(Generic[T]):
 
     def skip(self, num: int):
         """
-        Skip the first several elements in the stream
+        Skip the first several elements in the stream; a sized or arithmetic source is moved without walking it
         :param num: number of elements stream to skip
         :return: the skipped stream
         """
         if num > 0:
-            return Stream(islice(self.__stream, num, None))
+            skipped = skip_ahead(self.__stream, num)
+            if skipped is None:
+                return self._derive(islice(self.__stream, num, None))
+            result = self._derive(skipped)
+            self.__stream = skipped     # shared with the skipped stream, like the islice would be
+            return result
         return self
 
     def dropwhile(self, func: Callable[[T], bool]):
@@ -427,7 +845,7 @@ class Stream(Generic[T]):
         :param func: (element -> boolean) function each current element will be tested against
         :return: the skipped stream
         """
-        return Stream(dropwhile(func, self.__stream))
+        return self._derive(dropwhile(func, self.__stream))
 
     def skip_util(self, func: Callable[[T], bool]):
         """
@@ -437,6 +855,42 @@ class Stream(Generic[T]):
         """
         return self.dropwhile(lambda x: not func(x))
 
+    ###
+    # Sampling
+    ###
+
+    def sample(self, p: float, seed: Seed = None):
+        """
+        Keeps each element with probability p, independently (Bernoulli sampling). The random generator runs once per
+        kept element, drawing the gap to the next one; elements in between are skipped without Python code.
+        :param p: keep probability, 0 <= p <= 1
+        :param seed: random seed for a reproducible sample
+        :return: the sampled stream
+        """
+        check_probability(p)
+        return self._derive(BernoulliSampler(self.__stream, p, seed))
+
+    def reservoir(self, k: int, seed: Seed = None):
+        """
+        [Near terminal operation] a uniform random sample of k elements (all if fewer) in one pass and O(k) memory,
+        with Algorithm L; see `collector.ReservoirCollector` for sharded runs
+        :param k: sample size
+        :param seed: random seed for a reproducible sample
+        :return: stream of the sample, in no particular order
+        """
+        return self._derive(reservoir_sample(self.__stream, k, seed))
+
+    def sample_by(self, key: Callable[[T], K], k_per_group: int, seed: Seed = None):
+        """
+        [Near terminal operation] stratified sampling: a uniform random sample of k elements (all if fewer) of every
+        group of elements with the same key; see `collector.StratifiedCollector` for sharded runs
+        :param key: key generating function
+        :param k_per_group: sample size of every group
+        :param seed: random seed for a reproducible sample
+        :return: stream of map entries, key -> sample list
+        """
+        return self._derive_dict(iter(stratified_sample(self.__stream, key, k_per_group, seed).items()))
+
     ###
     # Advanced operations
     ###
@@ -467,7 +921,7 @@ class Stream(Generic[T]):
         :param delimiter: same kind of existing elements
         :return: a new stream
         """
-        return Stream(Inserter(self, delimiter))
+        return self._derive(Inserter(self, delimiter))
 
     def cross(self, elements: Iterable[R]):
         """
@@ -475,8 +929,12 @@ class Stream(Generic[T]):
         :param elements: for cross product
         :return: a new stream
         """
-        element_list = list(elements)   # Cannot assume `elements` is a distinct set
-        return Stream((item, elem) for item in self.__stream for elem in element_list)
+        tracker = self._track("cross")
+        element_list = list(track(elements, tracker))   # Cannot assume `elements` is a distinct set
+        crossed = ((item, elem) for item in self.__stream for elem in element_list)
+        if tracker is None:
+            return self._derive(crossed)
+        return self._derive(release_after(crossed, tracker))
 
     def cross_result_of(self, generate: Callable[[T], Iterator[R]]):
         """
@@ -484,14 +942,14 @@ class Stream(Generic[T]):
         :param generate: generator function
         :return: a new stream
         """
-        return Stream((item, value) for item in self.__stream for value in generate(item))
+        return self._derive((item, value) for item in self.__stream for value in generate(item))
 
     def map_pairs(self, func: Callable[[Tuple[T, T]], R]):
         """
         Maps to new item on every adjacent pair
         :param func: mapping function applying on all adjacent pairs
         """
-        return Stream(func(pair) for pair in PairUp(self.__stream))
+        return self._derive(func(pair) for pair in PairUp(self.__stream))
 
     def map_to_entry(self, to_entry: Callable[[T], Tuple[K, V]]):
         """
@@ -499,7 +957,7 @@ class Stream(Generic[T]):
         :param to_entry: function to create K, V tuple pair from existing elements
         :return: DictStream
         """
-        return DictStream(wrap=map(to_entry, self.__stream))
+        return self._derive_dict(map(to_entry, self.__stream))
 
     def map_to_key_value(self, to_key: Callable[[T], K], to_val: Callable[[T], V]):
         """
@@ -509,7 +967,7 @@ class Stream(Generic[T]):
         :param to_val: function to create val from existing elements
         :return: DictStream
         """
-        return DictStream(wrap=((to_key(elem), to_val(elem)) for elem in self.__stream))
+        return self._derive_dict((to_key(elem), to_val(elem)) for elem in self.__stream)
 
     def zip_with(self, *streams: Iterator[R], fill_none: bool = False):
         """
@@ -521,7 +979,7 @@ class Stream(Generic[T]):
         """
         if len(streams) == 0:
             return self
-        return Stream(Zipper(self.__stream, *streams, stop_fast=not fill_none))
+        return self._derive(Zipper(self.__stream, *streams, stop_fast=not fill_none))
 
     def collapse_to_first(self, collapsible: Callable[[T, T], bool]):
         """
@@ -529,7 +987,7 @@ class Stream(Generic[T]):
         :param collapsible: determine if a pair of adjacent elements is collapsible.
         :return: stream with collapsed result
         """
-        return Stream(Collapser(self.__stream, collapsible, collector=Collector.of(lambda l: l[0])))
+        return self._derive(Collapser(self.__stream, collapsible, collector=Collector.of(lambda l: l[0])))
 
     def collapse_and_combine(self, collapsible: Callable[[T, T], bool], combiner: Callable[[T, T], T]):
         """
@@ -538,7 +996,7 @@ class Stream(Generic[T]):
         :param combiner: apply this rule to the final chain of collapsible elements
         :return: stream with collapsed result
         """
-        return Stream(Collapser(self.__stream, collapsible, combiner=combiner))
+        return self._derive(Collapser(self.__stream, collapsible, combiner=combiner))
 
     def collapse_and_collect(self, collapsible: Callable[[T, T], bool], collector: Collector):
         """
@@ -547,7 +1005,7 @@ class Stream(Generic[T]):
         :param collector: apply this collector to the final chain of collapsible elements
         :return: stream with collapsed result
         """
-        return Stream(Collapser(self.__stream, collapsible, collector=collector))
+        return self._derive(Collapser(self.__stream, collapsible, collector=collector))
 
     def adjacent_groups(self, in_same_group: Callable[[T, T], bool]):
         """
@@ -555,7 +1013,7 @@ class Stream(Generic[T]):
         :param in_same_group: determine if an adjacent pair still in the same group.
         :return: stream with adjacent element groups
         """
-        return Stream(Collapser(self.__stream, in_same_group, collector=Collector.of(list)))
+        return self._derive(Collapser(self.__stream, in_same_group, collector=Collector.of(list)))
 
     def adjacent_key_groups(self, group_key_of: Callable[[T], R]):
         """
@@ -563,7 +1021,7 @@ class Stream(Generic[T]):
         :param group_key_of: get the group key of an element
         :return: stream with group tuples
         """
-        return Stream(Collapser(
+        return self._derive(Collapser(
             self.__stream,
             collapsible=lambda x, y: group_key_of(x) == group_key_of(y),
             collector=Collector.of(lambda l: (group_key_of(l[0]), list(l)))))
@@ -575,7 +1033,7 @@ class Stream(Generic[T]):
         :param key: key generating function
         :return: stream of map entries
         """
-        return DictStream(wrap=Grouper(self.map_to_key_value(key, lambda item: item)))
+        return self._derive_dict(Grouper(self.map_to_key_value(key, lambda item: item), self._track("group_by")))
 
     def group_to_map(
             self, key: Callable[[T], K], *, map_collector: Callable[[Iterator[Tuple]], Dict] = dict) -> Dict[K, List[T]]:
@@ -594,7 +1052,7 @@ class Stream(Generic[T]):
         :param stream_func: (stream -> stream) stream transformation function
         :return: A Stream with processed stream
         """
-        return Stream(stream_func(self.__stream))
+        return self._derive(stream_func(self.__stream))
 
     def wrap_as_dict_stream(self):
         """
@@ -604,7 +1062,7 @@ class Stream(Generic[T]):
         """
         if isinstance(self, DictStream):
             return self
-        return DictStream(wrap=((elem[0], elem[1] if len(elem) == 2 else elem[1:]) for elem in self.__stream))
+        return self._derive_dict((elem[0], elem[1] if len(elem) == 2 else elem[1:]) for elem in self.__stream)
 
 
 class DictStream(Stream[Tuple[K, V]]):
@@ -616,15 +1074,67 @@ class DictStream(Stream[Tuple[K, V]]):
         :param list_of_dicts: a list of dict-like elements
         :param wrap: <OR> wrap a stream with DictStream class
         """
+        self.__merged = False
+        self.__single = None
         if wrap is None:
-            super(DictStream, self).__init__(*(
-                ((key, dct[key]) for key in dct)
-                for dct in list_of_dicts
-            ))
+            # plain dict sources, kept for the fast paths of merging while no element is taken
+            self.__dicts = list_of_dicts if all(type(dct) is dict for dct in list_of_dicts) else None
+            if self.__dicts is not None and len(list_of_dicts) == 1:
+                # a taken element shows in the length left
+                self.__single = iter(list_of_dicts[0].items())
+                super(DictStream, self).__init__(self.__single)
+            else:
+                super(DictStream, self).__init__(chain.from_iterable(self._entries(list_of_dicts)))
         else:
             if len(list_of_dicts):
                 raise ValueError("No other iterator source should be provided when wrapping an iterator")
             super(DictStream, self).__init__(wrap)
+            self.__dicts = None
+
+    def _entries(self, list_of_dicts: Tuple[Dict[K, V], ...]) -> Iterator[Iterable[Tuple[K, V]]]:
+        """
+        The entries of every dict; taking the first one, whatever stage or consumer it goes to, disables the fast
+        paths of merging
+        """
+        self.__dicts = None
+        if self.__merged:
+            return
+        for dct in list_of_dicts:
+            yield dct.items() if hasattr(dct, "items") else ((key, dct[key]) for key in dct)
+
+    def _take_dicts(self) -> Union[Tuple[Dict[K, V], ...], None]:
+        """
+        The plain dict sources if no element was taken yet, the stream being consumed; None otherwise
+        """
+        dicts = self.__dicts
+        if dicts is None:
+            return None
+        self.__dicts = None
+        if self.__single is None:
+            self.__merged = True
+        elif length_hint(self.__single) != len(dicts[0]):
+            return None
+        else:
+            deque(self.__single, maxlen=0)
+        return dicts
+
+    def collect_dict(self, dict_collector: Callable[[Iterator[Tuple[K, V]]], Dict] = dict):
+        """
+        [Terminal operation] form a map/dict with the 1st element from each stream candidate as keys and rest as value.
+        A stream of plain dicts (and their `add_dicts` / `with_overrides`) is merged with `dict.update`, without
+        streaming the entries.
+        :param dict_collector: (Stream<I extends map.entry> -> Dict<K, V>) function iterates through the stream
+        :return: the result after piping stream to dict collector function
+        """
+        dicts = None
+        if dict_collector is dict and self.memory_budget is None:
+            dicts = self._take_dicts()
+        if dicts is None:
+            return super(DictStream, self).collect_dict(dict_collector)
+        result = dict(dicts[0]) if dicts else {}
+        for dct in dicts[1:]:
+            result.update(dct)
+        return result
 
     def map_items(self, func: Callable[[K, V], R]):
         """
@@ -641,7 +1151,7 @@ class DictStream(Stream[Tuple[K, V]]):
         :param value_map: (value -> any) value map function
         :return: A Stream wrapping resulting stream
         """
-        return DictStream(wrap=((key_map(k), value_map(v)) for k, v in self))
+        return self._derive_dict((key_map(k), value_map(v)) for k, v in self)
 
     def map_keys(self, func: Callable[[K], R]):
         """
@@ -649,7 +1159,7 @@ class DictStream(Stream[Tuple[K, V]]):
         :param func: (key -> key_like) key map function
         :return: A DictStream wrapping transformed item
         """
-        return DictStream(wrap=self.map_items(lambda k, v: (func(k), v)))
+        return self._derive_dict(self.map_items(lambda k, v: (func(k), v)))
 
     def filter_keys(self, func: Callable[[K], bool]):
         """
@@ -657,7 +1167,7 @@ class DictStream(Stream[Tuple[K, V]]):
         :param func: (key -> boolean) function each key will be tested against
         :return: A DictStream instance wrapping the filtered stream
         """
-        return DictStream(wrap=((k, v) for k, v in self if func(k)))
+        return self._derive_dict((k, v) for k, v in self if func(k))
 
     def map_values(self, func: Callable[[V], R]):
         """
@@ -665,15 +1175,18 @@ class DictStream(Stream[Tuple[K, V]]):
         :param func: (value -> any) value map function
         :return: A DictStream wrapping transformed item
         """
-        return DictStream(wrap=self.map_items(lambda k, v: (k, func(v))))
+        return self._derive_dict(self.map_items(lambda k, v: (k, func(v))))
 
-    def filter_values(self, func: Callable[[V], bool]):
+    def filter_values(self, func: Union[Callable[[V], bool], Expr]):
         """
         Pick dict elements whose values pass the test
-        :param func: (key -> boolean) function each value will be tested against
+        :param func: (key -> boolean) function each value will be tested against; or a column expression
+            (`streamer.expr.col`), compiled once into a test of each value
         :return: A DictStream instance wrapping the filtered stream
         """
-        return DictStream(wrap=((k, v) for k, v in self if func(v)))
+        if isinstance(func, Expr):
+            return self._derive_dict(ExprValueFilter(iter(self), func))
+        return self._derive_dict((k, v) for k, v in self if func(v))
 
     def add_dicts(self, *list_of_dicts: Dict[K, V]):
         """
@@ -681,7 +1194,11 @@ class DictStream(Stream[Tuple[K, V]]):
         :param list_of_dicts: a list of dicts to merge in
         :return: A DictStream with all items
         """
-        return DictStream(wrap=self.add(DictStream(*list_of_dicts)))
+        if all(type(dct) is dict for dct in list_of_dicts):
+            dicts = self._take_dicts()
+            if dicts is not None:
+                return self._inherit(DictStream(*(dicts + list_of_dicts)))
+        return self._derive_dict(self.add(DictStream(*list_of_dicts)))
 
     def with_overrides(self, *list_of_dicts: Dict[K, V], **literal_overrides: V):
         """
@@ -705,3 +1222,109 @@ class DictStream(Stream[Tuple[K, V]]):
         :return: A merged dict
         """
         return DictStream(*dicts_to_merge).build_dict(dict_collector)
+
+    @staticmethod
+    def merged_view(*dicts_to_merge: Dict[K, V], **literal_overrides: V) -> ChainMap:
+        """
+        Static method to merge dicts lazily, for read-mostly overrides: nothing is copied, and lookups go through the
+        dicts from the last one. Writes go to a new dict in front, the given dicts are never modified.
+        :param dicts_to_merge: a list of dicts; following dicts override previous dicts
+        :param literal_overrides: key / value overriding all dicts
+        :return: A ChainMap view of the merged dicts
+        """
+        overrides = (literal_overrides, ) if literal_overrides else ()
+        return ChainMap({}, *reversed(dicts_to_merge + overrides))
+
+
+class ColumnarStream(DictStream[K, Row]):
+    """
+    A DictStream of (key, record) entries held as columnar record batches (`streamer.columnar.RecordBatch`).
+    Records are passed to user functions as lazy `Row` views; column expressions (`streamer.expr.col`) are evaluated
+    column-wise on whole batches.
+    """
+
+    def __init__(self, batches: Iterable[RecordBatch]):
+        """
+        :param batches: record batches, e.g. from a source or `streamer.columnar.batches_of`
+        """
+        self.__batches = iter(batches)
+        super(ColumnarStream, self).__init__(wrap=chain.from_iterable(map(RecordBatch.items, self.__batches)))
+
+    def _derive_columnar(self, batches: Iterable[RecordBatch]):
+        return self._inherit(ColumnarStream(batches))
+
+    def batches(self) -> Iterator[RecordBatch]:
+        """
+        The underlying record batches
+        """
+        return self.__batches
+
+    def select(self, *names):
+        """
+        Keep only the given columns
+        :param names: column names
+        :return: ColumnarStream
+        """
+        return self._derive_columnar(batch.select(*names) for batch in self.__batches)
+
+    def with_column(self, name, func: Union[Callable[[Row], Any], Expr]):
+        """
+        Add or replace a column computed from each record
+        :param name: column name
+        :param func: (row -> value) function; or a column expression evaluated column-wise
+        :return: ColumnarStream
+        """
+        def compute(batch: RecordBatch):
+            if isinstance(func, Expr):
+                return batch.with_column(name, func.evaluate_columns(batch.column_dict(), len(batch)))
+            return batch.with_column(name, list(map(func, batch.rows())))
+        return self._derive_columnar(map(compute, self.__batches))
+
+    def map_values(self, func: Union[Callable[[Row], R], Expr]):
+        """
+        Apply the map function only to the records
+        :param func: (row -> any) value map function; or a column expression evaluated column-wise
+        :return: A DictStream wrapping transformed item
+        """
+        if not isinstance(func, Expr):
+            return super(ColumnarStream, self).map_values(func)
+
+        def evaluate(batch: RecordBatch):
+            values = func.evaluate_columns(batch.column_dict(), len(batch))
+            return zip(batch.keys, values.tolist() if hasattr(values, "tolist") else values)
+        return self._derive_dict(chain.from_iterable(map(evaluate, self.__batches)))
+
+    def filter_values(self, func: Union[Callable[[Row], bool], Expr]):
+        """
+        Pick records that pass the test, keeping them columnar
+        :param func: (row -> boolean) function each record will be tested against; or a column expression evaluated
+            column-wise
+        :return: ColumnarStream
+        """
+        def mask(batch: RecordBatch):
+            if isinstance(func, Expr):
+                return batch.compress(func.evaluate_columns(batch.column_dict(), len(batch)))
+            return batch.compress(list(map(func, batch.rows())))
+        return self._derive_columnar(batch for batch in map(mask, self.__batches) if len(batch))
+
+    def group_by(self, key: Union[Callable[[Tuple[K, Row]], K], Expr]):
+        """
+        Creates a stream of map entries, keys of which are the result by applying `key` on all (key, row) entries, and
+        values of which are the list of entries that result in the same key.
+        :param key: key generating function; or a column expression evaluated column-wise on the records
+        :return: stream of map entries
+        """
+        if not isinstance(key, Expr):
+            return super(ColumnarStream, self).group_by(key)
+
+        def keyed(batch: RecordBatch):
+            values = key.evaluate_columns(batch.column_dict(), len(batch))
+            return zip(values.tolist() if hasattr(values, "tolist") else values, batch.items())
+        return self._derive_dict(Grouper(chain.from_iterable(map(keyed, self.__batches)), self._track("group_by")))
+
+    def records(self):
+        """
+        Materialize the records as dicts
+        :return: Stream of dicts
+        """
+        return self._derive(chain.from_iterable(map(RecordBatch.to_records, self.__batches)))
@@ -6,24 +6,35 @@ streamer.streams
 
 The module contains many stream generators.
 """
-from typing import Iterable, TypeVar, Callable, Tuple, Collection, Union
-from io import TextIOBase
+from typing import Iterable, Iterator, TypeVar, Callable, Tuple, Collection, Union, Dict, Any
+from io import TextIOBase, BufferedIOBase
+from itertools import repeat, starmap
+from os import PathLike
 import re
-from .stream import Stream
-from .operator import Cartesian, ConstantOf, RepeatApply, Splitter
+from .stream import Stream, ColumnarStream
+from .operator import Cartesian, RepeatApply, Splitter
 from .util import cast_to_text_io
+from .memory import release_after
+from .sources import JsonLinesDecoder, JsonLinesReader, CsvReader, StructReader, Follower, Source
+from .columnar import DEFAULT_BATCH_SIZE
+from .expr import Expr
+from . import compression
+from .recordfile import RecordFile
+from .product import ProductSpace
+from .checkpoint import LineFile, TextSplitter
+from .seekable import Constant, Number, progression
 
 T = TypeVar("T")
 
 
 def constant_of(value: T, times: int) -> Stream[T]:
     """
-    A stream with constant value for x times
+    A stream with constant value for x times; it is sized, and skipped or limited without walking it
     :param value: constant value
     :param times: repeat times
     :return: constant stream
     """
-    return Stream(ConstantOf(value, times))
+    return Stream(Constant(value, times))
 
 
 def iterate(seed: T, operator: Callable) -> Stream:
@@ -42,44 +53,221 @@ def generate(gen_func: Callable[[], T]) -> Stream[T]:
     :param gen_func: the generator function
     :return: generate stream
     """
-    return Stream(RepeatApply(None, lambda _: gen_func())).skip(1)
+    return Stream(starmap(gen_func, repeat(())))
 
 
-def cartesian_product_stream(*streams: Iterable) -> Stream[Tuple]:
+def arange(start: Number, stop: Union[Number, None] = None, step: Number = 1) -> Stream[Number]:
+    """
+    A stream of the numbers from start (included) to stop (excluded), step apart - like `range`, floats allowed,
+    computed as `start + i * step` like `numpy.arange`. It is sized, skipped or limited without walking it, and read
+    by numeric streams a whole chunk at once.
+    :param start: first number; the stop if stop is not given, starting from 0
+    :param stop: number after the last
+    :param step: difference between consecutive numbers, not zero
+    :return: arithmetic progression stream
+    """
+    if stop is None:
+        start, stop = 0, start
+    return Stream(progression(start, stop, step))
+
+
+def counter(start: Number = 0, step: Number = 1) -> Stream[Number]:
+    """
+    A stream of the numbers from start, step apart, forever - like `itertools.count`, floats computed as
+    `start + i * step`. It is skipped in O(1), and limiting it gives a sized stream like `arange`.
+    :param start: first number
+    :param step: difference between consecutive numbers
+    :return: infinite arithmetic progression stream
+    """
+    return Stream(progression(start, None, step))
+
+
+def cartesian_product_stream(*streams: Iterable, start: int = 0, stop: Union[int, None] = None,
+                             shard: Union[Tuple[int, int], None] = None) -> Stream[Tuple]:
     """
     A stream containing all possible combinations of elements in given streams.
-    :param streams: streams to perform cartesian product
+    :param streams: streams to perform cartesian product; the memory budget of the first budgeted stream applies
+    :param start: number of the first combination, in `itertools.product` order (within the shard, if any); sized
+        collections only
+    :param stop: number after the last combination (within the shard, if any); sized collections only
+    :param shard: (i, n) - only the i-th of n contiguous, equal ranges of combinations; sized collections only
     :return: cartesian product stream
     """
-    return Stream(Cartesian(*streams))
+    if start != 0 or stop is not None or shard is not None:
+        if not all(isinstance(s, Collection) and not isinstance(s, Iterator) for s in streams):
+            raise ValueError("Ranges of a cartesian product need sized collections, not iterators or streams")
+        return Stream(_product_range(ProductSpace(*streams), start, stop, shard))
+    budget = next((s.memory_budget for s in streams if isinstance(s, Stream) and s.memory_budget is not None), None)
+    if budget is None:
+        return Stream(Cartesian(*streams))
+    tracker = budget.tracker("cartesian_product")
+    return Stream(release_after(Cartesian(*streams, tracker=tracker), tracker)).with_memory_budget(budget)
 
 
-def cartesian_power(power: int, collection: Collection) -> Stream[Tuple]:
+def cartesian_power(power: int, collection: Collection, *, start: int = 0, stop: Union[int, None] = None,
+                    shard: Union[Tuple[int, int], None] = None) -> Stream[Tuple]:
     """
     A stream containing all possibility of picking elements x times (with returning) in a given collection
     :param power: element numbers / self product x times
     :param collection: the collection
+    :param start: number of the first combination, in `itertools.product` order (within the shard, if any); earlier
+        ones are not enumerated, e.g. to resume a job
+    :param stop: number after the last combination (within the shard, if any)
+    :param shard: (i, n) - only the i-th of n contiguous, equal ranges of combinations, for n parallel workers
     :return: cartesion power stream
     """
     if power <= 0:
         raise ValueError("Cartesian power number should be at least 1")
-    return Stream(Cartesian(*(iter(collection) for _ in range(power))))
+    if start != 0 or stop is not None or shard is not None:
+        return Stream(_product_range(ProductSpace(collection, repeat=power), start, stop, shard))
+    return Stream(Cartesian(*(collection for _ in range(power))))
+
 
+def _product_range(space: ProductSpace, start: int, stop: Union[int, None],
+                   shard: Union[Tuple[int, int], None]) -> Iterator[Tuple]:
+    if shard is not None:
+        shard_start, shard_stop = space.shard_range(*shard)
+        start, stop = shard_start + start, shard_stop if stop is None else min(shard_start + stop, shard_stop)
+    return space.iter_range(start, stop)
 
-def lines_of(content: Union[TextIOBase, str]) -> Stream[str]:
+
+def product_space(*collections: Collection, repeat: int = 1) -> ProductSpace:
+    """
+    The cartesian product of sized collections as a random-access space: len(), `nth(i)` in O(dimensions),
+    `index_of(combination)`, and `iter_range(start, stop)` / `shard(i, n)` iterators that skip the combinations before
+    them without enumerating. Numbers follow `itertools.product` order.
+    :param collections: the collections
+    :param repeat: product of the collections with themselves this many times
+    :return: product space
+    """
+    return ProductSpace(*collections, repeat=repeat)
+
+
+def lines_of(content: Union[TextIOBase, BufferedIOBase, str, PathLike], *,
+             workers: Union[int, None] = None) -> Stream[str]:
     """
     A stream containing all lines from a text or a text buffer. New line chars are preserved.
-    :param content: text or text buffer
+    Binary buffers and files are decoded as UTF-8 and decompressed if gzip / bz2 / xz compressed.
+    An uncompressed file is read a chunk at a time on the calling thread, with byte offsets, so the stream can be
+    checkpointed (`Stream.checkpoint`).
+    :param content: text, text buffer, binary buffer, or a file path as `pathlib.Path` (a str is taken as text)
+    :param workers: decompression threads for a file path; see `lines_of_files`
     :return: stream of lines
     """
+    if isinstance(content, PathLike):
+        if workers is None and _uncompressed(content):
+            return Stream(LineFile(content))
+        return lines_of_files(content, workers=workers)
     return Stream(cast_to_text_io(content))
 
 
+def _uncompressed(path: PathLike) -> bool:
+    with open(path, "rb") as f:
+        return compression.detect(f.read(6)) is None
+
+
+def lines_of_files(*paths: Union[str, PathLike], workers: Union[int, None] = None,
+                   encoding: str = "utf-8") -> Stream[str]:
+    """
+    A stream containing all lines of files in order; gzip / bz2 / xz compressed files are detected and decompressed on
+    worker threads. Several files, or the members of a multi-member gzip file, are decompressed in parallel.
+    :param paths: file paths
+    :param workers: decompression threads; `min(4, cpu count)` by default
+    :param encoding: text encoding
+    :return: stream of lines
+    """
+    return Stream(compression.lines_of_files(paths, workers=workers, encoding=encoding))
+
+
 def split(content: Union[TextIOBase, str], regex: str) -> Stream[str]:
     """
     A stream containing all splits of a regex on a text or text buffer
-    :param content: text or text buffer
+    :param content: text or text buffer; a text is split in place, with character offsets for `Stream.checkpoint`
     :param regex: string, regex to split source
     :return: stream of split chunks
     """
-    return Stream(Splitter(cast_to_text_io(content), regex))
\ No newline at end of file
+    if isinstance(content, str):
+        return Stream(TextSplitter(content, regex))
+    return Stream(Splitter(cast_to_text_io(content), regex))
+
+
+def jsonl(source: Source, fields: Union[Iterable[Any], None] = None, *, where: Union[Expr, None] = None,
+          batch_size: int = DEFAULT_BATCH_SIZE, as_batches: bool = False) -> Union[Stream[dict], ColumnarStream]:
+    """
+    A stream of records from a JSON-lines source, decoded a batch of lines at a time
+    :param source: file path or text buffer
+    :param fields: fields to keep; missing fields are None. All fields of the first record by default.
+    :param where: column expression (`streamer.expr.col`) records are filtered with before being built
+    :param batch_size: lines decoded together
+    :param as_batches: produce a ColumnarStream of record batches instead of dicts
+    :return: stream of dicts, or ColumnarStream keyed by line number (blank lines skipped)
+    """
+    if fields is None and where is None and not as_batches:
+        return Stream(JsonLinesDecoder(source, batch_size))
+    batches = ColumnarStream(JsonLinesReader(source, fields, where=where, batch_size=batch_size))
+    return batches if as_batches else batches.records()
+
+
+def csv_records(source: Source, columns: Union[Iterable[str], None] = None, *,
+                types: Union[Dict[str, Callable[[str], Any]], None] = None, where: Union[Expr, None] = None,
+                batch_size: int = DEFAULT_BATCH_SIZE, as_batches: bool = False,
+                **csv_options) -> Union[Stream[dict], ColumnarStream]:
+    """
+    A stream of records from a CSV source with a header row; unrequested columns are dropped before conversion
+    :param source: file path or text buffer
+    :param columns: columns to keep; all columns by default
+    :param types: column -> (str -> value) converter, applied a batch of values at a time; str by default
+    :param where: column expression (`streamer.expr.col`) records are filtered with before being built
+    :param batch_size: rows converted together
+    :param as_batches: produce a ColumnarStream of record batches instead of dicts
+    :param csv_options: `csv.reader` options, e.g. delimiter
+    :return: stream of dicts, or ColumnarStream keyed by row number
+    """
+    batches = ColumnarStream(CsvReader(source, columns, types=types, where=where, batch_size=batch_size,
+                                       **csv_options))
+    return batches if as_batches else batches.records()
+
+
+def from_records(path: Union[str, PathLike], start: int = 0, *, shard: Union[Tuple[int, int], None] = None) -> Stream:
+    """
+    A stream of the elements of a record file written by `Stream.to_records`, read through mmap
+    :param path: file path
+    :param start: index of the first element; blocks before it are not read
+    :param shard: (i, n) - only the blocks i, i + n, i + 2n... so that n worker processes read the file in parallel
+    :return: stream of elements
+    """
+    return Stream(RecordFile(path).iter_from(start, shard))
+
+
+def structs(source, fmt: str, *, batch: Union[int, None] = None, start: int = 0, stop: Union[int, None] = None,
+            shard: Union[Tuple[int, int], None] = None, backend: str = "auto") -> Stream:
+    """
+    A stream of fixed-size binary records of a file (memory mapped) or a bytes-like buffer, e.g.
+    `structs(path, "<IdH")` yields (int, float, int) tuples
+    :param source: file path, or a bytes-like buffer
+    :param fmt: struct format of one record
+    :param batch: yield batches of this many records instead: NumPy structured arrays (zero-copy views, fields f0,
+        f1...) when NumPy is available and supports the format, lists of tuples otherwise
+    :param start: index of the first record; no record before it is read
+    :param stop: index after the last record; all records by default
+    :param shard: (i, n) - only the i-th of n contiguous, equal ranges of records, for n parallel workers
+    :param backend: "struct", "numpy" (batches only), or "auto"
+    :return: stream of tuples, or of batches
+    """
+    return Stream(StructReader(source, fmt, batch=batch, start=start, stop=stop, shard=shard, backend=backend))
+
+
+def follow(path: Union[str, PathLike], poll_interval: float = 1.0, from_end: bool = True, *, encoding: str = "utf-8",
+           idle_timeout: Union[float, None] = None) -> Stream[str]:
+    """
+    A live stream of lines appended to a growing file, like `tail -F`: new data is read in large chunks, lines are
+    delivered once complete (new line chars preserved), and rotation / truncation is detected by inode and size.
+    :param path: file path; waited for if it does not exist yet
+    :param poll_interval: seconds between checks when there is no new data
+    :param from_end: skip the content present when starting; rotated files are always read from their start
+    :param encoding: text encoding
+    :param idle_timeout: end the stream once no new data has arrived for this many seconds; never by default
+    :return: stream of lines
+    """
+    return Stream(Follower(path, poll_interval=poll_interval, from_end=from_end, encoding=encoding,
+                           idle_timeout=idle_timeout))
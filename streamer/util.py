@@ -10,27 +10,74 @@ This should be treated as an internal module and it's subjected to breaking chan
 
 from typing import Iterable, Iterator, Union, TypeVar
 import io
+from .compression import text_reader
 
 T = TypeVar('T')
 
 
+ITERATOR = 0
+ITERABLE = 1
+SCALAR = 2
+
+# result type -> how to iterate it; types are probed once, not on every call
+_KINDS = {}
+_TEXT_KINDS = {str: SCALAR, bytes: SCALAR, bytearray: SCALAR}
+
+
+def _probe(cls: type) -> int:
+    if hasattr(cls, "__iter__") and hasattr(cls, "__next__"):
+        return ITERATOR
+    if hasattr(cls, "__iter__") or hasattr(cls, "__getitem__"):     # iterables, including string
+        return ITERABLE
+    return SCALAR
+
+
+def kind_of(obj) -> int:
+    """
+    ITERATOR, ITERABLE or SCALAR, cached by type
+    """
+    cls = type(obj)
+    kind = _KINDS.get(cls)
+    if kind is None:
+        kind = _KINDS[cls] = _probe(cls)
+    return kind
+
+
 def to_iterator(stream_or_object: Union[Iterable[T], Iterator[T], T]) -> Iterator[T]:
-    # iterators
-    if hasattr(stream_or_object, "__iter__") and hasattr(stream_or_object, "__next__"):
+    kind = kind_of(stream_or_object)
+    if kind == ITERATOR:
         return stream_or_object
-
-    # iterables, including string
-    elif hasattr(stream_or_object, "__iter__") or hasattr(stream_or_object, "__getitem__"):
+    elif kind == ITERABLE:
         return iter(stream_or_object)
-
     else:
         return iter((stream_or_object, ))
 
 
-def cast_to_text_io(content: Union[io.TextIOBase, str]):
+def as_iterable(obj: Union[Iterable[T], T]) -> Iterable[T]:
+    """
+    The object itself if iterable (strings included), or a 1-tuple of it - for `chain.from_iterable`
+    """
+    return (obj, ) if kind_of(obj) == SCALAR else obj
+
+
+def as_iterable_or_scalar(obj: Union[Iterable[T], T]) -> Iterable[T]:
+    """
+    Like `as_iterable`, but strings and bytes are scalars
+    """
+    cls = type(obj)
+    kind = _TEXT_KINDS.get(cls)
+    if kind is None:
+        kind = _TEXT_KINDS[cls] = SCALAR if issubclass(cls, (str, bytes, bytearray)) else kind_of(obj)
+    return (obj, ) if kind == SCALAR else obj
+
+
+def cast_to_text_io(content: Union[io.TextIOBase, io.BufferedIOBase, io.RawIOBase, str]):
     if isinstance(content, io.IOBase):
         if isinstance(content, io.TextIOBase):
             return content
+        elif isinstance(content, (io.BufferedIOBase, io.RawIOBase)) and content.readable():
+            # binary files are decoded as UTF-8, and decompressed if compressed
+            return text_reader(content)
         else:
             raise ValueError("Only support TextIO instance family, %s not supported" % type(content))
     elif isinstance(content, str):
@@ -0,0 +1,33 @@
+import io
+from streamer import Stream, DictStream, ColumnarStream, bench, operator, streams
+
+
+def _public_names(prefix, namespace, module=None):
+    return {
+        "%s.%s" % (prefix, name) for name, obj in vars(namespace).items()
+        if (not name.startswith("_") or name == "__init__") and (callable(obj) or isinstance(obj, staticmethod))
+        and (module is None or getattr(obj, "__module__", None) == module)}
+
+
+def test_every_public_operation_is_benchmarked():
+    expected = _public_names("Stream", Stream) \
+        | _public_names("DictStream", DictStream) \
+        | _public_names("ColumnarStream", ColumnarStream) \
+        | _public_names("operator", operator, operator.__name__) \
+        | _public_names("streams", streams, streams.__name__) \
+        | {"Collector.collect"}
+    assert expected - bench.covered_names() == set()
+
+
+def test_bench_run_and_compare():
+    results = bench.run([10, 100], repeat_times=1, pattern="^Stream.map$")
+    assert {(r.size, r.impl) for r in results} == {(10, "stream"), (10, "baseline"), (100, "stream"), (100, "baseline")}
+
+    buf = io.StringIO()
+    bench.dump(results, buf)
+    buf.seek(0)
+    assert bench.load(buf) == results
+
+    out = io.StringIO()
+    bench.report(results, results, out=out)
+    assert "1.00x" in out.getvalue()
@@ -0,0 +1,140 @@
+from pathlib import Path
+import pytest
+from streamer import Stream, streams
+from streamer.checkpoint import LineFile, read_checkpoint
+from streamer.collector import Collector, CountCollector
+
+
+class ListCollector(Collector):
+    def supplier(self):
+        return []
+
+    def accumulator(self, acc, elem):
+        acc.append(elem)
+
+    def combiner(self, acc1, acc2):
+        return acc1 + acc2
+
+
+class Crash(Exception):
+    pass
+
+
+def crashing_at(value, calls):
+    def func(x):
+        calls.append(x)
+        if x == value and calls.count(x) == 1:
+            raise Crash()
+        return x
+    return func
+
+
+def test_resume_sequence(tmp_path):
+    path = tmp_path / "job.ckpt"
+    calls = []
+    with pytest.raises(Crash):
+        Stream(list(range(1000))).map(crashing_at(750, calls)).filter(lambda x: x % 3).checkpoint(path, every=100) \
+            .collect(ListCollector())
+    # the 500th element collected is 749, so 750 is the next one to read
+    position = read_checkpoint(path).position
+    assert position == 750
+    calls.clear()
+    result = Stream(list(range(1000))).map(crashing_at(None, calls)).filter(lambda x: x % 3).resume(path) \
+        .collect(ListCollector())
+    assert result == [x for x in range(1000) if x % 3]
+    # elements collected before the checkpoint are not computed again
+    assert calls == list(range(position, 1000))
+    # the last checkpoint is taken at the end, a rerun goes straight to the result
+    assert Stream(list(range(1000))).resume(path).collect(ListCollector()) == result
+
+
+def test_resume_or_start(tmp_path):
+    path = tmp_path / "job.ckpt"
+    assert Stream((1, 2, 3)).checkpoint(path, every_seconds=60).resume(path).count() == 3
+    assert read_checkpoint(path).position == 3
+    assert Stream((1, 2, 3)).checkpoint(path, every=1).resume(path).count() == 3
+
+
+def test_resume_lines(tmp_path):
+    path = tmp_path / "log.txt"
+    lines = ["line %d\r\n" % i for i in range(500)] + ["last"]
+    path.write_bytes("".join(lines).encode())
+    expected = [line.replace("\r\n", "\n") for line in lines]
+    assert streams.lines_of(path).collect_as_list() == expected
+
+    checkpoints = tmp_path / "log.ckpt"
+    with pytest.raises(Crash):
+        Stream(LineFile(path, chunk_size=100)).map(crashing_at("line 321\n", [])).checkpoint(checkpoints, every=7) \
+            .collect(ListCollector())
+    offset, consumed = read_checkpoint(checkpoints).position
+    assert 0 < offset < path.stat().st_size and consumed
+    # chunks are cut differently from the checkpoint offset on, lines are the same
+    assert Stream(LineFile(path, chunk_size=64)).resume(checkpoints).collect(ListCollector()) == expected
+    assert streams.lines_of(path).resume(checkpoints).collect(ListCollector()) == expected
+
+
+def test_resume_split(tmp_path):
+    path = tmp_path / "split.ckpt"
+    text = ",".join(map(str, range(300)))
+    with pytest.raises(Crash):
+        streams.split(text, ",").map(int).map(crashing_at(200, [])).checkpoint(path, every=50) \
+            .collect(ListCollector())
+    assert read_checkpoint(path).position == text.index(",200,") + 1
+    assert streams.split(text, ",").map(int).resume(path).collect(ListCollector()) == list(range(300))
+
+
+def test_incomplete_checkpoint_is_ignored(tmp_path):
+    path = tmp_path / "job.ckpt"
+    with pytest.raises(Crash):
+        Stream(list(range(100))).map(crashing_at(55, [])).checkpoint(path, every=10).collect(ListCollector())
+    with open(path, "ab") as f:
+        f.write(b"\x40\x00\x00\x00\x00\x00\x00\x00truncated")
+    assert read_checkpoint(path).position == 50
+    assert Stream(list(range(100))).resume(path).collect(ListCollector()) == list(range(100))
+
+
+def test_checkpoint_errors(tmp_path):
+    path = tmp_path / "job.ckpt"
+    with pytest.raises(ValueError):
+        Stream(x for x in range(10)).checkpoint(path, every=5)
+    with pytest.raises(ValueError):
+        Stream([1, 2]).checkpoint(path)
+    # a stream of a sorted copy is positioned in the copy
+    assert Stream([2, 1]).map(str).sorted().map(int).checkpoint(str(tmp_path / "sorted.ckpt"), every=1) \
+        .collect(ListCollector()) == [1, 2]
+    with pytest.raises(ValueError):
+        Stream([1, 2]).flat_map(lambda x: [x, x]).checkpoint(path, every=5)
+    with pytest.raises(ValueError):
+        Stream([1, 2]).checkpoint(path, every=5).collect(sum)
+    with pytest.raises(FileNotFoundError):
+        Stream([1, 2]).resume(path)
+    Stream([1, 2]).checkpoint(path, every=5).count()
+    with pytest.raises(ValueError):
+        Stream([1, 2, 3]).resume(path)
+
+
+def test_checkpoint_followed_by_other_stages(tmp_path):
+    path = tmp_path / "job.ckpt"
+    with pytest.raises(ValueError):
+        Stream(list(range(100))).checkpoint(path, every=10).flat_map(lambda x: (x, x))
+    with pytest.raises(ValueError):
+        Stream(list(range(100))).checkpoint(path, every=10).map(abs).sorted()
+    with pytest.raises(ValueError):
+        Stream(list(range(100))).checkpoint(path, every=10).map_to_int()
+    assert not path.exists()
+
+    with pytest.raises(Crash):
+        Stream(list(range(100))).map(crashing_at(55, [])).checkpoint(path, every=10).collect(CountCollector())
+    with pytest.raises(ValueError):
+        Stream(list(range(100))).resume(path).flat_map(lambda x: (x, ))
+    # the source is moved when collected, other consumers see all of it
+    assert list(Stream(list(range(100))).resume(path)) == list(range(100))
+    assert Stream(list(range(100))).resume(path).collect(CountCollector()) == 100
+
+
+def test_checkpoint_path_types(tmp_path):
+    path = tmp_path / "job.ckpt"
+    assert Stream(list(range(10))).checkpoint(path, every=3).resume(str(path)).collect(ListCollector()) \
+        == list(range(10))
+    assert Stream(list(range(10))).checkpoint(str(path), every=3).resume(Path(path)).collect(ListCollector()) \
+        == list(range(10))
@@ -0,0 +1,56 @@
+import pytest
+from streamer import Stream, ColumnarStream
+from streamer.columnar import RecordBatch, Row, Schema, batches_of
+from streamer.expr import col
+
+records = [{"x": i % 10, "y": "ab"[i % 2], "z": float(i)} for i in range(100)]
+
+
+def test_record_batch():
+    batch = RecordBatch.from_records(records[:4], keys="abcd")
+    assert batch.schema == Schema(["x", "y", "z"])
+    assert batch.column("y") == ["a", "b", "a", "b"]
+    assert batch.to_records() == records[:4]
+    row = list(batch.rows())[1]
+    assert isinstance(row, Row) and row["z"] == 1. and dict(row) == records[1] and row == records[1]
+    assert list(batch.select("x").items()) == [("a", {"x": 0}), ("b", {"x": 1}), ("c", {"x": 2}), ("d", {"x": 3})]
+    assert batch.compress([0, 1, 1, 0]).keys == ["b", "c"]
+    assert batch.with_column("x", [9] * 4).with_column("w", [1] * 4).to_records()[0] == {"x": 9, "y": "a", "z": 0.,
+                                                                                          "w": 1}
+    with pytest.raises(ValueError):
+        RecordBatch(["x", "y"], [[1], [2, 3]])
+    assert [len(b) for b in batches_of(records, batch_size=32)] == [32, 32, 32, 4]
+
+    empty = RecordBatch([], [], keys="ab").to_records()
+    assert empty == [{}, {}] and empty[0] is not empty[1]
+
+
+def test_columnar_stream():
+    assert Stream(records).to_columnar(batch_size=7).records().collect_as_list() == records
+    assert Stream(records).to_columnar(batch_size=7).collect_dict() == dict(enumerate(records))
+
+    expected = {i: r for i, r in enumerate(records) if r["x"] > 3 and r["y"] == "a"}
+    filtered = Stream(records).to_columnar(batch_size=16).filter_values((col("x") > 3) & (col("y") == "a"))
+    assert isinstance(filtered, ColumnarStream)
+    assert {k: dict(v) for k, v in filtered} == expected
+    filtered = Stream(records).to_columnar().filter_values(lambda r: r["x"] > 3 and r["y"] == "a")
+    assert {k: dict(v) for k, v in filtered} == expected
+
+    assert Stream(records).to_columnar(batch_size=16).map_values(col("x") * 2).collect_dict() \
+        == {i: r["x"] * 2 for i, r in enumerate(records)}
+    assert Stream(records).to_columnar().map_values(lambda r: r["y"]).collect_dict() \
+        == {i: r["y"] for i, r in enumerate(records)}
+
+    assert Stream(records).to_columnar(batch_size=16).with_column("w", col("z") / 2).select("x", "w").records() \
+        .collect_as_list() == [{"x": r["x"], "w": r["z"] / 2} for r in records]
+
+    groups = dict(Stream(records).to_columnar(batch_size=16).group_by(col("x") % 3))
+    assert {k: [i for i, _ in v] for k, v in groups.items()} \
+        == {k: [i for i, r in enumerate(records) if r["x"] % 3 == k] for k in range(3)}
+
+
+def test_numpy_columns():
+    numpy = pytest.importorskip("numpy")
+    batch = RecordBatch(["x", "y"], [numpy.arange(10), numpy.arange(10) * 1.5])
+    result = ColumnarStream([batch]).filter_values(col("x") >= col("y") - 2).batches()
+    assert [b.column("x").tolist() for b in result] == [[0, 1, 2, 3, 4]]
@@ -0,0 +1,60 @@
+import gzip
+import io
+import pytest
+from pathlib import Path
+from streamer import Stream, streams
+
+lines = ["line %d %s\n" % (i, "x" * (i % 13)) for i in range(5000)]
+
+
+@pytest.mark.parametrize("suffix", ["", ".gz", ".bz2", ".xz"])
+def test_round_trip(tmp_path, suffix):
+    path = tmp_path / ("lines.txt" + suffix)
+    Stream(lines).to_file(path)
+    with open(path, "rb") as f:
+        assert (f.read(2) == b"\x1f\x8b") == (suffix == ".gz")
+
+    assert streams.lines_of(path).collect_as_list() == lines
+    assert streams.lines_of_files(str(path), path, workers=2).collect_as_list() == lines * 2
+    with open(path, "rb") as f:
+        assert streams.lines_of(f).collect_as_list() == lines
+
+
+def test_explicit_compression(tmp_path):
+    path = tmp_path / "lines.log"
+    Stream(lines).to_file(path, compress="bz2", compresslevel=1)
+    assert streams.lines_of(path).count() == len(lines)
+    assert streams.lines_of(io.BytesIO(gzip.compress(b"a\nb"))).collect_as_list() == ["a\n", "b"]
+    with pytest.raises(ValueError):
+        Stream(lines).to_file(path, compress="zip")
+
+
+def test_gzip_members(tmp_path):
+    path = tmp_path / "members.gz"
+    with open(path, "wb") as f:
+        for i in range(7):
+            f.write(gzip.compress("".join(lines[i::7]).encode()))
+    expected = [line for i in range(7) for line in lines[i::7]]
+    assert streams.lines_of_files(path, workers=3).collect_as_list() == expected
+
+    # Stored (uncompressed) members make the header bytes inside the content look like member boundaries
+    fake_header = "\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+    contents = ["a%s\n" % fake_header, "b\n" * 100, "c%sc\n" % fake_header]
+    with open(path, "wb") as f:
+        for content in contents:
+            f.write(gzip.compress(content.encode("latin-1"), compresslevel=0))
+    assert streams.lines_of_files(path, workers=3, encoding="latin-1").collect("".join) == "".join(contents)
+
+    with open(path, "wb") as f:
+        f.write(gzip.compress(b"a\n" * 100) * 3 + gzip.compress(b"b\n" * 100)[:-20])
+    with pytest.raises(EOFError):
+        streams.lines_of_files(path, workers=3).count()
+
+
+def test_file_order(tmp_path):
+    paths = []
+    for i in range(6):
+        paths.append(Path(tmp_path / ("part%d.gz" % i)))
+        Stream(lines[i::6]).to_file(paths[-1])
+    assert streams.lines_of_files(*paths, workers=3).collect_as_list() == [x for i in range(6) for x in lines[i::6]]
+    assert streams.lines_of_files(*paths, workers=3).limit(3).collect_as_list() == lines[0::6][:3]
@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from streamer import DictStream, Stream
 
 
@@ -27,4 +28,38 @@ def test_dict_main():
 def test_to_dict_stream():
     s1 = DictStream(wrap=Stream("abcdefg").enumerate()) \
         .collect_dict()
-    assert s1 == {i: ch for i, ch in enumerate("abcdefg")}
\ No newline at end of file
+    assert s1 == {i: ch for i, ch in enumerate("abcdefg")}
+
+
+def test_merge_fast_paths():
+    base, override = {"a": 1, "b": 2}, {"b": 3, "c": 4}
+    assert DictStream.merge_dicts(base, override) == {"a": 1, "b": 3, "c": 4}
+    assert DictStream(base).with_overrides(b=5).add_dicts(override).build_dict() == {"a": 1, "b": 3, "c": 4}
+    assert DictStream.merge_dicts() == {}
+    assert base == {"a": 1, "b": 2}
+
+    # taken elements are not merged again
+    stream = DictStream(base, override)
+    assert next(stream) == ("a", 1)
+    assert stream.build_dict() == {"b": 3, "c": 4}
+    # so are elements taken by another stage
+    stream = DictStream(base, override)
+    assert stream.map(lambda kv: kv).limit(1).collect_as_list() == [("a", 1)]
+    assert stream.collect_dict() == {"b": 3, "c": 4}
+    stream = DictStream(base)
+    stream.add(DictStream(override)).limit(3).count()
+    assert stream.collect_dict() == {}
+    # and merging consumes the dicts for the other stages
+    stream = DictStream(base)
+    mapped = stream.map(lambda kv: kv)
+    assert stream.collect_dict() == base and mapped.collect_as_list() == []
+    stream = DictStream(base)
+    assert stream.add_dicts(override).collect_dict() == {"a": 1, "b": 3, "c": 4} and stream.collect_dict() == {}
+    # non-plain dict sources and other collectors take the streaming path
+    assert DictStream(OrderedDict(base)).add_dicts(override).collect_dict(OrderedDict) \
+        == OrderedDict([("a", 1), ("b", 3), ("c", 4)])
+
+    view = DictStream.merged_view(base, override, d=6)
+    assert (view["a"], view["b"], view["d"], len(view)) == (1, 3, 6, 4)
+    view["a"] = 0
+    assert view["a"] == 0 and base["a"] == 1
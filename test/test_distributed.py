@@ -0,0 +1,81 @@
+import os
+import pytest
+from streamer import Stream, Pipeline
+from streamer.collector import Collector, CountCollector
+from streamer.distributed import DistributedCollector, LocalWorkers, ShardError
+
+
+class ListCollector(Collector):
+    def supplier(self):
+        return []
+
+    def accumulator(self, acc, elem):
+        acc.append(elem)
+
+    def combiner(self, acc1, acc2):
+        return acc1 + acc2
+
+
+def is_even(x):
+    return x % 2 == 0
+
+
+def squares_of_range(bounds):
+    return (x * x for x in range(*bounds))
+
+
+def fail_once(shard):
+    # fails the first time a marker file is missing, then succeeds
+    path, n = shard
+    if not os.path.exists(path):
+        open(path, "w").close()
+        raise RuntimeError("transient failure")
+    return range(n)
+
+
+def always_fail(shard):
+    raise KeyError(shard)
+
+
+@pytest.fixture(scope="module")
+def workers():
+    with LocalWorkers(2) as local:
+        yield local
+
+
+def test_distributed_collect(workers):
+    count = DistributedCollector(CountCollector(), workers.addresses, Pipeline().filter(is_even), shard_size=100)
+    assert Stream(range(10000)).collect(count) == 5000
+
+    # partial accumulators are merged in shard order
+    collector = DistributedCollector(ListCollector(), workers.addresses, __name__ + ":squares_of_range",
+                                     max_in_flight=3)
+    shards = [(i, i + 7) for i in range(0, 700, 7)]
+    assert collector.collect_shards(shards) == [x * x for x in range(700)]
+    assert Stream([]).collect(DistributedCollector(ListCollector(), workers.addresses)) == []
+
+
+def test_retries(workers, tmp_path):
+    collector = DistributedCollector(CountCollector(), workers.addresses, fail_once, retries=1)
+    assert collector.collect_shards([(str(tmp_path / ("marker%d" % i)), 10) for i in range(5)]) == 50
+
+    with pytest.raises(ShardError) as error:
+        DistributedCollector(CountCollector(), workers.addresses, always_fail).collect_shards([1, 2])
+    assert "KeyError" in error.value.reason
+
+    with pytest.raises(ValueError):
+        DistributedCollector(Collector.of(sum), workers.addresses)
+
+
+def test_dead_workers():
+    with LocalWorkers(2) as local:
+        local.kill(0)
+        count = DistributedCollector(CountCollector(), local.addresses, shard_size=10, retries=1)
+        assert Stream(range(1000)).collect(count) == 1000
+        # a dead worker taking shards first does not use up their attempts
+        for _ in range(5):
+            count = DistributedCollector(CountCollector(), local.addresses, shard_size=10, retries=0)
+            assert Stream(range(1000)).collect(count) == 1000
+        local.kill(1)
+        with pytest.raises(RuntimeError, match="No worker left"):
+            Stream(range(1000)).collect(count)
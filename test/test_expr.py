@@ -0,0 +1,41 @@
+import enum
+import pytest
+from streamer import Stream, DictStream
+from streamer.expr import col, lit
+
+records = [{"x": i % 10, "y": "ab"[i % 2], "z": None if i % 7 == 0 else float(i)} for i in range(100)]
+
+
+def test_filter_map():
+    expr = (col("x") > 3) & (col("y") == "a")
+    assert Stream(records).filter(expr).collect_as_list() == [r for r in records if r["x"] > 3 and r["y"] == "a"]
+    assert Stream(records).filter(~col("x").isin([1, 2]) | col("z").is_none()).count() \
+        == sum(1 for r in records if r["x"] not in (1, 2) or r["z"] is None)
+    assert Stream(records).map(col("x") * 2 + 1).collect_as_list() == [r["x"] * 2 + 1 for r in records]
+    assert Stream(records).map((col("x") > 8) | (col("x") < 1)).collect_as_set() == {True, False}
+    assert Stream([(1, 2), (3, 4)]).map(col(0) - col(1) / lit(2)).collect_as_list() == [0, 1]
+
+    entries = DictStream(dict(enumerate(records))).filter_values(col("x") % 3 == 0)
+    assert entries.collect_dict() == {k: r for k, r in enumerate(records) if r["x"] % 3 == 0}
+
+    # column names without a literal repr
+    F = enum.Enum("F", "A B")
+    assert Stream([{F.A: 2}, {F.A: 0}]).filter(col(F.A) > 1).collect_as_list() == [{F.A: 2}]
+    assert Stream([{F.A: 2, F.B: 3}]).map(col(F.A) * col(F.B)).collect_as_list() == [6]
+
+
+def test_introspection():
+    expr = (col("x") > 3) & ~col("y").isin(["b"])
+    assert expr.columns() == {"x", "y"}
+    assert expr.to_tuple() == ("and", (">", ("col", "x"), ("lit", 3)), ("not", ("isin", ("col", "y"), frozenset("b"))))
+    assert repr(col("x") + 1) == "(col('x') + 1)"
+    assert expr({"x": 4, "y": "a"}) is True
+    with pytest.raises(TypeError):
+        bool(col("x") > 3)
+
+
+def test_evaluate_columns():
+    columns = {"x": [r["x"] for r in records], "z": [r["z"] for r in records]}
+    assert list((col("x") >= 5).evaluate_columns(columns, len(records))) == [r["x"] >= 5 for r in records]
+    # None values fall back to row evaluation
+    assert list(col("z").is_none().evaluate_columns(columns, len(records))) == [r["z"] is None for r in records]
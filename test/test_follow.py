@@ -0,0 +1,40 @@
+import os
+import threading
+import time
+from streamer import streams
+
+
+def test_follow_from_start_and_end(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("a\nb\npart")
+    assert streams.follow(path, from_end=False, idle_timeout=0).collect_as_list() == ["a\n", "b\n"]
+    assert streams.follow(path, idle_timeout=0).collect_as_list() == []
+    # files that do not exist yet are waited for
+    assert streams.follow(tmp_path / "missing.log", poll_interval=0.01, idle_timeout=0.05).count() == 0
+
+
+def test_follow_appends_rotation_and_truncation(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, "w") as f:
+        f.write("old\n")
+
+    def writer():
+        with open(path, "a") as f:
+            f.write("1\n2")
+            f.flush()
+            time.sleep(0.1)
+            f.write("\n3\n")
+            f.write("tail")
+        time.sleep(0.1)
+        os.rename(path, path + ".1")    # rotation: the unterminated last line is complete now
+        with open(path, "w") as f:
+            f.write("44\n")
+        time.sleep(0.1)
+        with open(path, "w") as f:      # truncation in place
+            f.write("5\n")
+
+    lines = streams.follow(path, poll_interval=0.01, idle_timeout=0.5)
+    thread = threading.Thread(target=writer)
+    thread.start()
+    assert lines.limit(6).collect_as_list() == ["1\n", "2\n", "3\n", "tail", "44\n", "5\n"]
+    thread.join()
@@ -0,0 +1,52 @@
+import time
+from streamer import Stream
+from streamer import instrument
+
+
+def test_stage_counts_and_selectivity():
+    with instrument.profile() as prof:
+        result = Stream(range(100)) \
+            .instrument("source") \
+            .filter(lambda x: x % 4 == 0) \
+            .instrument("filter") \
+            .flat_map(lambda x: (x, x)) \
+            .instrument("flat_map") \
+            .collect_as_list()
+    assert len(result) == 50
+
+    assert [m.name for m in prof.stages] == ["source", "filter", "flat_map"]
+    assert prof["source"].count_in is None
+    assert (prof["filter"].count_in, prof["filter"].count_out) == (100, 25)
+    assert prof["filter"].selectivity == 0.25
+    assert (prof["flat_map"].count_in, prof["flat_map"].count_out) == (25, 50)
+    assert all(m.finished for m in prof.stages)
+
+
+def test_stage_time_excludes_upstream():
+    def slow(x):
+        time.sleep(0.002)
+        return x
+
+    with instrument.profile() as prof:
+        Stream(range(20)).map(slow).instrument("slow").map(str).instrument("fast").count()
+    assert prof["slow"].wall_time > 0.03
+    assert prof["fast"].wall_time < prof["slow"].wall_time / 4
+    assert prof["fast"].inclusive_wall_time >= prof["slow"].wall_time
+
+
+def test_sampling_and_hooks():
+    exported = []
+    local = []
+    instrument.add_hook(exported.append)
+    try:
+        with instrument.profile() as prof:
+            Stream(range(1000)).instrument("sampled", sample_every=100, hook=local.append).limit(10).count()
+            Stream(range(1000)).instrument("full", sample_every=100).count()
+    finally:
+        instrument.remove_hook(exported.append)
+
+    full = prof["full"]
+    assert (full.calls, full.count_out, full.sampled_calls) == (1001, 1000, 11)
+    assert local == []     # never exhausted, but still exported when profiling ends
+    assert [m.name for m in exported] == ["full", "sampled"]
+    assert exported[1].count_out == 10 and not exported[1].finished
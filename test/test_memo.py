@@ -0,0 +1,64 @@
+import time
+from streamer import Stream
+from streamer.memo import MemoCache
+
+
+def test_cached_map_lru():
+    calls = []
+
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    cache = MemoCache(maxsize=3)
+    assert Stream([1, 2, 1, 3, 1, 4, 2]).cached_map(square, cache=cache, batch_size=1).collect_as_list() \
+        == [1, 4, 1, 9, 1, 16, 4]
+    assert calls == [1, 2, 3, 4, 2]
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (2, 5, 2, 3)
+
+    assert Stream("abcab").cached_map(str.upper, key=str.lower).collect("".join) == "ABCAB"
+
+
+def test_batches_deduplicate_keys():
+    batches = []
+
+    def lookup(keys):
+        batches.append(keys)
+        return [k * 10 for k in keys]
+
+    assert Stream([1, 1, 2, 2, 3, 1, 3, 4]) \
+        .cached_map(None, batch_func=lookup, batch_size=4) \
+        .collect_as_list() == [10, 10, 20, 20, 30, 10, 30, 40]
+    assert batches == [[1, 2], [3, 4]]
+
+    batches.clear()
+    assert Stream([1, 1, 2]).cached_map(None, batch_func=lookup, batch_size=1).collect_as_list() == [10, 10, 20]
+    assert batches == [[1], [2]]
+
+
+def test_ttl_and_persistent_tier(tmpdir, monkeypatch):
+    path = str(tmpdir.join("memo.sqlite"))
+    with MemoCache(persist_path=path) as cache:
+        assert Stream(range(10)).cached_map(str, cache=cache).collect_as_list() == [str(x) for x in range(10)]
+
+    calls = []
+    with MemoCache(persist_path=path) as cache:
+        assert Stream(range(12)).cached_map(lambda x: calls.append(x) or str(x), cache=cache).collect_as_list() \
+            == [str(x) for x in range(12)]
+        assert calls == [10, 11]
+        assert cache.stats().persistent_hits == 10
+
+    # a cache made by `cached_map` is closed with the stream, as well as its sqlite connection
+    closed = []
+    close = MemoCache.close
+    monkeypatch.setattr(MemoCache, "close", lambda self: closed.append(self) or close(self))
+    assert Stream(range(3)).cached_map(str, persist_path=path).collect_as_list() == ["0", "1", "2"]
+    assert len(closed) == 1
+    monkeypatch.undo()
+
+    cache = MemoCache(ttl=0.01)
+    Stream([1, 1]).cached_map(abs, cache=cache, batch_size=1).count()
+    time.sleep(0.02)
+    Stream([1]).cached_map(abs, cache=cache).count()
+    assert (cache.stats().hits, cache.stats().misses) == (1, 2)
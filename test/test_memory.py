@@ -0,0 +1,51 @@
+import pytest
+from streamer import Stream, streams
+from streamer.memory import MemoryBudget, MemoryBudgetExceeded
+
+
+def test_peak_usage_per_stage():
+    budget = MemoryBudget(1 << 30)
+    assert Stream(range(1000)) \
+        .with_memory_budget(budget) \
+        .map(lambda x: x % 100) \
+        .distinct() \
+        .sorted(reverse=True) \
+        .collect_as_list() == list(range(99, -1, -1))
+
+    assert set(budget.stages) == {"distinct", "sorted", "collect_as_list"}
+    assert all(tracker.peak > 0 for tracker in budget.stages.values())
+    assert budget.stages["sorted"].peak < budget.stages["collect_as_list"].peak * 2
+    assert budget.current == 0
+    assert budget.peak >= budget.stages["distinct"].peak
+
+
+def test_raise_names_the_stage():
+    with pytest.raises(MemoryBudgetExceeded) as error:
+        Stream(range(10000)).with_memory_budget(10000).group_by(lambda x: x % 3).collect_dict()
+    assert error.value.stage == "group_by"
+    assert "group_by" in str(error.value)
+
+    with pytest.raises(MemoryBudgetExceeded) as error:
+        streams.cartesian_product_stream(Stream(range(1000)).with_memory_budget(1000), range(1000)).count()
+    assert error.value.stage == "cartesian_product"
+
+
+def test_spill(tmpdir):
+    data = [(x * 7919) % 10007 for x in range(10007)]
+    budget = MemoryBudget(20000, on_exceed="spill", spill_dir=str(tmpdir))
+
+    assert Stream(data).with_memory_budget(budget).sorted(key=lambda x: -x).limit(5).collect(list) \
+        == [10006, 10005, 10004, 10003, 10002]
+    assert budget.stages["sorted"].spills > 1
+
+    assert Stream(data).with_memory_budget(budget) \
+        .reduce_right(lambda acc, x: acc + [x] if len(acc) < 3 else acc, []) == data[::-1][:3]
+    assert budget.stages["reduce_right"].spills > 1
+
+    budget = MemoryBudget(40000, on_exceed="spill", spill_dir=str(tmpdir))
+    groups = dict(Stream(data).with_memory_budget(budget).group_by(lambda x: x % 1000))
+    assert groups == {k: [x for x in data if x % 1000 == k] for k in range(1000)}
+    assert budget.stages["group_by"].spills == 1
+
+    with pytest.raises(MemoryBudgetExceeded):
+        Stream(data).with_memory_budget(budget).collect_as_set()
@@ -0,0 +1,70 @@
+import pytest
+from statistics import pvariance, variance
+from streamer import Stream, IntStream, FloatStream
+from streamer import numeric
+
+backends = ["array"] + ([] if numeric.numpy is None else ["numpy"])
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_reductions(backend):
+    data = [(x * 37) % 101 - 50 for x in range(1000)]
+    assert Stream(data).map_to_int(chunk_size=64, backend=backend).sum() == sum(data)
+    assert Stream(data).to_numeric(int, chunk_size=64, backend=backend).max() == max(data)
+    assert Stream(data).map_to_float(chunk_size=64, backend=backend).min() == float(min(data))
+    assert Stream(data).map_to_int(chunk_size=64, backend=backend).mean() == pytest.approx(sum(data) / len(data))
+    assert Stream(data).map_to_int(chunk_size=64, backend=backend).variance() == pytest.approx(pvariance(data))
+    assert Stream(data).map_to_int(chunk_size=64, backend=backend).variance(ddof=1) == pytest.approx(variance(data))
+    assert IntStream(data, chunk_size=64, backend=backend).count() == 1000
+
+    summary = FloatStream([1, 2, 3, 4], backend=backend).summary()
+    assert summary == {"count": 4, "sum": 10, "mean": 2.5, "variance": 1.25, "min": 1, "max": 4}
+
+    assert IntStream([], backend=backend).max() is None
+    assert IntStream([], backend=backend).mean() is None
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_int_sums_near_overflow(backend):
+    data = [2 ** 62, 2 ** 62 - 1, 2 ** 62, -5]
+    assert IntStream(data, chunk_size=3, backend=backend).sum() == sum(data)
+    assert IntStream(data, backend=backend).summary()["sum"] == sum(data)
+    assert IntStream([-2 ** 63, -1], backend=backend).sum() == -2 ** 63 - 1
+    assert list(IntStream([2 ** 62, -2 ** 62, 2 ** 62, 3], chunk_size=2, backend=backend).cumsum()) \
+        == [2 ** 62, 0, 2 ** 62, 2 ** 62 + 3]
+    with pytest.raises(OverflowError):
+        list(IntStream(data, chunk_size=2, backend=backend).cumsum())
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_transformations(backend):
+    ints = IntStream(range(10), chunk_size=3, backend=backend)
+    assert Stream(ints.cumsum()).collect_as_list() == [sum(range(x + 1)) for x in range(10)]
+
+    assert list((IntStream(range(10), chunk_size=3, backend=backend) * 2 + 1).limit(4)) == [1, 3, 5, 7]
+    assert isinstance(IntStream(range(3), backend=backend) * 0.5, FloatStream)
+    assert list(IntStream(range(3), backend=backend) / 2) == [0, 0.5, 1]
+    assert list(10 - IntStream(range(3), backend=backend)) == [10, 9, 8]
+    assert list(-FloatStream([1.5], backend=backend)) == [-1.5]
+    assert list(FloatStream([1.5, -2.5], backend=backend).as_int()) == [1, -2]
+    assert list(IntStream(range(4), backend=backend).map(lambda x: x * x)) == [0, 1, 4, 9]
+    assert list(IntStream(range(4), backend=backend).map(lambda c: c, vectorized=True)) == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_histogram(backend):
+    counts, edges = FloatStream([0, 0.5, 1, 1.5, 2, 3, 4, -1, 5], chunk_size=4, backend=backend) \
+        .histogram(bins=4, bounds=(0, 4))
+    assert counts == [2, 2, 1, 2]
+    assert edges == [0, 1, 2, 3, 4]
+
+    counts, edges = IntStream(range(10), backend=backend).histogram(bins=3)
+    assert counts == [3, 3, 4]
+    assert edges[0] == 0 and edges[-1] == 9
+
+    # the closed last bin counts its upper bound once, whatever the rounding of the bin width
+    assert FloatStream([0, 7.7], backend=backend).histogram(bins=1, bounds=(0, 7.7))[0] == [2]
+    for high in (7.7, 0.3, 1 / 3, 1e-300):
+        values = [0, high / 2, high * 0.999999, high, high * 1.000001, -high]
+        counts, _ = FloatStream(values, backend=backend).histogram(bins=3, bounds=(0, high))
+        assert counts == [1, 1, 2]
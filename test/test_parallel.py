@@ -0,0 +1,67 @@
+import threading
+import time
+import pytest
+from itertools import count
+from streamer import Stream
+
+
+def is_odd(x):
+    return x % 2 == 1
+
+
+def test_parallel_search():
+    assert Stream(range(1000)).parallel_any_match(lambda x: x == 999, workers=4, chunk_size=7)
+    assert not Stream(range(1000)).parallel_any_match(lambda x: x < 0, workers=4)
+    assert Stream(range(1000)).parallel_all_match(lambda x: x >= 0, workers=3)
+    assert not Stream(range(1000)).parallel_all_match(lambda x: x < 500, workers=3)
+    assert Stream(range(1000)).parallel_none_match(lambda x: x < 0)
+    assert Stream(range(1000)).parallel_has_any(-1, 500, workers=2)
+    assert not Stream([]).parallel_has_any(1)
+    assert Stream(range(1000)).parallel_has_all(999, 3, 500, workers=4, chunk_size=7)
+    assert not Stream(range(1000)).parallel_has_all(3, -1, workers=4)
+    assert Stream([1, 1, 2]).parallel_has_all(2, 1) and not Stream([]).parallel_has_all(1)
+    # the search ends on an infinite source once every candidate is seen
+    assert Stream(count()).parallel_has_all(10, 20000, 5, workers=3)
+    assert Stream([]).parallel_find_first(bool) is None
+
+    with pytest.raises(ValueError):
+        Stream(range(10)).parallel_any_match(bool, executor="fiber")
+
+
+def test_find_first_keeps_order():
+    # later chunks answer faster than earlier ones, the first match still wins
+    def slow_early(x):
+        time.sleep(0.002 if x < 40 else 0)
+        return x % 10 == 3
+    assert Stream(range(100)).parallel_find_first(slow_early, workers=4, chunk_size=8) == 3
+    assert Stream(range(100)).parallel_find_first(lambda x: x == 77, workers=4, chunk_size=1) == 77
+
+
+def test_short_circuit_on_infinite_source():
+    pulled = []
+    lock = threading.Lock()
+
+    def source():
+        for i in count():
+            with lock:
+                pulled.append(i)
+            yield i
+    assert Stream(source()).parallel_find_first(lambda x: x == 1000, workers=4, chunk_size=10) == 1000
+    # the source is pulled at most `2 * workers` chunks ahead of the match
+    assert len(pulled) <= 1000 + 2 * 4 * 10 + 1
+
+
+def test_errors_propagate():
+    def boom(x):
+        if x == 5:
+            raise KeyError(x)
+        return False
+    with pytest.raises(KeyError):
+        Stream(range(100)).parallel_any_match(boom, workers=2, chunk_size=3)
+    # errors after the first match are never reached by the serial search either
+    assert Stream(range(100)).parallel_find_first(lambda x: x == 1 or boom(x), workers=2, chunk_size=3) == 1
+
+
+def test_process_executor():
+    assert Stream(range(200)).parallel_find_first(is_odd, workers=2, executor="process") == 1
+    assert not Stream(range(0, 200, 2)).parallel_any_match(is_odd, workers=2, executor="process")
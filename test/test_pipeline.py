@@ -0,0 +1,44 @@
+import pickle
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from streamer import Pipeline, Stream
+
+
+def square(x):
+    return x * x
+
+
+def is_even(x):
+    return x % 2 == 0
+
+
+def test_pipeline_template():
+    pipeline = Pipeline().map(square).filter(is_even).distinct()
+    assert len(pipeline) == 3
+    assert repr(pipeline) == "Pipeline().map(square).filter(is_even).distinct()"
+    assert pipeline([1, 2, 2, 4]).collect_as_list() == [4, 16]
+    assert pipeline(Stream(range(5))).collect_as_list() == [0, 4, 16]
+    # reusable, and immutable: extending gives a new pipeline
+    assert [pipeline.count()([i, i + 1]) for i in range(3)] == [1, 1, 1]
+    assert pipeline.then(Pipeline().limit(1))(range(10)).collect_as_list() == [0]
+    assert len(pipeline) == 3
+
+    # stages of derived stream types
+    assert Pipeline().map_to_int().sum()(["1", "2"]) == 3
+    assert Pipeline().map_to_key_value(str, square).map_values(str).collect_dict()([3]) == {"3": "9"}
+
+    with pytest.raises(AttributeError):
+        Pipeline().no_such_operation()
+    with pytest.raises(ValueError):
+        Pipeline([("no_such_operation", (), {})])
+
+
+def test_pipeline_pickles():
+    pipeline = Pipeline().map(square).filter(is_even).sorted(reverse=True)
+    copy = pickle.loads(pickle.dumps(pipeline))
+    assert copy == pipeline and copy(range(5)).collect_as_list() == [16, 4, 0]
+
+    shards = [range(i, 100, 4) for i in range(4)]
+    with ProcessPoolExecutor(2) as pool:
+        results = list(pool.map(pipeline.count(), shards))
+    assert results == [Stream(s).map(square).filter(is_even).count() for s in shards]
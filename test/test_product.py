@@ -0,0 +1,46 @@
+import pickle
+import pytest
+from itertools import product
+from streamer import streams, Stream
+
+
+def test_product_space():
+    pools = (range(3), "ab", [None, 1.5, "x", ()])
+    expected = list(product(*pools))
+    space = streams.product_space(*pools)
+    assert len(space) == len(expected) == 24
+    assert [space.nth(i) for i in range(24)] == expected
+    assert space[-1] == expected[-1] and space.digits(5) == [0, 1, 1]
+    assert [space.index_of(c) for c in expected] == list(range(24))
+    for start in range(25):
+        for stop in (start, start + 1, 13, 24, None):
+            assert list(space.iter_range(start, stop)) == expected[start:stop]
+    assert list(space) == expected
+    assert sum((list(space.shard(i, 5)) for i in range(5)), []) == expected
+    assert pickle.loads(pickle.dumps(space)).nth(7) == expected[7]
+
+    with pytest.raises(IndexError):
+        space.nth(24)
+    with pytest.raises(ValueError):
+        space.shard(5, 5)
+    assert len(streams.product_space("ab", [])) == 0 and list(streams.product_space()) == []
+
+
+def test_huge_space_is_not_enumerated():
+    space = streams.product_space(range(1000), repeat=6)
+    assert len(space) == 10 ** 18
+    assert space.nth(123456789012345678) == (123, 456, 789, 12, 345, 678)
+    assert next(space.shard(3, 4)) == (750, 0, 0, 0, 0, 0)
+
+
+def test_product_stream_ranges():
+    expected = list(product(range(5), repeat=3))
+    assert streams.cartesian_power(3, range(5), start=100).collect_as_list() == expected[100:]
+    shards = [streams.cartesian_power(3, range(5), shard=(i, 3)).collect_as_list() for i in range(3)]
+    assert [len(s) for s in shards] == [41, 42, 42] and sum(shards, []) == expected
+    # resuming inside a shard
+    assert streams.cartesian_power(3, range(5), shard=(1, 3), start=10, stop=20).collect_as_list() \
+        == expected[51:61]
+    assert streams.cartesian_product_stream(range(5), "xy", stop=3).collect_as_list() == [(0, "x"), (0, "y"), (1, "x")]
+    with pytest.raises(ValueError):
+        streams.cartesian_product_stream(Stream(range(5)), range(3), start=1)
@@ -0,0 +1,50 @@
+import pytest
+from streamer import Stream, streams
+from streamer.recordfile import RecordFile
+
+records = [{"i": i, "name": "r%d" % i, "payload": bytes(i % 7)} for i in range(1000)]
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "records.rec"
+    result = Stream(records).to_records(path, block_records=64)
+    assert result.records == 1000 and result.paths == [str(path)]
+    assert streams.from_records(path).collect_as_list() == records
+
+    f = RecordFile(path)
+    assert (len(f), f.block_count) == (1000, 16)
+    assert f.block_of(130) == 2 and f.block_start(2) == 128
+    assert f.read_block(15) == records[960:]
+
+    assert streams.from_records(path, start=130).collect_as_list() == records[130:]
+    assert streams.from_records(path, start=1000).collect_as_list() == []
+    shards = [streams.from_records(path, start=100, shard=(i, 3)).collect_as_list() for i in range(3)]
+    assert sorted(sum(shards, []), key=lambda r: r["i"]) == records[100:]
+
+    Stream([]).to_records(path)
+    assert streams.from_records(path).collect_as_list() == []
+
+
+def test_incomplete_files(tmp_path):
+    path = tmp_path / "records.rec"
+
+    def failing():
+        yield from records
+        raise RuntimeError("upstream failure")
+    with pytest.raises(RuntimeError):
+        Stream(failing()).to_records(path)
+    assert not path.exists()
+
+    path.write_bytes(b"not a record file at all")
+    with pytest.raises(ValueError):
+        streams.from_records(path)
+
+
+def test_out_of_band_buffers(tmp_path):
+    numpy = pytest.importorskip("numpy")
+    path = tmp_path / "arrays.rec"
+    Stream(numpy.arange(i * 100, (i + 1) * 100) for i in range(10)).to_records(path, block_records=3)
+    arrays = streams.from_records(path, start=4).collect_as_list()
+    assert [a[0] for a in arrays] == list(range(400, 1000, 100))
+    # views into the file mapping, not copies
+    assert not arrays[0].flags.owndata and not arrays[0].flags.writeable
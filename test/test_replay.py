@@ -0,0 +1,29 @@
+from streamer import Stream
+
+
+def test_cache_replays():
+    pulled = []
+    cached = Stream(range(100)).peek(pulled.append).map(lambda x: pulled.append(x) or x * 2).cache()
+    assert pulled == [0]
+    assert Stream(cached).limit(10).collect_as_list() == list(range(0, 20, 2))
+    assert Stream(cached).collect_as_list() == list(range(0, 200, 2))
+    assert Stream(cached).count() == len(cached) == 100
+    assert pulled == [0] + list(range(100))
+
+
+def test_cache_spills(tmpdir):
+    cached = Stream(range(10000)).map(str).cache(max_memory=10000, spill_dir=str(tmpdir))
+    first, second = iter(cached), iter(cached)
+    assert [next(first) for _ in range(5000)] == [str(x) for x in range(5000)]
+    assert cached.spilled > 4000
+    assert list(second) == [str(x) for x in range(10000)]
+    assert list(first) == [str(x) for x in range(5000, 10000)]
+
+
+def test_tee(tmpdir):
+    assert [s.collect_as_list() for s in Stream(range(5)).tee(3)] == [list(range(5))] * 3
+    assert Stream([]).tee()[1].collect_as_list() == []
+
+    fast, slow = Stream(range(1000)).tee(2, max_lag=10, spill_dir=str(tmpdir))
+    assert fast.limit(500).collect_as_list() == list(range(500))
+    assert slow.collect_as_list() == list(range(1000))
@@ -0,0 +1,94 @@
+import pytest
+from collections import Counter
+from streamer import Stream
+from streamer.collector import BernoulliCollector, ReservoirCollector, StratifiedCollector
+from streamer.sampling import Reservoir
+
+
+def test_sample():
+    sample = Stream(range(100000)).sample(0.1, seed=7).collect_as_list()
+    assert 9000 < len(sample) < 11000 and sample == sorted(set(sample))
+    assert Stream(range(100000)).sample(0.1, seed=7).collect_as_list() == sample
+    assert Stream(range(10)).sample(1).collect_as_list() == list(range(10))
+    assert Stream(range(10)).sample(0).collect_as_list() == []
+    with pytest.raises(ValueError):
+        Stream(range(10)).sample(1.5)
+
+
+def test_reservoir_is_uniform():
+    counts = Counter()
+    for seed in range(2000):
+        sample = Stream(range(20)).reservoir(5, seed=seed).collect_as_list()
+        assert len(sample) == len(set(sample)) == 5
+        counts.update(sample)
+    # every element is picked with probability 1 / 4
+    assert all(400 < counts[i] < 600 for i in range(20))
+
+    assert sorted(Stream(range(3)).reservoir(5).collect_as_list()) == [0, 1, 2]
+    assert Stream(range(3)).reservoir(0).collect_as_list() == []
+
+
+def test_reservoir_add_all_matches_add():
+    bulk = Reservoir(10, seed=3).add_all(range(100000))
+    single = Reservoir(10, seed=3)
+    for i in range(100000):
+        single.add(i)
+    assert bulk.items == single.items and bulk.seen == single.seen == 100000
+
+
+def test_merged_reservoirs_are_uniform():
+    counts = Counter()
+    collector = ReservoirCollector(4)
+    for _ in range(2000):
+        # shards of very different sizes
+        left, right = collector.supplier(), collector.supplier()
+        for i in range(4):
+            collector.accumulator(left, i)
+        for i in range(4, 20):
+            collector.accumulator(right, i)
+        merged = collector.combiner(left, right)
+        collector.accumulator(merged, 20)
+        counts.update(collector.finisher(merged))
+    # every element is picked with probability 4 / 21
+    assert all(300 < counts[i] < 470 for i in range(21))
+
+
+def test_sampling_collectors():
+    assert len(Stream(range(1000)).collect(ReservoirCollector(10, seed=1))) == 10
+    assert Stream(range(1000)).collect(BernoulliCollector(0.5, seed=1)) \
+        == Stream(range(1000)).sample(0.5, seed=1).collect_as_list()
+    collector = BernoulliCollector(0.5)
+    acc = collector.supplier()
+    for i in range(1000):
+        collector.accumulator(acc, i)
+    assert 400 < len(collector.finisher(collector.combiner(acc, collector.supplier()))) < 600
+
+    collector = BernoulliCollector(0)
+    acc = collector.supplier()
+    for i in range(10):
+        collector.accumulator(acc, i)
+    assert collector.finisher(acc) == [] and Stream(range(10)).collect(collector) == []
+    with pytest.raises(ValueError):
+        BernoulliCollector(-0.5)
+    # log(1 - p) rounds to 0 for such p, log1p does not
+    for p in (1e-17, 5e-324):
+        assert Stream(range(10)).sample(p).collect_as_list() == []
+        assert BernoulliCollector(p).collect(range(10)) == []
+        acc = BernoulliCollector(p).supplier()
+        acc.add(0)
+        assert acc.items == []
+
+    collector = StratifiedCollector(lambda x: x % 3, 2, seed=1)
+    acc1, acc2 = collector.supplier(), collector.supplier()
+    for i in range(10):
+        collector.accumulator(acc1 if i < 5 else acc2, i)
+    samples = collector.finisher(collector.combiner(acc1, acc2))
+    assert sorted(samples) == [0, 1, 2]
+    assert all(len(v) == 2 and all(x % 3 == k for x in v) for k, v in samples.items())
+
+
+def test_sample_by():
+    samples = Stream(range(1000)).sample_by(lambda x: x % 7, 3, seed=5).collect_dict()
+    assert list(samples) == list(range(7))
+    assert all(len(v) == 3 and all(x % 7 == k for x in v) for k, v in samples.items())
+    assert Stream("aab").sample_by(str.upper, 5).collect_dict() == {"A": ["a", "a"], "B": ["b"]}
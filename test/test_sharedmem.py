@@ -0,0 +1,61 @@
+import time
+import pytest
+from streamer import Stream
+from streamer.sharedmem import SharedBatchPool, encode_into, decode_from, shared_memory
+
+
+def negate(x):
+    return -x
+
+
+def describe(batch, suffix):
+    return ["%r%s" % (x, suffix) for x in batch]
+
+
+@pytest.mark.parametrize("batch", [
+    [1, -2, 3 << 40], [0.5, -1e300], [b"", b"ab", b"\x00" * 10], [(1, 2.5), (-3, 0.0)],
+])
+def test_encodings(batch):
+    buf = memoryview(bytearray(1024))
+    encoding = encode_into(batch, buf)
+    assert encoding is not None
+    assert decode_from(encoding, buf) == batch
+
+
+@pytest.mark.parametrize("batch", [
+    [], [1, 2.0], [True], [1 << 70], ["text"], [(1, "x")], [(1,), (1, 2)], [b"x" * 2000],
+])
+def test_fallback_batches(batch):
+    assert encode_into(batch, memoryview(bytearray(1024))) is None
+
+
+@pytest.mark.skipif(shared_memory is None, reason="needs multiprocessing.shared_memory")
+def test_shared_batch_pool():
+    with SharedBatchPool(2, slots=2, slot_bytes=4096) as pool:
+        futures = [pool.submit(describe, list(range(i, i + 10)), "!") for i in range(0, 100, 10)]
+        assert sum((f.result() for f in futures), []) == ["%d!" % i for i in range(100)]
+        assert pool.submit(sorted, [3.5, 1.5]).result() == [1.5, 3.5]
+        assert pool.submit(sum, [1, 2]).result() == 3
+        with pytest.raises(TypeError):
+            pool.submit(sum, [1, "2"]).result()
+
+
+@pytest.mark.skipif(shared_memory is None, reason="needs multiprocessing.shared_memory")
+def test_shutdown_without_waiting():
+    pool = SharedBatchPool(2, slots=2, slot_bytes=4096)
+    futures = [pool.submit(describe, list(range(i, i + 10)), "!") for i in range(0, 40, 10)]
+    pool.shutdown(wait=False)
+    # the shared memory outlives the shutdown until the last running batch is read back
+    assert sum((f.result() for f in futures), []) == ["%d!" % i for i in range(40)]
+    for _ in range(100):
+        if pool._SharedBatchPool__segment is None:
+            break
+        time.sleep(0.01)
+    assert pool._SharedBatchPool__segment is None
+
+
+def test_process_map():
+    assert Stream(range(5000)).process_map(negate, 2, batch_size=100).collect_as_list() == [-x for x in range(5000)]
+    assert Stream([b"ab", b"c"] * 100).process_map(len).collect_as_list() == [2, 1] * 100
+    assert Stream(["a", 1, None]).process_map(str, batch_size=2).collect_as_list() == ["a", "1", "None"]
+    assert Stream(range(10 ** 9)).process_map(negate, 2, batch_size=10).limit(3).collect_as_list() == [0, -1, -2]
@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+import os
+import pytest
+from streamer import Stream, streams
+
+records = [{"x": i, "y": "a,b" if i % 3 == 0 else "c", "z": i / 2} for i in range(1000)]
+
+
+def test_write_lines():
+    buf = io.StringIO()
+    result = Stream(range(5)).write_lines(buf, buffer_size=4)
+    assert buf.getvalue() == "0\n1\n2\n3\n4\n"
+    assert (result.records, result.size, result.paths) == (5, 10, [])
+    assert Stream([(1, 2)]).write_lines(buf, line_end="\r\n").size == 8
+
+    with pytest.raises(ValueError):
+        Stream(range(5)).write_lines(io.StringIO(), atomic=True)
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_to_jsonl_and_csv(tmp_path, background):
+    path = str(tmp_path / "out.jsonl.gz")
+    assert Stream(records).to_jsonl(path, background=background, buffer_size=100).paths == [path]
+    assert streams.lines_of_files(path).map(json.loads).collect_as_list() == records
+
+    path = str(tmp_path / "out.csv")
+    assert Stream(records).to_csv(path, background=background).records == len(records)
+    with open(path, newline="") as f:
+        assert list(csv.DictReader(f)) == [{k: str(v) for k, v in r.items()} for r in records]
+
+    buf = io.StringIO()
+    Stream([(1, 2), (3, 4)]).to_csv(buf, ["a", "b"], csv_options={"delimiter": ";"})
+    assert buf.getvalue() == "a;b\n1;2\n3;4\n"
+    # field names taken from the first row give the header of an open file too
+    buf = io.StringIO()
+    Stream([{"a": 1, "b": 2}]).to_csv(buf, background=background)
+    assert buf.getvalue() == "a,b\n1,2\n"
+    Stream([]).to_csv(path)
+    assert os.path.getsize(path) == 0
+
+
+def test_rolling_and_atomic(tmp_path):
+    pattern = str(tmp_path / "part-{index:03d}.csv")
+    result = Stream(records).to_csv(pattern, max_records=300, atomic=True, background=True)
+    assert result.paths == [pattern.format(index=i) for i in range(4)]
+    assert sorted(os.listdir(str(tmp_path))) == ["part-%03d.csv" % i for i in range(4)]
+    assert [streams.csv_records(p).count() for p in result.paths] == [300, 300, 300, 100]
+
+    result = Stream(range(1000)).write_lines(str(tmp_path / "lines-{index}.txt"), max_bytes=1000)
+    assert all(os.path.getsize(p) >= 1000 for p in result.paths[:-1])
+    assert streams.lines_of_files(*result.paths).map(int).collect_as_list() == list(range(1000))
+
+    with pytest.raises(ValueError):
+        Stream(range(5)).write_lines(str(tmp_path / "lines.txt"), max_records=2)
+
+    # A failed atomic write leaves neither the file nor the temporary file behind
+    def failing():
+        for i in range(10000):
+            yield i
+        raise RuntimeError("upstream failure")
+    os.makedirs(str(tmp_path / "atomic"))
+    with pytest.raises(RuntimeError):
+        Stream(failing()).write_lines(str(tmp_path / "atomic" / "out.txt"), atomic=True, buffer_size=100)
+    assert os.listdir(str(tmp_path / "atomic")) == []
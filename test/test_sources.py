@@ -0,0 +1,66 @@
+import io
+import json
+import pytest
+from streamer import streams, ColumnarStream
+from streamer.expr import col
+from streamer.sources import JsonLinesDecoder
+
+records = [{"x": i % 10, "y": "ab"[i % 2], "z": float(i)} for i in range(100)]
+jsonl_text = "".join(json.dumps(r) + "\n" + ("\n" if i == 50 else "") for i, r in enumerate(records))
+csv_text = "x,y,z\n" + "".join("%d,%s,%r\n" % (r["x"], r["y"], r["z"]) for r in records)
+
+
+def test_jsonl(tmp_path):
+    assert streams.jsonl(io.StringIO(jsonl_text)).collect_as_list() == records
+
+    path = tmp_path / "records.jsonl"
+    path.write_text(jsonl_text)
+    assert streams.jsonl(str(path), ["z", "w"], batch_size=16).collect_as_list() \
+        == [{"z": r["z"], "w": None} for r in records]
+    assert streams.jsonl(path, ["x"], where=(col("y") == "a") & (col("x") > 5), batch_size=16).collect_as_list() \
+        == [{"x": r["x"]} for r in records if r["y"] == "a" and r["x"] > 5]
+
+    batches = streams.jsonl(io.StringIO(jsonl_text), ["x", "y"], as_batches=True)
+    assert isinstance(batches, ColumnarStream)
+    assert [b.schema.names for b in batches.batches()] == [("x", "y")]
+
+    with pytest.raises(ValueError):
+        streams.jsonl(io.StringIO('{"x": 1}\n{"x": \n')).collect_as_list()
+    # every line should be a JSON value on its own
+    with pytest.raises(ValueError):
+        list(JsonLinesDecoder(io.StringIO("[1\n2]\n")))
+    with pytest.raises(ValueError):
+        list(JsonLinesDecoder(io.StringIO("0\n1, 2\n")))
+    with pytest.raises(ValueError):
+        list(JsonLinesDecoder(io.StringIO("[1\n2]\n3, 4\n")))
+    with pytest.raises(ValueError):
+        streams.jsonl(io.StringIO('{"x": [1\n2]}\n')).collect_as_list()
+    with pytest.raises(ValueError):
+        streams.jsonl(io.StringIO('{"x": 3}, {"x": 4}\n')).collect_as_list()
+    assert list(JsonLinesDecoder(io.StringIO(' [1, 2] \r\n\n"a"'))) == [[1, 2], "a"]
+
+
+def test_csv_records(tmp_path):
+    assert streams.csv_records(io.StringIO(csv_text)).collect_as_list() \
+        == [{"x": str(r["x"]), "y": r["y"], "z": repr(r["z"])} for r in records]
+
+    path = tmp_path / "records.csv"
+    path.write_text(csv_text)
+    assert streams.csv_records(str(path), ["z", "x"], types={"x": int, "z": float}, batch_size=16).collect_as_list() \
+        == [{"z": r["z"], "x": r["x"]} for r in records]
+    assert streams.csv_records(path, ["y"], types={"x": int}, where=col("x") >= 8).collect_as_list() \
+        == [{"y": r["y"]} for r in records if r["x"] >= 8]
+
+    batches = streams.csv_records(io.StringIO(csv_text.replace(",", ";")), ["x"], types={"x": int}, delimiter=";",
+                                  batch_size=16, as_batches=True)
+    assert batches.map_values(col("x") + 1).collect_dict() == {i: r["x"] + 1 for i, r in enumerate(records)}
+
+    assert streams.csv_records(io.StringIO("")).collect_as_list() == []
+    with pytest.raises(ValueError):
+        streams.csv_records(io.StringIO(csv_text), ["w"]).collect_as_list()
+
+    assert streams.csv_records(io.StringIO("a,b\n1,2\n\n3,4\n\n"), batch_size=1).collect_as_list() \
+        == [{"a": "1", "b": "2"}, {"a": "3", "b": "4"}]
+    assert streams.csv_records(io.StringIO("a,b\n1,2\n3\n"), ["a"]).collect_as_list() == [{"a": "1"}, {"a": "3"}]
+    with pytest.raises(ValueError, match="record 2"):
+        streams.csv_records(io.StringIO("a,b\n1,2\n\n3\n")).collect_as_list()
@@ -1,5 +1,8 @@
 from streamer import streams, Stream
+from itertools import count, product
+from operator import length_hint
 import io
+import pytest
 
 
 def test_cartesian():
@@ -18,10 +21,86 @@ def test_cartesian():
         .collect_dict() == {(i, None): 3 for i in range(10)}
 
 
+def test_cartesian_lazy_sources():
+    # infinite sources still reach every combination, one diagonal round at a time
+    firsts = streams.cartesian_product_stream(count(), iter("ab"), count()).limit(2 * 10 ** 3).collect_as_set()
+    assert set(product(range(10), "ab", range(10))) <= firsts
+    assert streams.cartesian_product_stream(iter(range(3)), iter([]), count()).count() == 0
+    assert streams.cartesian_product_stream(iter([()]), iter([1, 2])).collect_as_list() == [((), 1), ((), 2)]
+
+    expected = list(product(range(7), range(3), range(5)))
+    lazy = streams.cartesian_product_stream(iter(range(7)), iter(range(3)), Stream(range(5))).collect_as_list()
+    assert sorted(lazy) == expected and len(lazy) == len(expected)
+    assert streams.cartesian_product_stream(range(7), range(3), range(5)).collect_as_list() == expected
+    assert streams.cartesian_power(1, "ab").collect_as_list() == [("a",), ("b",)]
+
+
 def test_simple_generators():
     assert streams.constant_of(1, 100).collect_as_list() == [1] * 100
     assert streams.generate(lambda: 1).limit(10).collect_as_list() == [1] * 10
     assert streams.iterate(1, lambda x: x * 2).limit(10).collect_as_list() == [1 << x for x in range(10)]
+    calls = []
+    assert streams.generate(lambda: calls.append(1) or len(calls)).limit(3).collect_as_list() == [1, 2, 3]
+    assert streams.constant_of(1, 0).collect_as_list() == []
+
+
+def test_seekable_generators():
+    assert streams.arange(5).collect_as_list() == list(range(5))
+    assert streams.arange(10, 0, -3).collect_as_list() == [10, 7, 4, 1]
+    assert streams.arange(1, 2, 0.25).collect_as_list() == [1.0, 1.25, 1.5, 1.75]
+    assert streams.arange(0, 1, 0.1).collect_as_list() == [i * 0.1 for i in range(10)]
+    with pytest.raises(ValueError):
+        streams.arange(0, 1, 0)
+    assert streams.counter().limit(5).collect_as_list() == list(range(5))
+    assert streams.counter(0.5, 0.1).skip(10).limit(2).collect_as_list() == [0.5 + 10 * 0.1, 0.5 + 11 * 0.1]
+    assert streams.counter(7, 0).limit(3).collect_as_list() == [7, 7, 7]
+    assert streams.arange(5, 0.0, -1).collect_as_list() == [5.0, 4.0, 3.0, 2.0, 1.0]
+    assert streams.arange(0, 2.0).collect_as_list() == [0.0, 1.0]
+    with pytest.raises(TypeError):
+        streams.arange(True)
+    with pytest.raises(TypeError):
+        streams.counter(0, False)
+
+    # sized sources are counted, skipped and limited without walking them
+    huge = 10 ** 15
+    assert length_hint(streams.constant_of("x", huge)) == huge
+    assert length_hint(streams.arange(0, huge, 0.5)) == 2 * huge
+    assert streams.constant_of("x", huge).skip(huge - 2).collect_as_list() == ["x", "x"]
+    assert streams.arange(huge).skip(10).limit(huge).count() == huge - 10
+    assert streams.arange(0.0, huge, 2.0).skip(huge // 2 - 1).collect_as_list() == [huge - 2.0]
+    assert streams.counter(3, 2).skip(huge).limit(huge).skip(huge - 2).collect_as_list() == [3 + 4 * huge - 4,
+                                                                                            3 + 4 * huge - 2]
+    assert length_hint(streams.counter().limit(huge)) == huge
+
+    # a partly consumed source is counted from where it is
+    stream = streams.arange(10)
+    assert next(stream) == 0 and stream.count() == 9 and stream.collect_as_list() == []
+    items = iter([1, 2, 3])
+    next(items)
+    assert Stream(items).count() == 2
+    assert Stream([1, 2, 3]).skip(5).collect_as_list() == []
+
+    # limiting or skipping a seekable source moves the stream it came from, like reading through it would
+    for source in (lambda: Stream(range(10)), lambda: streams.arange(10), lambda: streams.arange(0.0, 10.0),
+                   lambda: streams.counter().limit(10)):
+        stream = source()
+        assert stream.limit(3).collect_as_list() == [0, 1, 2]
+        assert stream.collect_as_list() == list(range(3, 10))
+        stream = source()
+        assert stream.skip(3).limit(2).collect_as_list() == [3, 4]
+        assert stream.collect_as_list() == list(range(5, 10))
+    stream = streams.constant_of("x", 5)
+    assert stream.limit(2).count() == 2 and stream.count() == 3
+    stream = streams.counter(1, 2)
+    assert stream.limit(2).collect_as_list() == [1, 3] and stream.limit(2).collect_as_list() == [5, 7]
+
+
+def test_arange_numeric_chunks():
+    assert streams.arange(10 ** 6).map_to_int().sum() == sum(range(10 ** 6))
+    assert list(streams.arange(3, 100, 7).map_to_float()) == list(map(float, range(3, 100, 7)))
+    values = [0.25 + i * 0.1 for i in range(1000)]
+    assert list(streams.arange(0.25, 100.2, 0.1).map_to_float()) == values
+    assert list(streams.arange(0.5, 10, 1).map_to_int()) == list(Stream([i + 0.5 for i in range(10)]).map_to_int())
 
 
 def test_text_splits():
@@ -44,4 +123,17 @@ def test_text_splits():
     buf.write("aaa")      # test last buffer read with string leftovers
     buf.seek(0)
     assert streams.split(buf, "m").collect_as_list() == [
-        "a" * 100, "", "a" * io.DEFAULT_BUFFER_SIZE, "a" * (io.DEFAULT_BUFFER_SIZE - 104), "aaa"]
\ No newline at end of file
+        "a" * 100, "", "a" * io.DEFAULT_BUFFER_SIZE, "a" * (io.DEFAULT_BUFFER_SIZE - 104), "aaa"]
+
+
+def test_flat_map_kinds():
+    assert Stream(range(3)).flat_map(lambda x: [x] * x, kind="iterable").collect_as_list() == [1, 2, 2]
+
+    def mixed():
+        return [1, "ab", (2, 3), b"cd", iter([4]), None]
+
+    assert Stream(mixed()).flat_map(lambda x: x).collect_as_list() == [1, "a", "b", 2, 3, 99, 100, 4, None]
+    assert Stream(mixed()).flat_map(lambda x: x, kind="scalar_or_iterable").collect_as_list() \
+        == [1, "ab", 2, 3, b"cd", 4, None]
+    with pytest.raises(ValueError):
+        Stream(mixed()).flat_map(lambda x: x, kind="strings")
@@ -0,0 +1,40 @@
+import struct
+import pytest
+from streamer import streams
+from streamer import sources
+
+fmt = "<IdH2sx"
+rows = [(i, i / 4, i % 7, b"ab") for i in range(1000)]
+data = b"".join(struct.pack(fmt, *row) for row in rows)
+
+
+def test_structs(tmp_path):
+    path = tmp_path / "telemetry.bin"
+    path.write_bytes(data)
+    assert streams.structs(path, fmt).collect_as_list() == rows
+    assert streams.structs(bytearray(data), fmt, start=990).collect_as_list() == rows[990:]
+    assert streams.structs(data, fmt, start=10, stop=13).collect_as_list() == rows[10:13]
+    shards = [streams.structs(path, fmt, start=100, shard=(i, 3)).collect_as_list() for i in range(3)]
+    assert [len(s) for s in shards] == [300, 300, 300] and sum(shards, []) == rows[100:]
+
+    batches = streams.structs(data, fmt, batch=64, backend="struct").collect_as_list()
+    assert [len(b) for b in batches] == [64] * 15 + [40] and sum(batches, []) == rows
+
+    (tmp_path / "empty.bin").write_bytes(b"")
+    assert streams.structs(tmp_path / "empty.bin", fmt).collect_as_list() == []
+    with pytest.raises(ValueError):
+        streams.structs(data[:-1], fmt).collect_as_list()
+
+
+def test_numpy_batches(tmp_path):
+    numpy = pytest.importorskip("numpy")
+    path = tmp_path / "telemetry.bin"
+    path.write_bytes(data)
+    batches = streams.structs(path, fmt, batch=100, start=50).collect_as_list()
+    assert all(isinstance(b, numpy.ndarray) and not b.flags.owndata for b in batches)
+    assert numpy.concatenate(batches)["f0"].tolist() == list(range(50, 1000))
+    assert [tuple(r) for r in batches[0][:2]] == rows[50:52]
+
+    assert sources.struct_dtype("@Id") is None
+    with pytest.raises(ValueError):
+        streams.structs(data, "@IdH2sx", batch=10, backend="numpy").collect_as_list()